@@ -1,18 +1,28 @@
+import hmac
+import json
 import logging
-from typing import Dict
-from pathlib import Path
+from typing import Any, AsyncIterator, Dict
 from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 
-from app.models import ChatRequest, ChatResponse, HealthResponse
+from app.admission import OverloadedError, Ticket, get_admission_controller
+from app.models import BatchRequest, ChatRequest, ChatResponse, HealthResponse
 from app.agent import get_support_agent
+from app.batch import BatchRunner
+from app.config import settings
+from app.conversation_store import get_conversation_store
+from app.health_monitor import DependencyUnavailableError, get_health_monitor
+from app.identity import get_session_manager
 from app.mcp_client import get_mcp_client
+from app.llm_scheduler import get_llm_scheduler
 from app.llm_service import get_llm_service
-from app.prompt_loader import (
-    get_welcome_title,
-    get_welcome_subtitle,
-    get_welcome_features,
-)
+from app.metrics import CONTENT_TYPE, render_metrics
+from app.prefetch import get_prefetcher
+from app.response_cache import get_response_cache
+from app.startup import get_startup_profile
+from app.static_assets import get_static_assets
+from app.tool_catalog import get_tool_catalog
 
 logger = logging.getLogger(__name__)
 
@@ -21,66 +31,212 @@ router = APIRouter()
 
 @router.get("/ping", response_model=HealthResponse)
 async def ping():
-    """Health check endpoint."""
+    """Health check endpoint, answered from the health monitor's last probes."""
+    monitor = get_health_monitor()
+    mcp_connected = bool(monitor.healthy("mcp"))
+    llm_reachable = monitor.healthy("llm")
+    return HealthResponse(
+        status="ok" if mcp_connected and llm_reachable else "degraded",
+        mcp_connected=mcp_connected,
+        # Check LLM configuration (simple check - API key presence)
+        llm_configured=bool(get_llm_service().client.api_key),
+        llm_reachable=llm_reachable,
+        dependencies=monitor.get_stats(),
+    )
+
+
+@router.get("/ready")
+async def ready() -> JSONResponse:
+    """Readiness probe: 200 once startup warm-up has finished, 503 until then."""
+    profile = get_startup_profile()
+    return JSONResponse(profile.get_stats(), status_code=200 if profile.ready else 503)
+
+
+@router.get("/v1/stats")
+async def get_stats() -> Dict[str, Any]:
+    """Runtime statistics for connection pools and caches."""
     mcp_client = get_mcp_client()
-    llm_service = get_llm_service()
+    return {
+        "startup": get_startup_profile().get_stats(),
+        "admission": get_admission_controller().get_stats(),
+        "health": get_health_monitor().get_stats(),
+        "mcp_pool": mcp_client.get_stats(),
+        "llm": get_llm_service().get_stats(),
+        "llm_scheduler": get_llm_scheduler().get_stats(),
+        "tool_catalog": get_tool_catalog().get_stats(),
+        "tool_cache": mcp_client.cache.get_stats() if mcp_client.cache else None,
+        "prefetch": get_prefetcher().get_stats(),
+        "response_cache": get_response_cache().get_stats(),
+        "static_assets": get_static_assets().get_stats(),
+        "conversations": get_conversation_store().get_stats(),
+    }
 
-    # Check MCP connection
-    mcp_connected = await mcp_client.health_check()
 
-    # Check LLM configuration (simple check - API key presence)
-    llm_configured = bool(llm_service.client.api_key)
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """Prometheus metrics: latency histograms, token and error counters."""
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
 
-    return HealthResponse(
-        status="ok",
-        mcp_connected=mcp_connected,
-        llm_configured=llm_configured,
-    )
+
+def _check_available() -> None:
+    """Fail fast with 503 while the LLM provider's circuit is open.
+
+    Better than queueing work that would only wait out its timeouts.
+    """
+    try:
+        get_support_agent().check_available()
+    except DependencyUnavailableError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"{e}, please retry shortly",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+async def _admit(identifier: str) -> Ticket:
+    """Admit a chat turn, turning load shedding into 429/503 with Retry-After."""
+    _check_available()
+    try:
+        return await get_admission_controller().admit(identifier)
+    except OverloadedError as e:
+        logger.warning(f"Shed request from {identifier}: {e.detail}")
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)},
+        )
 
 
 @router.post("/v1/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest, http_request: Request):
     """Chat endpoint for customer support."""
-    try:
-        # Extract client IP for conversation tracking
-        client_ip = http_request.client.host
-        agent = get_support_agent()
-        response = await agent.chat(
-            user_message=request.message,
-            user_identifier=client_ip,
-            remember=request.remember,
-            clear_history=request.clear_history,
+    identifier = get_session_manager().identify(http_request)
+    async with await _admit(identifier):
+        try:
+            agent = get_support_agent()
+            response = await agent.chat(
+                user_message=request.message,
+                user_identifier=identifier,
+                remember=request.remember,
+                clear_history=request.clear_history,
+            )
+            return response
+        except Exception as e:
+            logger.error(f"Chat error: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+
+
+def _format_sse(event: str, data: Any) -> str:
+    """Format a server-sent event frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/v1/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """Streaming chat endpoint using server-sent events.
+
+    Emits ``token`` events with content deltas, ``tool_start``/``tool_end``
+    events around each tool call and a final ``done`` event carrying the
+    same payload as ``/v1/chat``.
+    """
+    identifier = get_session_manager().identify(http_request)
+    agent = get_support_agent()
+    # Admit before the response starts so shedding can still return 429/503
+    ticket = await _admit(identifier)
+
+    async def event_source() -> AsyncIterator[str]:
+        try:
+            async for event in agent.chat_stream(
+                user_message=request.message,
+                user_identifier=identifier,
+                remember=request.remember,
+                clear_history=request.clear_history,
+            ):
+                data = event["data"]
+                if event["event"] == "done":
+                    data = data["response"].model_dump()
+                yield _format_sse(event["event"], data)
+        except Exception as e:
+            logger.error(f"Chat stream error: {e}")
+            yield _format_sse("error", {"detail": str(e)})
+        finally:
+            ticket.release()
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Also release if the client disconnects before the body starts
+        background=BackgroundTask(ticket.release),
+    )
+
+
+@router.post("/v1/chat/batch")
+async def chat_batch(request: BatchRequest, http_request: Request) -> StreamingResponse:
+    """Run many independent scripted conversations through the agent.
+
+    Requires ``Authorization: Bearer <BATCH_API_KEY>``. Streams NDJSON: one
+    ``result`` line per conversation as it finishes (in completion order,
+    with its request ``index``), then a ``summary`` line.
+    """
+    authorization = http_request.headers.get("authorization", "")
+    if not settings.BATCH_API_KEY:
+        raise HTTPException(status_code=403, detail="Batch endpoint is disabled; set BATCH_API_KEY")
+    if not hmac.compare_digest(authorization.encode("utf-8"), f"Bearer {settings.BATCH_API_KEY}".encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Invalid batch API key")
+    if len(request.conversations) > settings.BATCH_MAX_CONVERSATIONS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.BATCH_MAX_CONVERSATIONS} conversations per batch",
         )
-        return response
-    except Exception as e:
-        logger.error(f"Chat error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    _check_available()
+    concurrency = min(request.concurrency or settings.BATCH_MAX_CONCURRENCY, settings.BATCH_MAX_CONCURRENCY)
+    runner = BatchRunner(get_support_agent(), concurrency=concurrency, admission=get_admission_controller())
+
+    async def lines() -> AsyncIterator[str]:
+        async for item in runner.run(request.conversations):
+            yield item.model_dump_json() + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+def _serve_asset(request: Request, name: str, not_found: str) -> Response:
+    """Serve an in-memory asset, honouring Accept-Encoding and If-None-Match."""
+    asset = get_static_assets().get(name)
+    if asset is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    return asset.response(request.headers)
 
 
 @router.get("/", response_class=HTMLResponse)
-async def serve_chat_ui():
-    """Serve the chat UI HTML page."""
-    try:
-        with open("static/index.html", "r") as f:
-            return HTMLResponse(content=f.read())
-    except FileNotFoundError:
-        raise HTTPException(status_code=404, detail="Chat UI not found")
+async def serve_chat_ui(request: Request) -> Response:
+    """Serve the chat UI HTML page, starting a session for browsers without one."""
+    response = _serve_asset(request, "index.html", "Chat UI not found")
+    sessions = get_session_manager()
+    if sessions.session_id(request) is None:
+        sessions.set_cookie(response, sessions.issue())
+        # A response carrying a session cookie must not be stored by shared caches
+        response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@router.post("/v1/session")
+async def create_session() -> JSONResponse:
+    """Start a session: returns a signed token for the session header and sets the cookie."""
+    sessions = get_session_manager()
+    token = sessions.issue()
+    response = JSONResponse({"session": token, "header": sessions.header_name})
+    sessions.set_cookie(response, token)
+    return response
 
 
 @router.get("/static/style.css")
-async def serve_style_css():
+async def serve_style_css(request: Request) -> Response:
     """Serve the CSS stylesheet."""
-    css_path = Path("static/style.css")
-    if not css_path.exists():
-        raise HTTPException(status_code=404, detail="CSS file not found")
-    return FileResponse(css_path, media_type="text/css")
+    return _serve_asset(request, "style.css", "CSS file not found")
 
 
 @router.get("/v1/prompts/welcome")
-async def get_welcome_prompts() -> Dict[str, str]:
-    """Get welcome message prompts for the UI."""
-    return {
-        "title": get_welcome_title(),
-        "subtitle": get_welcome_subtitle(),
-        "features": get_welcome_features(),
-    }
+async def get_welcome_prompts(request: Request) -> Response:
+    """Get welcome message prompts for the UI (``title``, ``subtitle``, ``features``)."""
+    return _serve_asset(request, "welcome", "Welcome prompts not found")
@@ -0,0 +1,257 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Awaitable, Dict, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class OverloadedError(Exception):
+    """A request was shed instead of queued.
+
+    ``status_code`` is 429 when one user has too many requests pending and
+    503 when the service as a whole is saturated.
+    """
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class _UserSlot:
+    """Serializes one identifier's turns; ``pending`` counts holder plus waiters."""
+
+    __slots__ = ("lock", "pending")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending = 0
+
+
+class Ticket:
+    """An admitted request; release it (or use ``async with``) when the turn ends.
+
+    Releasing is idempotent so streaming responses can release from both the
+    body generator and a background task.
+    """
+
+    __slots__ = ("_controller", "_slot", "identifier", "batch", "admitted_at", "_released")
+
+    def __init__(self, controller: "AdmissionController", identifier: str, slot: _UserSlot, batch: bool = False):
+        self._controller = controller
+        self._slot = slot
+        self.identifier = identifier
+        self.batch = batch
+        self.admitted_at = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self._controller._release(self)
+
+    async def __aenter__(self) -> "Ticket":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.release()
+
+
+class AdmissionController:
+    """Per-user serialization plus a global concurrency limit with a bounded queue.
+
+    Each identifier runs at most one turn at a time, so concurrent requests
+    from one user can no longer interleave their messages; up to
+    ``max_user_queued`` more wait behind it and further ones get a 429.
+    Across users at most ``max_concurrent`` turns run at once. Up to
+    ``max_queue`` more wait for at most ``queue_timeout`` seconds; beyond that
+    requests are rejected immediately with a 503. ``Retry-After`` is
+    estimated from the recent average turn time.
+
+    Batch turns use a lower-priority lane (``admit_batch``): at most
+    ``max_batch`` of them run at once across all batches, they count
+    against ``max_concurrent``, and they only take a slot while no
+    interactive request is waiting for one. They wait as long as that takes
+    instead of being shed.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 32,
+        max_queue: int = 64,
+        queue_timeout: float = 10.0,
+        max_user_queued: int = 2,
+        max_batch: int = 8,
+    ):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.max_user_queued = max(0, max_user_queued)
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self.max_batch = max(1, max_batch)
+        self._batch_slots = asyncio.Semaphore(self.max_batch)
+        # Set whenever a slot is released, waking batch turns waiting for an idle slot
+        self._slot_freed = asyncio.Event()
+        self._users: Dict[str, _UserSlot] = {}
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.rejected_user = 0
+        self.batch_in_flight = 0
+        self.batch_waiting = 0
+        self.batch_admitted = 0
+        # Exponentially weighted average turn duration, for Retry-After
+        self._avg_turn_seconds = 2.0
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to free up, clamped to 1-60."""
+        turns_ahead = (self.waiting + 1) / self.max_concurrent
+        return max(1, min(60, math.ceil(self._avg_turn_seconds * turns_ahead)))
+
+    async def admit(self, identifier: str) -> Ticket:
+        """Wait for this user's previous turn and a global slot.
+
+        Raises:
+            OverloadedError: If the user's or the global queue is full, or the
+                wait exceeds ``queue_timeout``
+        """
+        slot = self._users.get(identifier)
+        if slot is None:
+            slot = self._users[identifier] = _UserSlot()
+        if slot.pending > self.max_user_queued:
+            self.rejected_user += 1
+            raise OverloadedError(429, "Too many requests pending for this conversation", self.retry_after())
+        slot.pending += 1
+        deadline = asyncio.get_running_loop().time() + self.queue_timeout
+        try:
+            await self._wait(slot.lock.acquire(), deadline)
+        except BaseException:
+            self._drop_user(identifier, slot)
+            raise
+        try:
+            if self._slots.locked():
+                if self.waiting >= self.max_queue:
+                    self.rejected_queue_full += 1
+                    raise OverloadedError(503, "Server is at capacity, please retry", self.retry_after())
+                self.waiting += 1
+                try:
+                    await self._wait(self._slots.acquire(), deadline)
+                finally:
+                    self.waiting -= 1
+            else:
+                await self._slots.acquire()
+        except BaseException:
+            slot.lock.release()
+            self._drop_user(identifier, slot)
+            raise
+        self.in_flight += 1
+        self.admitted += 1
+        return Ticket(self, identifier, slot)
+
+    async def admit_batch(self, identifier: str) -> Ticket:
+        """Admit a batch turn once the batch lane and an idle global slot allow it.
+
+        Never sheds: batch callers are background jobs that can wait.
+        """
+        slot = self._users.get(identifier)
+        if slot is None:
+            slot = self._users[identifier] = _UserSlot()
+        slot.pending += 1
+        self.batch_waiting += 1
+        try:
+            await slot.lock.acquire()
+            try:
+                await self._batch_slots.acquire()
+                try:
+                    # Interactive requests go first: wait until none is queued and a slot is free
+                    while self.waiting or self._slots.locked():
+                        self._slot_freed.clear()
+                        await self._slot_freed.wait()
+                    await self._slots.acquire()
+                except BaseException:
+                    self._batch_slots.release()
+                    raise
+            except BaseException:
+                slot.lock.release()
+                raise
+        except BaseException:
+            self._drop_user(identifier, slot)
+            raise
+        finally:
+            self.batch_waiting -= 1
+        self.in_flight += 1
+        self.batch_in_flight += 1
+        self.batch_admitted += 1
+        return Ticket(self, identifier, slot, batch=True)
+
+    async def _wait(self, acquire: Awaitable, deadline: float) -> None:
+        # timeout_at cancels the acquire itself, so a lock or slot is never
+        # granted to a waiter that already gave up
+        try:
+            async with asyncio.timeout_at(deadline):
+                await acquire
+        except TimeoutError:
+            self.rejected_timeout += 1
+            logger.warning("Admission queue wait timed out")
+            raise OverloadedError(503, "Server is busy, please retry", self.retry_after()) from None
+
+    def _release(self, ticket: Ticket) -> None:
+        self.in_flight -= 1
+        elapsed = time.monotonic() - ticket.admitted_at
+        self._avg_turn_seconds += 0.1 * (elapsed - self._avg_turn_seconds)
+        if ticket.batch:
+            self.batch_in_flight -= 1
+            self._batch_slots.release()
+        self._slots.release()
+        self._slot_freed.set()
+        ticket._slot.lock.release()
+        self._drop_user(ticket.identifier, ticket._slot)
+
+    def _drop_user(self, identifier: str, slot: _UserSlot) -> None:
+        slot.pending -= 1
+        if slot.pending == 0 and self._users.get(identifier) is slot:
+            del self._users[identifier]
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get admission counters and current queue depth."""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "active_users": len(self._users),
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "rejected_user": self.rejected_user,
+            "batch_in_flight": self.batch_in_flight,
+            "batch_waiting": self.batch_waiting,
+            "batch_admitted": self.batch_admitted,
+            "avg_turn_seconds": round(self._avg_turn_seconds, 3),
+        }
+
+
+# Global admission controller instance
+_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Get or create the global admission controller."""
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController(
+            max_concurrent=settings.ADMISSION_MAX_CONCURRENT,
+            max_queue=settings.ADMISSION_MAX_QUEUE,
+            queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+            max_user_queued=settings.USER_MAX_QUEUED_REQUESTS,
+            max_batch=settings.BATCH_MAX_CONCURRENCY,
+        )
+    return _controller
@@ -1,13 +1,34 @@
+import asyncio
+import itertools
 import json
 import logging
 import re
-from typing import Any, Optional
-
-from app.models import ChatResponse, ToolCall
-from app.llm_service import get_llm_service
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Optional
+
+from app.config import settings
+from app.context_builder import BuiltContext, build_context, estimate_message_tokens
+from app.health_monitor import DependencyUnavailableError, get_health_monitor
+from app.models import ChatResponse, ContextStats, RoundStats, ToolCall, Usage
+from app.llm_scheduler import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+from app.llm_service import StreamAccumulator, get_llm_service
 from app.mcp_client import get_mcp_client
-from app.prompt_loader import get_support_agent_prompt
-from app.conversation_store import get_conversation_store
+from app.metrics import (
+    HISTORY_SECONDS,
+    LLM_CALL_SECONDS,
+    TOOL_CALL_SECONDS,
+    TOOL_ERRORS,
+    TOOL_TOKENS_SAVED,
+    record_usage,
+)
+from app.prefetch import TurnPrefetch, get_prefetcher
+from app.prompt_loader import get_history_summary_prompt, get_prompt_mtime, get_support_agent_prompt
+from app.response_cache import get_response_cache
+from app.tool_catalog import get_tool_catalog
+from app.tool_selector import VERIFY_TOOL, get_tool_selector, verification_succeeded
+from app.tracing import get_tracer
+from app.conversation_store import Conversation, Message, get_conversation_store
 
 logger = logging.getLogger(__name__)
 
@@ -17,167 +38,626 @@ REMEMBER_PHRASE_PATTERN = re.compile(
     re.IGNORECASE
 )
 
+# Messages a turn adds to the conversation: the user message and the reply
+MESSAGES_PER_TURN = 2
+
+# Appended to the messages while the MCP server is down and tools are withheld
+TOOLS_UNAVAILABLE_NOTE = (
+    "Tools are temporarily unavailable, so you cannot look up products, customers or orders. "
+    "Answer from general knowledge where you can, and tell the customer that account and "
+    "order requests need to be retried in a few minutes."
+)
+
 
 class SupportAgent:
     """Customer support agent with MCP tool calling capabilities."""
 
-    # Default number of messages to include in context
-    DEFAULT_HISTORY_LIMIT = 10
-
     def __init__(self):
         self.llm_service = get_llm_service()
         self.mcp_client = get_mcp_client()
-        self._available_tools: Optional[list[dict]] = None
+        self.tool_catalog = get_tool_catalog()
+        self.tool_selector = get_tool_selector()
+        self.health_monitor = get_health_monitor()
+        self.prefetcher = get_prefetcher()
         self._system_prompt: Optional[str] = None
+        self._system_prompt_mtime = 0.0
+        self._background_tasks: set[asyncio.Task] = set()
+        # In-flight background summaries by user identifier
+        self._summaries: dict[str, asyncio.Task] = {}
 
     def get_system_prompt(self) -> str:
-        """Get the system prompt, loading from file if not cached."""
-        if self._system_prompt is None:
+        """Get the system prompt, reloading it when the file changes."""
+        mtime = get_prompt_mtime("support_agent")
+        if self._system_prompt is None or mtime != self._system_prompt_mtime:
             self._system_prompt = get_support_agent_prompt()
+            self._system_prompt_mtime = mtime
         return self._system_prompt
 
     async def get_available_tools(self) -> list[dict]:
-        """Get available tools from MCP server, formatted for OpenAI."""
-        if self._available_tools is None:
-            self._available_tools = await self.mcp_client.list_tools()
-            logger.info(f"Loaded {len(self._available_tools)} tools from MCP server")
-        return self._available_tools
+        """Get available tools from the background-refreshed catalog, formatted for OpenAI.
+
+        Tools are kept in canonical order so requests share a stable prefix.
+        """
+        return await self.tool_catalog.get_tools()
+
+    def check_available(self) -> None:
+        """Raise ``DependencyUnavailableError`` while the LLM provider's circuit is open."""
+        breaker = self.health_monitor.breaker("llm")
+        if not breaker.allow():
+            raise DependencyUnavailableError("llm", breaker.retry_after())
 
     def _should_use_full_history(self, message: str, remember_flag: bool) -> bool:
-        """Determine if full conversation history should be used.
+        """Determine if the larger remember-mode history budget should be used.
 
         Args:
             message: The user's message
             remember_flag: The remember flag from the request
 
         Returns:
-            True if full history should be used
+            True if the remember-mode budget should be used
         """
         if remember_flag:
             return True
         # Check if message contains "remember" keyword
         return bool(REMEMBER_PHRASE_PATTERN.search(message))
 
-    async def chat(
+    @staticmethod
+    def _parse_arguments(raw_arguments: Optional[str]) -> dict[str, Any]:
+        """Parse tool call arguments, falling back to an empty dict."""
+        try:
+            arguments = json.loads(raw_arguments or "{}")
+        except json.JSONDecodeError:
+            return {}
+        return arguments if isinstance(arguments, dict) else {}
+
+    async def _run_tool(
         self,
-        user_message: str,
-        user_identifier: str,
-        remember: bool = False,
-        clear_history: bool = False,
-    ) -> ChatResponse:
-        """Process a user message and return a response.
+        tool_call: Any,
+        semaphore: asyncio.Semaphore,
+        timeout: float,
+        events: asyncio.Queue,
+        offered: set[str],
+        prefetch: Optional[TurnPrefetch] = None,
+    ) -> str:
+        """Execute a single tool call under the concurrency cap and timeout."""
+        name = tool_call.function.name
+        arguments = self._parse_arguments(tool_call.function.arguments)
+        if name not in offered:
+            # The model called a tool it was not given, e.g. an order tool before verification
+            logger.warning(f"Refusing tool {name}: not offered in this round")
+            return f"Error: tool {name} is not available yet"
+        async with semaphore:
+            logger.info(f"Executing tool: {name} with args: {arguments}")
+            events.put_nowait(_event("tool_start", id=tool_call.id, name=name, arguments=arguments))
+            started = time.perf_counter()
+            error_reason = None
+            try:
+                # A matching prefetched call is awaited instead of calling the tool again
+                result = await prefetch.take(name, arguments, timeout) if prefetch is not None else None
+                if result is None:
+                    result = await asyncio.wait_for(self.mcp_client.call_tool(name, arguments), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Tool {name} timed out after {timeout:.1f}s")
+                result = f"Error: tool {name} timed out"
+                error_reason = "timeout"
+            except Exception as e:
+                logger.error(f"Tool {name} failed: {e}")
+                result = f"Error: {str(e)}"
+            elapsed = time.perf_counter() - started
+            error = result.startswith("Error:")
+            TOOL_CALL_SECONDS.labels(name).observe(elapsed)
+            if error:
+                TOOL_ERRORS.labels(name, error_reason or "error").inc()
+            events.put_nowait(_event(
+                "tool_end",
+                id=tool_call.id,
+                name=name,
+                ms=round(elapsed * 1000, 1),
+                error=error,
+            ))
+            return result
+
+    async def _execute_tool_calls(
+        self,
+        tool_calls: list[Any],
+        timeout: float,
+        events: asyncio.Queue,
+        offered: set[str],
+        prefetch: Optional[TurnPrefetch] = None,
+    ) -> list[dict[str, str]]:
+        """Execute tool calls concurrently and build their tool result messages.
 
         Args:
-            user_message: The user's message
-            user_identifier: Unique identifier for the user (e.g., IP address)
-            remember: If True, use full conversation history
-            clear_history: If True, clear conversation history before processing
+            tool_calls: Tool calls from the assistant message
+            timeout: Per-tool timeout in seconds
+            events: Queue receiving tool_start/tool_end events
+            offered: Names of the tools offered to the model this round
+            prefetch: Calls speculatively started for this turn, if any
+
+        Returns:
+            Tool result messages in the same order as ``tool_calls``
+        """
+        semaphore = asyncio.Semaphore(max(1, settings.TOOL_CONCURRENCY))
+        results = await asyncio.gather(*(
+            self._run_tool(tool_call, semaphore, timeout, events, offered, prefetch)
+            for tool_call in tool_calls
+        ))
+        return [
+            {"role": "tool", "tool_call_id": tool_call.id, "content": result}
+            for tool_call, result in zip(tool_calls, results)
+        ]
+
+    async def _stream_completion(
+        self,
+        messages: list[dict],
+        tools: Optional[list[dict]],
+        deadline: float,
+        accumulator: StreamAccumulator,
+        user: str = "",
+        tool_choice: str = "auto",
+    ) -> AsyncIterator[str]:
+        """Stream a completion into ``accumulator``, yielding content deltas.
+
+        Raises:
+            asyncio.TimeoutError: If the turn deadline passes mid-stream
         """
+        with get_tracer().start_as_current_span("LLMService.chat_stream", attributes={
+            "gen_ai.request.tools": len(tools or []),
+            "gen_ai.request.messages": len(messages),
+        }) as span:
+            stream = await asyncio.wait_for(
+                self.llm_service.chat_stream(messages, tools=tools, user=user, tool_choice=tool_choice),
+                timeout=max(0.0, deadline - time.monotonic()),
+            )
+            span.set_attribute("gen_ai.request.model", stream.model)
+            try:
+                iterator = stream.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(
+                            iterator.__anext__(),
+                            timeout=max(0.0, deadline - time.monotonic()),
+                        )
+                    except StopAsyncIteration:
+                        break
+                    delta = accumulator.add(chunk)
+                    if delta:
+                        yield delta
+            finally:
+                await stream.close()
+            if accumulator.usage is not None:
+                span.set_attributes({
+                    "gen_ai.usage.input_tokens": accumulator.usage.prompt_tokens,
+                    "gen_ai.usage.output_tokens": accumulator.usage.completion_tokens,
+                })
+
+    async def _prepare_turn(
+        self,
+        user_message: str,
+        user_identifier: str,
+        remember: bool,
+        clear_history: bool,
+        use_response_cache: bool = True,
+    ) -> "TurnState":
+        """Record the user message and build the messages sent to the LLM."""
         store = get_conversation_store()
-        conversation = store.get_or_create_conversation(user_identifier)
 
         # Clear history if requested
         if clear_history:
-            store.delete_conversation(user_identifier)
-            conversation = store.get_or_create_conversation(user_identifier)
+            await store.delete(user_identifier)
             logger.info(f"Cleared conversation history for {user_identifier}")
+        started = time.perf_counter()
+        conversation = await store.load(user_identifier)
+        HISTORY_SECONDS.labels("load").observe(time.perf_counter() - started)
+        await self._summarize_before_eviction(user_identifier, conversation)
 
         # Add user message to conversation history
         conversation.add_message("user", user_message)
 
-        # Determine history limit
+        # Size history to the token budget; remember mode gets a larger one
         use_full_history = self._should_use_full_history(user_message, remember)
-        history_limit = None if use_full_history else self.DEFAULT_HISTORY_LIMIT
-
-        # Get conversation history
-        history = conversation.get_history(limit=history_limit, include_all=use_full_history)
+        budget = settings.CONTEXT_TOKEN_BUDGET_REMEMBER if use_full_history else settings.CONTEXT_TOKEN_BUDGET
+        started = time.perf_counter()
+        context = build_context(conversation, budget)
+        HISTORY_SECONDS.labels("build").observe(time.perf_counter() - started)
+        system_prompt = self.get_system_prompt()
+        context_stats = ContextStats(
+            history_messages=context.history_messages,
+            summarized_messages=conversation.summarized_count,
+            estimated_prompt_tokens=estimate_message_tokens(system_prompt) + context.estimated_tokens,
+        )
         logger.info(
-            f"User {user_identifier}: using {len(history)} messages "
-            f"({'all' if use_full_history else f'last {history_limit}'})"
+            f"User {user_identifier}: using {context.history_messages} messages, "
+            f"~{context_stats.estimated_prompt_tokens} prompt tokens (budget {budget})"
         )
 
-        # Build messages with system prompt and history
+        # Build messages with system prompt, rolling summary and history
         messages = [
-            {"role": "system", "content": self.get_system_prompt()},
-            *history,  # Include conversation history
+            {"role": "system", "content": system_prompt},
+            *context.messages,
         ]
 
-        # Get available tools
-        tools = await self.get_available_tools()
+        # Only stateless first turns are eligible for the response cache
+        cache_message = None
+        if (
+            use_response_cache
+            and settings.RESPONSE_CACHE_ENABLED
+            and not use_full_history
+            and conversation.total_messages == 1
+        ):
+            cache_message = user_message
+        return TurnState(
+            user_identifier=user_identifier,
+            user_message=user_message,
+            conversation=conversation,
+            messages=messages,
+            context=context,
+            context_stats=context_stats,
+            cache_message=cache_message,
+        )
 
-        # Get LLM response
-        llm_response = await self.llm_service.chat(messages, tools=tools)
-        assistant_message = llm_response.choices[0].message
+    def _schedule_summary(self, turn: "TurnState") -> None:
+        """Fold history that no longer fits the budget into the rolling summary.
 
-        # Track tool calls
-        tool_calls_data: list[ToolCall] = []
-
-        # Handle tool calls if present
-        if assistant_message.tool_calls:
-            # Build tool calls for the assistant message
-            tool_calls_for_message = []
-            for tool_call in assistant_message.tool_calls:
-                tool_calls_for_message.append({
-                    "id": tool_call.id,
-                    "type": tool_call.type,
-                    "function": {
-                        "name": tool_call.function.name,
-                        "arguments": tool_call.function.arguments,
-                    },
-                })
-
-            # Add assistant message with tool_calls to history
-            messages.append({
-                "role": "assistant",
-                "content": assistant_message.content or "",
-                "tool_calls": tool_calls_for_message,
-            })
+        Runs in the background after the turn; at most one summarization per
+        conversation is in flight.
+        """
+        conversation = turn.conversation
+        if not turn.context.overflow or conversation.summarizing:
+            return
+        conversation.summarizing = True
+        user_identifier = turn.user_identifier
+        task = asyncio.create_task(self._summarize(
+            user_identifier, conversation, turn.context.overflow, turn.context.overflow_end
+        ))
+        self._background_tasks.add(task)
+        self._summaries[user_identifier] = task
+        task.add_done_callback(self._background_tasks.discard)
+        task.add_done_callback(lambda done: self._forget_summary(user_identifier, done))
+
+    def _forget_summary(self, user_identifier: str, task: asyncio.Task) -> None:
+        if self._summaries.get(user_identifier) is task:
+            del self._summaries[user_identifier]
+
+    async def _summarize_before_eviction(self, user_identifier: str, conversation: Conversation) -> None:
+        """Summarize, before the turn starts, messages the turn would push out of history unsummarized.
+
+        The retained history is a bounded deque, and the background summary
+        can fall behind it after fast turns or failed summaries. Anything
+        that leaves the deque unsummarized is lost, so the turn waits for a
+        pending summary and, if that is not enough, summarizes the messages
+        about to be evicted itself.
+        """
+        maxlen = conversation.messages.maxlen
+        if maxlen is None:
+            return
+        evicted = len(conversation.messages) + MESSAGES_PER_TURN - maxlen
+        if evicted <= 0 or conversation.summarized_count >= conversation.first_index + evicted:
+            return
+        pending = self._summaries.get(user_identifier)
+        if pending is not None:
+            await asyncio.shield(pending)
+            if conversation.summarized_count >= conversation.first_index + evicted:
+                return
+        start = max(0, conversation.summarized_count - conversation.first_index)
+        overflow = list(itertools.islice(conversation.messages, start, evicted))
+        overflow_end = conversation.first_index + evicted
+        logger.info(f"User {user_identifier}: summarizing {len(overflow)} messages before they leave the history")
+        conversation.summarizing = True
+        # The user is waiting on this one
+        await self._summarize(user_identifier, conversation, overflow, overflow_end, PRIORITY_INTERACTIVE)
+        if conversation.summarized_count < overflow_end:
+            logger.warning(
+                f"User {user_identifier}: {len(overflow)} messages leave the history without being summarized"
+            )
 
-            # Execute each tool call and collect results
-            for tool_call in assistant_message.tool_calls:
-                function_name = tool_call.function.name
+    async def _summarize(
+        self,
+        user_identifier: str,
+        conversation: Conversation,
+        overflow: list[Message],
+        overflow_end: int,
+        priority: int = PRIORITY_BACKGROUND,
+    ) -> None:
+        """Update the conversation summary with the overflow messages, through absolute index ``overflow_end``."""
+        try:
+            transcript = "\n".join(f"{message.role}: {message.content}" for message in overflow)
+            started = time.perf_counter()
+            response = await self.llm_service.chat([
+                {"role": "system", "content": get_history_summary_prompt()},
+                {
+                    "role": "user",
+                    "content": f"Current summary:\n{conversation.summary or '(none)'}\n\nNew messages:\n{transcript}",
+                },
+            ], priority=priority, user=user_identifier)
+            LLM_CALL_SECONDS.labels("summary").observe(time.perf_counter() - started)
+            record_usage(response.usage)
+            summary = (response.choices[0].message.content or "").strip()
+            if summary and overflow_end > conversation.summarized_count:
+                conversation.summary = summary
+                conversation.summarized_count = overflow_end
+                await get_conversation_store().save_summary(user_identifier, conversation)
+                logger.info(
+                    f"User {user_identifier}: summarized {len(overflow)} messages "
+                    f"(through #{overflow_end})"
+                )
+        except Exception as e:
+            logger.warning(f"History summarization failed for {user_identifier}: {e}")
+        finally:
+            conversation.summarizing = False
+
+    async def _run_turn(self, turn: "TurnState", stream: bool) -> AsyncIterator[dict[str, Any]]:
+        """Run the LLM/tool loop for one turn, yielding events as they happen.
+
+        Events are dicts with an ``event`` name and a ``data`` payload:
+        ``token`` (streaming only), ``tool_start``, ``tool_end`` and finally
+        ``done`` carrying the ``ChatResponse``.
+        """
+        conversation, messages, user_identifier = turn.conversation, turn.messages, turn.user_identifier
+        cache_message = turn.cache_message
+        system_prompt = messages[0]["content"]
+        if cache_message is not None:
+            cached = get_response_cache().lookup(cache_message, system_prompt, self.llm_service.model)
+            if cached is not None:
+                logger.info(f"User {user_identifier}: served from response cache")
+                conversation.add_message("assistant", cached.response)
+                await get_conversation_store().commit(user_identifier, conversation)
+                if stream:
+                    yield _event("token", delta=cached.response)
+                yield _event("done", response=cached)
+                return
+
+        # While the MCP server is down, answer without tools instead of waiting on tool timeouts
+        degraded = not self.health_monitor.breaker("mcp").allow()
+        if degraded:
+            logger.warning(f"User {user_identifier}: MCP server unavailable, answering without tools")
+            tools = []
+            messages.append({"role": "system", "content": TOOLS_UNAVAILABLE_NOTE})
+        else:
+            tools = await self.get_available_tools()
+
+        # Track tool calls, token usage and per-round timings
+        tool_calls_data: list[ToolCall] = []
+        usage = Usage()
+        rounds: list[RoundStats] = []
+        response_text: Optional[str] = None
+        deadline = time.monotonic() + settings.TURN_DEADLINE_SECONDS
+        events: asyncio.Queue = asyncio.Queue()
+        prefetch: Optional[TurnPrefetch] = None
+        round_tools: Optional[list[dict]] = None
+
+        try:
+            for round_index in range(settings.MAX_TOOL_ROUNDS + 1):
+                # Once rounds or tokens are spent, the model must answer without calling tools
+                final_pass = (
+                    round_index == settings.MAX_TOOL_ROUNDS
+                    or usage.total_tokens >= settings.TURN_TOKEN_BUDGET
+                )
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(f"User {user_identifier}: turn deadline reached after {round_index} rounds")
+                    break
+
+                tokens_saved = 0
+                tool_choice = "auto"
+                if final_pass:
+                    # Keep the previous round's schemas: some providers reject tool
+                    # messages in a request that carries no tool definitions
+                    tool_choice = "none"
+                else:
+                    selection = self.tool_selector.select(tools, messages, conversation.verified)
+                    round_tools, tokens_saved = selection.tools, selection.tokens_saved
+                    TOOL_TOKENS_SAVED.inc(tokens_saved)
+                    if round_index == 0 and round_tools:
+                        # Likely read-only lookups run while the model decides which tools to call
+                        prefetch = self.prefetcher.start(turn.user_message, round_tools, conversation.verified)
+
+                llm_started = time.perf_counter()
                 try:
-                    function_args = json.loads(tool_call.function.arguments)
-                except json.JSONDecodeError:
-                    function_args = {}
-
-                logger.info(f"Executing tool: {function_name} with args: {function_args}")
+                    if stream:
+                        accumulator = StreamAccumulator()
+                        async for delta in self._stream_completion(
+                            messages, round_tools, deadline, accumulator,
+                            user=user_identifier, tool_choice=tool_choice,
+                        ):
+                            yield _event("token", delta=delta)
+                        assistant_message, round_usage = accumulator.message, accumulator.usage
+                    else:
+                        llm_response = await asyncio.wait_for(
+                            self.llm_service.chat(
+                                messages, tools=round_tools, user=user_identifier, tool_choice=tool_choice
+                            ),
+                            timeout=remaining,
+                        )
+                        assistant_message, round_usage = llm_response.choices[0].message, llm_response.usage
+                except asyncio.TimeoutError:
+                    logger.warning(f"User {user_identifier}: LLM call exceeded turn deadline")
+                    break
+                llm_elapsed = time.perf_counter() - llm_started
+                stats = RoundStats(
+                    round=round_index + 1,
+                    llm_ms=llm_elapsed * 1000,
+                    tools_offered=len(round_tools or []),
+                    tool_tokens_saved=tokens_saved,
+                )
+                rounds.append(stats)
+                usage.add(round_usage)
+                record_usage(round_usage)
+                answered = final_pass or not assistant_message.tool_calls
+                LLM_CALL_SECONDS.labels(
+                    "first" if round_index == 0 else "final" if answered else "intermediate"
+                ).observe(llm_elapsed)
+
+                if answered:
+                    response_text = assistant_message.content
+                    break
+
+                # Add assistant message with tool_calls to history
+                messages.append({
+                    "role": "assistant",
+                    "content": assistant_message.content or "",
+                    "tool_calls": [
+                        {
+                            "id": tool_call.id,
+                            "type": tool_call.type,
+                            "function": {
+                                "name": tool_call.function.name,
+                                "arguments": tool_call.function.arguments,
+                            },
+                        }
+                        for tool_call in assistant_message.tool_calls
+                    ],
+                })
 
-                # Record the tool call
-                tool_calls_data.append(ToolCall(
-                    name=function_name,
-                    arguments=function_args,
+                # Execute tool calls concurrently; results keep tool_call order
+                for tool_call in assistant_message.tool_calls:
+                    tool_calls_data.append(ToolCall(
+                        name=tool_call.function.name,
+                        arguments=self._parse_arguments(tool_call.function.arguments),
+                    ))
+                tools_started = time.perf_counter()
+                tools_task = asyncio.ensure_future(self._execute_tool_calls(
+                    assistant_message.tool_calls,
+                    timeout=min(settings.TOOL_TIMEOUT_SECONDS, max(0.0, deadline - time.monotonic())),
+                    events=events,
+                    offered={tool["function"]["name"] for tool in round_tools or []},
+                    prefetch=prefetch,
                 ))
+                async for event in _drain_events(tools_task, events):
+                    yield event
+                tool_messages = tools_task.result()
+                messages.extend(tool_messages)
+                if not conversation.verified and any(
+                    tool_call.function.name == VERIFY_TOOL and verification_succeeded(tool_message["content"])
+                    for tool_call, tool_message in zip(assistant_message.tool_calls, tool_messages)
+                ):
+                    # Order tools are offered from the next round on
+                    conversation.verified = True
+                    await get_conversation_store().save_verified(user_identifier, conversation)
+                stats.tool_ms = (time.perf_counter() - tools_started) * 1000
+                stats.tool_calls = len(assistant_message.tool_calls)
+        finally:
+            # Also on errors, deadlines and client disconnects
+            if prefetch is not None:
+                prefetch.close()
 
-                # Execute the tool via MCP
-                result = await self.mcp_client.call_tool(function_name, function_args)
-
-                # Add tool result to messages
-                messages.append({
-                    "role": "tool",
-                    "tool_call_id": tool_call.id,
-                    "content": result,
-                })
+        logger.info(
+            f"User {user_identifier}: {len(rounds)} rounds, "
+            f"llm={sum(r.llm_ms for r in rounds):.0f}ms tools={sum(r.tool_ms for r in rounds):.0f}ms "
+            f"tokens={usage.total_tokens}"
+        )
 
-            # Get final response with tool results
-            final_response = await self.llm_service.chat(messages, tools=tools)
-            final_message = final_response.choices[0].message
+        # Save assistant response and commit the turn to the store
+        conversation.add_message("assistant", response_text or "")
+        await get_conversation_store().commit(user_identifier, conversation)
+        self._schedule_summary(turn)
+
+        response = ChatResponse(
+            response=response_text or "I apologize, but I couldn't generate a response.",
+            tool_calls=tool_calls_data if tool_calls_data else None,
+            rounds=rounds,
+            usage=usage,
+            context=turn.context_stats,
+            degraded=degraded,
+        )
+        # Answers built from tool results could outlive those results' TTLs, so only tool-free turns are cached
+        if cache_message is not None and response_text and not degraded and not tool_calls_data:
+            get_response_cache().store(cache_message, system_prompt, self.llm_service.model, response)
+        yield _event("done", response=response)
 
-            # Save assistant response to conversation
-            conversation.add_message("assistant", final_message.content or "")
+    async def chat(
+        self,
+        user_message: str,
+        user_identifier: str,
+        remember: bool = False,
+        clear_history: bool = False,
+        use_response_cache: bool = True,
+    ) -> ChatResponse:
+        """Process a user message and return a response.
 
-            return ChatResponse(
-                response=final_message.content or "I apologize, but I couldn't generate a response.",
-                tool_calls=tool_calls_data if tool_calls_data else None,
+        Args:
+            user_message: The user's message
+            user_identifier: Unique identifier for the user (e.g., IP address)
+            remember: If True, use full conversation history
+            clear_history: If True, clear conversation history before processing
+            use_response_cache: If False, neither read nor fill the response cache (batch runs)
+        """
+        with get_tracer().start_as_current_span("SupportAgent.chat") as span:
+            turn = await self._prepare_turn(
+                user_message, user_identifier, remember, clear_history, use_response_cache
             )
+            async for event in self._run_turn(turn, stream=False):
+                if event["event"] == "done":
+                    _annotate_turn(span, turn, event["data"]["response"])
+                    return event["data"]["response"]
+            raise RuntimeError("Agent turn ended without a response")
 
-        # No tool calls, return direct response
-        # Save assistant response to conversation
-        conversation.add_message("assistant", assistant_message.content or "")
+    async def chat_stream(
+        self,
+        user_message: str,
+        user_identifier: str,
+        remember: bool = False,
+        clear_history: bool = False,
+        use_response_cache: bool = True,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Process a user message, yielding token and tool events as they happen.
 
-        return ChatResponse(
-            response=assistant_message.content or "I apologize, but I couldn't generate a response.",
-        )
+        Takes the same arguments as ``chat``. The last event is ``done`` with
+        the full ``ChatResponse``; the assistant message is committed to the
+        conversation before it is emitted.
+        """
+        with get_tracer().start_as_current_span("SupportAgent.chat_stream") as span:
+            turn = await self._prepare_turn(
+                user_message, user_identifier, remember, clear_history, use_response_cache
+            )
+            async for event in self._run_turn(turn, stream=True):
+                if event["event"] == "done":
+                    _annotate_turn(span, turn, event["data"]["response"])
+                yield event
+
+
+def _event(event_type: str, /, **data: Any) -> dict[str, Any]:
+    """Build an agent event."""
+    return {"event": event_type, "data": data}
+
+
+def _annotate_turn(span: Any, turn: "TurnState", response: ChatResponse) -> None:
+    """Record a finished turn's shape on its span."""
+    span.set_attributes({
+        "chat.history_messages": turn.context_stats.history_messages,
+        "chat.estimated_prompt_tokens": turn.context_stats.estimated_prompt_tokens,
+        "chat.rounds": len(response.rounds or []),
+        "chat.tool_calls": len(response.tool_calls or []),
+        "chat.tool_tokens_saved": sum(r.tool_tokens_saved for r in response.rounds or []),
+        "chat.cached": response.cached,
+        "chat.degraded": response.degraded,
+    })
+
+
+async def _drain_events(task: asyncio.Future, events: asyncio.Queue) -> AsyncIterator[dict[str, Any]]:
+    """Yield queued events until ``task`` finishes, then flush the rest."""
+    while not task.done():
+        getter = asyncio.ensure_future(events.get())
+        done, _ = await asyncio.wait({task, getter}, return_when=asyncio.FIRST_COMPLETED)
+        if getter in done:
+            yield getter.result()
+        else:
+            getter.cancel()
+    while not events.empty():
+        yield events.get_nowait()
+
+
+@dataclass
+class TurnState:
+    """Everything one chat turn needs after its history has been prepared."""
+    user_identifier: str
+    user_message: str
+    conversation: Conversation
+    messages: list[dict]
+    context: BuiltContext
+    context_stats: ContextStats
+    # The user message if this turn may be served from the response cache
+    cache_message: Optional[str] = None
 
 
 # Global agent instance
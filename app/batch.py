@@ -0,0 +1,181 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, List, Optional, Sequence, Union
+
+from app.admission import AdmissionController
+from app.agent import SupportAgent
+from app.conversation_store import get_conversation_store
+from app.models import BatchConversation, BatchResult, BatchSummary, BatchTurn, ChatResponse, Usage
+
+logger = logging.getLogger(__name__)
+
+
+def parse_conversation(record: Any, line_number: int) -> Optional[BatchConversation]:
+    """Turn one JSONL record into a conversation, or None if it carries no message.
+
+    Accepts ``{"id", "messages": [...]}`` (strings, or chat message dicts
+    whose user contents are used), a record with a ``message``, ``body`` or
+    ``title`` field (so backlog-style ``requests.jsonl`` files work), or a
+    bare string. The ID defaults to ``id``, then ``request_id``, then the
+    line number.
+    """
+    if isinstance(record, str):
+        return BatchConversation(id=str(line_number), messages=[record]) if record.strip() else None
+    if not isinstance(record, dict):
+        return None
+    messages = record.get("messages")
+    if isinstance(messages, list):
+        messages = [
+            str(message["content"]) if isinstance(message, dict) else str(message)
+            for message in messages
+            if not isinstance(message, dict) or message.get("role", "user") == "user"
+        ]
+    else:
+        text = record.get("message") or record.get("body") or record.get("title")
+        messages = [str(text)] if text else []
+    if not messages:
+        return None
+    return BatchConversation(
+        id=str(record.get("id") or record.get("request_id") or line_number),
+        messages=messages,
+        remember=bool(record.get("remember", False)),
+    )
+
+
+def load_conversations(path: Union[str, Path]) -> List[BatchConversation]:
+    """Read conversations from a JSONL file (plain-text lines are single messages)."""
+    conversations = []
+    for line_number, line in enumerate(Path(path).read_text(encoding="utf-8").splitlines(), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            record = line
+        conversation = parse_conversation(record, line_number)
+        if conversation is not None:
+            conversations.append(conversation)
+    if not conversations:
+        raise ValueError(f"No conversations found in {path}")
+    return conversations
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q / 100))]
+
+
+class BatchRunner:
+    """Runs many independent conversations through the agent, a few at a time.
+
+    Each conversation gets its own identifier, unique to the batch, so it
+    has its own history and verification state and cannot see a real
+    user's. Its messages are sent in order, and its conversation is deleted
+    when it finishes. At most ``concurrency`` conversations run at once.
+    With an ``admission`` controller, each turn is admitted through its
+    lower-priority batch lane, so batches share capacity with interactive
+    traffic instead of adding to it. Batch turns never read or fill the
+    response cache. Results are yielded as conversations finish, followed
+    by a summary.
+    """
+
+    def __init__(self, agent: SupportAgent, concurrency: int = 8, admission: Optional[AdmissionController] = None):
+        self.agent = agent
+        self.concurrency = max(1, concurrency)
+        self.admission = admission
+
+    async def _turn(self, message: str, identifier: str, remember: bool) -> ChatResponse:
+        if self.admission is None:
+            return await self.agent.chat(message, identifier, remember=remember, use_response_cache=False)
+        async with await self.admission.admit_batch(identifier):
+            return await self.agent.chat(message, identifier, remember=remember, use_response_cache=False)
+
+    async def run_conversation(self, index: int, conversation: BatchConversation, identifier: str) -> BatchResult:
+        """Send one conversation's messages in order, stopping at the first failure."""
+        turns: List[BatchTurn] = []
+        usage = Usage()
+        error = None
+        started = time.perf_counter()
+        try:
+            for message in conversation.messages:
+                turn_started = time.perf_counter()
+                response = await self._turn(message, identifier, conversation.remember)
+                turns.append(BatchTurn(
+                    message=message,
+                    response=response.response,
+                    tool_calls=response.tool_calls,
+                    latency_ms=round((time.perf_counter() - turn_started) * 1000, 1),
+                    usage=response.usage,
+                    cached=response.cached,
+                    degraded=response.degraded,
+                ))
+                usage.merge(response.usage)
+        except Exception as e:
+            error = f"{e.__class__.__name__}: {e}"
+            logger.warning(f"Batch conversation {conversation.id or index} failed after {len(turns)} turns: {error}")
+        finally:
+            try:
+                await get_conversation_store().delete(identifier)
+            except Exception as e:
+                logger.warning(f"Could not delete batch conversation {identifier}: {e}")
+        return BatchResult(
+            index=index,
+            id=conversation.id,
+            ok=error is None,
+            turns=turns,
+            latency_ms=round((time.perf_counter() - started) * 1000, 1),
+            usage=usage,
+            error=error,
+        )
+
+    async def run(self, conversations: Sequence[BatchConversation]) -> AsyncIterator[Union[BatchResult, BatchSummary]]:
+        """Run every conversation, yielding each result as it finishes and then a ``BatchSummary``.
+
+        Closing the iterator early cancels the conversations still running.
+        """
+        batch_id = uuid.uuid4().hex[:12]
+        pending = iter(enumerate(conversations))
+        results: asyncio.Queue = asyncio.Queue()
+
+        async def worker() -> None:
+            for index, conversation in pending:
+                await results.put(await self.run_conversation(index, conversation, f"batch:{batch_id}:{index}"))
+
+        started = time.perf_counter()
+        workers = [asyncio.create_task(worker()) for _ in range(min(self.concurrency, len(conversations)))]
+        logger.info(f"Batch {batch_id}: {len(conversations)} conversations, concurrency {len(workers)}")
+        latencies = []
+        usage = Usage()
+        failed = 0
+        try:
+            for _ in range(len(conversations)):
+                result: BatchResult = await results.get()
+                latencies.append(result.latency_ms)
+                usage.merge(result.usage)
+                if not result.ok:
+                    failed += 1
+                yield result
+        finally:
+            for task in workers:
+                task.cancel()
+        latencies.sort()
+        summary = BatchSummary(
+            conversations=len(conversations),
+            succeeded=len(conversations) - failed,
+            failed=failed,
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+            p50_ms=_percentile(latencies, 50),
+            p95_ms=_percentile(latencies, 95),
+            usage=usage,
+        )
+        logger.info(
+            f"Batch {batch_id}: {summary.succeeded}/{summary.conversations} succeeded "
+            f"in {summary.elapsed_ms:.0f}ms, {usage.total_tokens} tokens"
+        )
+        yield summary
@@ -13,16 +13,166 @@ class Settings(BaseSettings):
     OPENROUTER_BASE_URL: str = "https://openrouter.ai/api/v1"
     MODEL_NAME: str = "openai/gpt-4o-mini"
 
+    # Model Routing: cheap calls go to MODEL_FAST_NAME (empty = MODEL_NAME)
+    MODEL_FAST_NAME: str = ""
+    # Tried in order after the routed model and MODEL_NAME time out or are overloaded
+    MODEL_FALLBACK_NAMES: list[str] = []
+    # User messages up to this length (e.g. greetings) use the fast model
+    MODEL_ROUTE_SHORT_MESSAGE_CHARS: int = 80
+    # Time a model gets to respond before the next one is tried
+    MODEL_FALLBACK_TIMEOUT_SECONDS: float = 15.0
+
     # MCP Server Configuration
     MCP_SERVER_URL: str = "https://vipfapwm3x.us-east-1.awsapprunner.com/mcp"
 
+    # MCP Session Pool
+    MCP_POOL_SIZE: int = 4
+    MCP_POOL_WARM_SESSIONS: int = 1
+    MCP_POOL_PING_INTERVAL_SECONDS: float = 30.0
+    MCP_CONNECT_TIMEOUT_SECONDS: float = 10.0
+    MCP_REQUEST_TIMEOUT_SECONDS: float = 30.0
+    # Tools with side effects; never retried automatically
+    MCP_MUTATING_TOOLS: list[str] = ["create_order"]
+
+    # Conversation Storage: "memory", "sqlite" or "redis"
+    CONVERSATION_BACKEND: str = "memory"
+    CONVERSATION_SQLITE_PATH: str = "data/conversations.db"
+    CONVERSATION_REDIS_URL: str = "redis://localhost:6379/0"
+    CONVERSATION_MAX: int = 1000
+    CONVERSATION_STALE_MINUTES: int = 30
+    CONVERSATION_SWEEP_INTERVAL_SECONDS: float = 60.0
+    # Independently locked partitions of the in-memory store
+    CONVERSATION_SHARDS: int = 16
+
+    # Sessions: signed session IDs key conversations; the client address is the fallback
+    SESSION_SECRET: str = ""
+    SESSION_COOKIE_NAME: str = "chat_session"
+    SESSION_HEADER_NAME: str = "X-Session-ID"
+    SESSION_MAX_AGE_SECONDS: int = 7 * 24 * 3600
+    SESSION_COOKIE_SECURE: bool = False
+    # Proxies in front of the app whose X-Forwarded-For entries are trusted (Render: 1)
+    TRUSTED_PROXY_COUNT: int = 0
+
+    # Response Cache (opt-in, stateless first turns only)
+    RESPONSE_CACHE_ENABLED: bool = False
+    RESPONSE_CACHE_MAX_ENTRIES: int = 512
+    RESPONSE_CACHE_TTL_SECONDS: float = 600.0
+    # Minimum estimated similarity for near-duplicate hits; 0 disables fuzzy matching
+    RESPONSE_CACHE_FUZZY_THRESHOLD: float = 0.0
+
+    # MCP Tool Result Cache
+    TOOL_CACHE_ENABLED: bool = True
+    TOOL_CACHE_MAX_BYTES: int = 8 * 1024 * 1024
+    # Tools without an explicit TTL are not cached unless this is > 0
+    TOOL_CACHE_DEFAULT_TTL_SECONDS: float = 0.0
+    TOOL_CACHE_TTLS: dict[str, float] = {
+        "list_products": 300.0,
+        "get_product": 120.0,
+        "search_products": 120.0,
+    }
+    # Mutating or PII tools; MCP_MUTATING_TOOLS are always excluded as well
+    TOOL_CACHE_NEVER: list[str] = [
+        "verify_customer_pin",
+        "get_customer",
+        "list_orders",
+        "get_order",
+    ]
+
     # Server Configuration
     HOST: str = "0.0.0.0"
     PORT: int = 8000
+    # Finish warm-up before accepting connections instead of in the background
+    WARMUP_BLOCKING: bool = False
+
+    # Static Assets: check UI and welcome files for changes at most this often (0 = never)
+    STATIC_RELOAD_SECONDS: float = 5.0
+    # Browser cache lifetime for the stylesheet; the HTML page and welcome payload always revalidate
+    STATIC_MAX_AGE_SECONDS: int = 300
+
+    # Health Monitor: background probes of the MCP server and LLM provider
+    HEALTH_CHECK_INTERVAL_SECONDS: float = 30.0
+    # Random spread applied to the interval, as a fraction (0.2 = ±20%)
+    HEALTH_CHECK_JITTER: float = 0.2
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = 5.0
+    # Probe interval while a dependency's circuit is open
+    HEALTH_CHECK_RETRY_SECONDS: float = 5.0
+    # Consecutive failures that open a circuit, and seconds before a trial call
+    CIRCUIT_FAILURE_THRESHOLD: int = 2
+    CIRCUIT_RESET_SECONDS: float = 15.0
 
     # LLM Parameters
     TEMPERATURE: float = 0.7
     MAX_TOKENS: int = 700
 
+    # LLM HTTP Client
+    LLM_HTTP2: bool = True
+    LLM_MAX_CONNECTIONS: int = 50
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+    LLM_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    LLM_READ_TIMEOUT_SECONDS: float = 60.0
+    LLM_POOL_TIMEOUT_SECONDS: float = 10.0
+    LLM_MAX_RETRIES: int = 3
+    LLM_RETRY_BASE_BACKOFF_SECONDS: float = 0.5
+    LLM_RETRY_MAX_BACKOFF_SECONDS: float = 8.0
+    LLM_RETRY_DEADLINE_SECONDS: float = 30.0
+
+    # LLM Rate Limits (0 = learn from x-ratelimit-* response headers)
+    LLM_RPM_LIMIT: float = 0
+    LLM_TPM_LIMIT: float = 0
+    # Seconds of unused budget that may be spent in one burst
+    LLM_RATE_BURST_SECONDS: float = 10.0
+
+    # Tool Catalog: background refresh of the MCP tool list
+    TOOL_CATALOG_REFRESH_SECONDS: float = 300.0
+    # Retry interval after a failed refresh (or before the first success)
+    TOOL_CATALOG_RETRY_SECONDS: float = 10.0
+
+    # Tool Selection: offer each LLM call only the tools the conversation can use
+    TOOL_PRUNING_ENABLED: bool = True
+    # Offered once recent user messages mention an account, order or email
+    TOOL_ACCOUNT_TOOLS: list[str] = ["get_customer", "verify_customer_pin"]
+    # Hidden until verify_customer_pin succeeds in the conversation
+    TOOL_VERIFIED_TOOLS: list[str] = ["list_orders", "get_order", "create_order"]
+
+    # Tool Execution
+    TOOL_CONCURRENCY: int = 4
+    TOOL_TIMEOUT_SECONDS: float = 20.0
+
+    # Speculative Prefetch (opt-in): start likely read-only lookups alongside the first LLM call
+    PREFETCH_ENABLED: bool = False
+    PREFETCH_MAX_CALLS: int = 3
+    # Entities in the user message that trigger get_product and (once verified) get_order prefetches
+    PREFETCH_SKU_PATTERN: str = r"\b(?!ORD-)[A-Z]{2,5}-\d{3,6}\b"
+    PREFETCH_ORDER_PATTERN: str = r"\bORD-\d{3,10}\b"
+
+    # Conversation Context (estimated tokens for summary + history)
+    CONTEXT_TOKEN_BUDGET: int = 1500
+    CONTEXT_TOKEN_BUDGET_REMEMBER: int = 6000
+
+    # Agent Turn Budgets
+    MAX_TOOL_ROUNDS: int = 4
+    TURN_DEADLINE_SECONDS: float = 60.0
+    TURN_TOKEN_BUDGET: int = 16000
+
+    # Admission Control: concurrent turns, queued turns and queue wait
+    ADMISSION_MAX_CONCURRENT: int = 32
+    ADMISSION_MAX_QUEUE: int = 64
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 10.0
+    # Requests one user may queue behind their running turn before a 429
+    USER_MAX_QUEUED_REQUESTS: int = 2
+
+    # Batch Chat: /v1/chat/batch (disabled until BATCH_API_KEY is set) and run_batch.py
+    BATCH_API_KEY: str = ""
+    # Per batch, and for the admission controller's batch lane across all batches
+    BATCH_MAX_CONCURRENCY: int = 8
+    BATCH_MAX_CONVERSATIONS: int = 1000
+
+    # Tracing: "none", "memory" or "jsonl"; request IDs are always assigned
+    TRACE_EXPORTER: str = "none"
+    TRACE_SAMPLE_RATE: float = 1.0
+    TRACE_JSONL_PATH: str = "data/traces.jsonl"
+    TRACE_MEMORY_MAX_SPANS: int = 1000
+
 
 settings = Settings()
@@ -0,0 +1,86 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from app.conversation_store import Conversation, Message
+
+logger = logging.getLogger(__name__)
+
+# Fixed per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+try:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("o200k_base")
+
+    def estimate_tokens(text: str) -> int:
+        """Count tokens with the local tiktoken encoding."""
+        return len(_encoding.encode(text, disallowed_special=()))
+except Exception:  # tiktoken is optional
+    def estimate_tokens(text: str) -> int:
+        """Estimate tokens as roughly four characters per token."""
+        return (len(text) + 3) // 4
+
+
+def estimate_message_tokens(content: str) -> int:
+    """Estimate the prompt tokens of one chat message."""
+    return estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+def summary_message(summary: str) -> Dict[str, str]:
+    """The system message carrying a conversation's rolling summary."""
+    return {"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"}
+
+
+@dataclass
+class BuiltContext:
+    """History selected for one request."""
+    messages: List[Dict[str, str]]
+    history_messages: int
+    estimated_tokens: int
+    # Unsummarized messages that did not fit and should be folded into the summary
+    overflow: List[Message] = field(default_factory=list)
+    # Absolute index just past the last overflow message
+    overflow_end: int = 0
+
+
+def build_context(conversation: Conversation, token_budget: int) -> BuiltContext:
+    """Select recent history that fits ``token_budget``, newest first.
+
+    Messages already folded into the rolling summary are replaced by the
+    summary. The latest message is always included, even if it alone
+    exceeds the budget.
+
+    Args:
+        conversation: The user's conversation
+        token_budget: Token budget for summary plus history
+
+    Returns:
+        The selected messages and any overflow to summarize
+    """
+    summary_tokens = estimate_message_tokens(conversation.summary) if conversation.summary else 0
+    used = summary_tokens
+    first_index = conversation.first_index
+    # Oldest retained message not yet covered by the summary
+    start = max(0, conversation.summarized_count - first_index)
+
+    retained = conversation.messages
+    cut = len(retained)
+    for position in range(len(retained) - 1, start - 1, -1):
+        tokens = estimate_message_tokens(retained[position].content)
+        if cut < len(retained) and used + tokens > token_budget:
+            break
+        used += tokens
+        cut = position
+    history = conversation.get_history(limit=len(retained) - cut)
+
+    messages = [summary_message(conversation.summary)] if conversation.summary else []
+    messages.extend(history)
+    return BuiltContext(
+        messages=messages,
+        history_messages=len(history),
+        estimated_tokens=used,
+        overflow=[retained[position] for position in range(start, cut)],
+        overflow_end=first_index + cut,
+    )
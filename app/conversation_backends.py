@@ -0,0 +1,396 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.conversation_store import Conversation, ConversationBackend, Message
+
+logger = logging.getLogger(__name__)
+
+# Messages kept per conversation when loading (matches the in-memory deque)
+MAX_LOADED_MESSAGES = 50
+
+# Upper bound for open-ended sequence ranges
+MAX_SEQ = 2 ** 62
+
+
+def _to_message(role: str, content: str, created_at: float) -> Message:
+    return Message(role=role, content=content, timestamp=int(created_at))
+
+
+def _build_conversation(
+    messages: List[Message],
+    total_messages: int,
+    summary: str = "",
+    summarized_count: int = 0,
+    verified: bool = False,
+) -> Conversation:
+    conversation = Conversation()
+    conversation.messages.extend(messages)
+    conversation.total_messages = max(total_messages, len(messages))
+    conversation.summary = summary
+    conversation.summarized_count = summarized_count
+    conversation.verified = verified
+    if messages:
+        conversation.created_at = messages[0].timestamp
+        conversation.last_activity = messages[-1].timestamp
+    return conversation
+
+
+class SQLiteConversationStore(ConversationBackend):
+    """SQLite (WAL mode) conversation store shared by all workers on a host.
+
+    Messages are appended in one transaction per turn with sequence numbers
+    assigned inside SQLite, so concurrent writers never collide. Queries run
+    in a worker thread to keep the event loop free. A conversation expires
+    as a whole after the stale timeout without activity; a background
+    sweeper deletes expired conversations so the file does not grow without
+    bound.
+    """
+
+    def __init__(self, path: str, stale_timeout_minutes: int = 30, sweep_interval_seconds: float = 60.0):
+        self.path = path
+        self.stale_timeout_minutes = stale_timeout_minutes
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self._sweeper: Optional[asyncio.Task] = None
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS messages (
+                identifier TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (identifier, seq)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS messages_created_at ON messages (created_at)")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS summaries (
+                identifier TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                summarized_count INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS verifications (
+                identifier TEXT PRIMARY KEY,
+                verified_at REAL NOT NULL
+            )
+            """
+        )
+        self.batches_written = 0
+        self.messages_written = 0
+        self.swept_conversations = 0
+        self.swept_messages = 0
+
+    def _min_created_at(self) -> float:
+        return time.time() - self.stale_timeout_minutes * 60
+
+    def _load(self, identifier: str) -> Conversation:
+        with self._lock:
+            last_activity, last_seq = self._conn.execute(
+                "SELECT MAX(created_at), MAX(seq) FROM messages WHERE identifier = ?", (identifier,)
+            ).fetchone()
+            if last_activity is not None and last_activity < self._min_created_at():
+                # Inactive past the stale timeout: the conversation expires as a whole
+                self._delete_locked(identifier)
+                return Conversation()
+            rows = self._conn.execute(
+                "SELECT role, content, created_at FROM messages "
+                "WHERE identifier = ? ORDER BY seq DESC LIMIT ?",
+                (identifier, MAX_LOADED_MESSAGES),
+            ).fetchall()
+            summary_row = self._conn.execute(
+                "SELECT summary, summarized_count FROM summaries WHERE identifier = ?",
+                (identifier,),
+            ).fetchone()
+            verified = self._conn.execute(
+                "SELECT 1 FROM verifications WHERE identifier = ? AND (? OR verified_at >= ?)",
+                (identifier, last_activity is not None, self._min_created_at()),
+            ).fetchone() is not None
+        messages = [_to_message(*row) for row in reversed(rows)]
+        # Sequence numbers are absolute message indexes
+        total_messages = last_seq + 1 if last_seq is not None else 0
+        summary, summarized_count = summary_row or ("", 0)
+        return _build_conversation(messages, total_messages, summary, summarized_count, verified)
+
+    def _save_summary(self, identifier: str, summary: str, summarized_count: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO summaries (identifier, summary, summarized_count) VALUES (?, ?, ?) "
+                "ON CONFLICT(identifier) DO UPDATE SET "
+                "summary = excluded.summary, summarized_count = excluded.summarized_count",
+                (identifier, summary, summarized_count),
+            )
+
+    def _save_verified(self, identifier: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO verifications (identifier, verified_at) VALUES (?, ?)",
+                (identifier, time.time()),
+            )
+
+    def _append(self, identifier: str, messages: List[Message]) -> None:
+        rows = [
+            (identifier, identifier, msg.role, msg.content, msg.timestamp)
+            for msg in messages
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO messages (identifier, seq, role, content, created_at) VALUES "
+                    "(?, (SELECT COALESCE(MAX(seq), -1) + 1 FROM messages WHERE identifier = ?), ?, ?, ?)",
+                    rows,
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.batches_written += 1
+        self.messages_written += len(rows)
+
+    def _delete_locked(self, identifier: str) -> int:
+        deleted = self._conn.execute("DELETE FROM messages WHERE identifier = ?", (identifier,)).rowcount
+        self._conn.execute("DELETE FROM summaries WHERE identifier = ?", (identifier,))
+        self._conn.execute("DELETE FROM verifications WHERE identifier = ?", (identifier,))
+        return deleted
+
+    def _delete(self, identifier: str) -> bool:
+        with self._lock:
+            return self._delete_locked(identifier) > 0
+
+    def sweep_stale(self) -> int:
+        """Delete conversations with no activity within the stale timeout.
+
+        A conversation expires as a whole once its newest message is older
+        than the cutoff, like the memory and Redis backends; its summary and
+        verification go with it.
+
+        Returns:
+            Number of conversations removed
+        """
+        cutoff = self._min_created_at()
+        # The created_at index narrows the scan to conversations holding an old message
+        stale = (
+            "SELECT identifier FROM messages WHERE identifier IN "
+            "(SELECT DISTINCT identifier FROM messages WHERE created_at < ?) "
+            "GROUP BY identifier HAVING MAX(created_at) < ?"
+        )
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                removed = self._conn.execute(f"SELECT COUNT(*) FROM ({stale})", (cutoff, cutoff)).fetchone()[0]
+                messages = self._conn.execute(
+                    f"DELETE FROM messages WHERE identifier IN ({stale})", (cutoff, cutoff)
+                ).rowcount
+                self._conn.execute(
+                    "DELETE FROM summaries WHERE identifier NOT IN (SELECT DISTINCT identifier FROM messages)"
+                )
+                # Verifications recorded before the conversation's first commit are kept until stale
+                self._conn.execute(
+                    "DELETE FROM verifications WHERE verified_at < ? "
+                    "AND identifier NOT IN (SELECT DISTINCT identifier FROM messages)",
+                    (cutoff,),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.swept_conversations += removed
+        self.swept_messages += messages
+        if removed:
+            logger.info(f"Cleaned up {removed} stale conversations ({messages} messages)")
+        return removed
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval_seconds)
+            try:
+                await asyncio.to_thread(self.sweep_stale)
+            except Exception as e:
+                logger.error(f"Conversation sweep failed: {e}")
+
+    async def start(self) -> None:
+        """Start the background expiry sweeper."""
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    def _range(self, identifier: str, start: int, stop: Optional[int]) -> List[Message]:
+        with self._lock:
+            if start >= 0 and (stop is None or stop >= 0):
+                # Non-negative bounds map directly onto sequence numbers
+                rows = self._conn.execute(
+                    "SELECT role, content, created_at FROM messages "
+                    "WHERE identifier = ? AND seq >= ? AND seq < ? ORDER BY seq",
+                    (identifier, start, stop if stop is not None else MAX_SEQ),
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT role, content, created_at FROM messages WHERE identifier = ? ORDER BY seq",
+                    (identifier,),
+                ).fetchall()[start:stop]
+        return [_to_message(*row) for row in rows]
+
+    async def load(self, identifier: str) -> Conversation:
+        """Load the most recent messages of an identifier's conversation, unless it has gone stale."""
+        return await asyncio.to_thread(self._load, identifier)
+
+    async def commit(self, identifier: str, conversation: Conversation) -> None:
+        """Append the conversation's pending messages in one transaction."""
+        pending = conversation.drain_pending()
+        if pending:
+            await asyncio.to_thread(self._append, identifier, pending)
+
+    async def delete(self, identifier: str) -> bool:
+        """Delete all messages for an identifier."""
+        return await asyncio.to_thread(self._delete, identifier)
+
+    async def save_summary(self, identifier: str, conversation: Conversation) -> None:
+        """Upsert the conversation's rolling summary."""
+        await asyncio.to_thread(
+            self._save_summary, identifier, conversation.summary, conversation.summarized_count
+        )
+
+    async def save_verified(self, identifier: str, conversation: Conversation) -> None:
+        """Record the verification; it expires with the conversation."""
+        await asyncio.to_thread(self._save_verified, identifier)
+
+    async def get_messages(self, identifier: str, start: int = 0, stop: Optional[int] = None) -> List[Message]:
+        """Read a range of messages by sequence number, oldest first."""
+        return await asyncio.to_thread(self._range, identifier, start, stop)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get write and sweep statistics."""
+        return {
+            "batches_written": self.batches_written,
+            "messages_written": self.messages_written,
+            "swept_conversations": self.swept_conversations,
+            "swept_messages": self.swept_messages,
+        }
+
+    async def close(self) -> None:
+        """Stop the sweeper and close the database connection."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        with self._lock:
+            self._conn.close()
+
+
+class RedisConversationStore(ConversationBackend):
+    """Conversation store on any Redis-protocol server.
+
+    Each conversation is a list of JSON-encoded messages. A turn's messages
+    are appended with a single pipelined RPUSH/LTRIM/EXPIRE, and the key
+    expires after the stale timeout. Requires the optional ``redis`` package.
+    """
+
+    def __init__(self, url: str, stale_timeout_minutes: int = 30, key_prefix: str = "andela_bot:conv:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("CONVERSATION_BACKEND=redis requires the 'redis' package") from e
+        self.client = redis.Redis.from_url(url)
+        self.stale_timeout_seconds = stale_timeout_minutes * 60
+        self.key_prefix = key_prefix
+        self.batches_written = 0
+        self.messages_written = 0
+
+    def _key(self, identifier: str) -> str:
+        return f"{self.key_prefix}{identifier}"
+
+    def _meta_key(self, identifier: str) -> str:
+        return f"{self.key_prefix}{identifier}:meta"
+
+    @staticmethod
+    def _decode(raw: bytes) -> Message:
+        role, content, created_at = json.loads(raw)
+        return _to_message(role, content, created_at)
+
+    async def load(self, identifier: str) -> Conversation:
+        """Load the most recent messages and summary for an identifier."""
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.lrange(self._key(identifier), -MAX_LOADED_MESSAGES, -1)
+            pipe.hgetall(self._meta_key(identifier))
+            raw, meta = await pipe.execute()
+        return _build_conversation(
+            [self._decode(item) for item in raw],
+            total_messages=int(meta.get(b"total", 0)),
+            summary=meta.get(b"summary", b"").decode("utf-8"),
+            summarized_count=int(meta.get(b"summarized_count", 0)),
+            verified=meta.get(b"verified") == b"1",
+        )
+
+    async def commit(self, identifier: str, conversation: Conversation) -> None:
+        """Append pending messages and refresh the key's expiry."""
+        pending = conversation.drain_pending()
+        if not pending:
+            return
+        key = self._key(identifier)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.rpush(key, *(
+                json.dumps([msg.role, msg.content, msg.timestamp])
+                for msg in pending
+            ))
+            pipe.ltrim(key, -MAX_LOADED_MESSAGES, -1)
+            pipe.expire(key, self.stale_timeout_seconds)
+            pipe.hincrby(self._meta_key(identifier), "total", len(pending))
+            pipe.expire(self._meta_key(identifier), self.stale_timeout_seconds)
+            await pipe.execute()
+        self.batches_written += 1
+        self.messages_written += len(pending)
+
+    async def delete(self, identifier: str) -> bool:
+        """Delete a conversation."""
+        return bool(await self.client.delete(self._key(identifier), self._meta_key(identifier)))
+
+    async def save_summary(self, identifier: str, conversation: Conversation) -> None:
+        """Store the rolling summary next to the message list."""
+        await self.client.hset(self._meta_key(identifier), mapping={
+            "summary": conversation.summary,
+            "summarized_count": conversation.summarized_count,
+        })
+
+    async def save_verified(self, identifier: str, conversation: Conversation) -> None:
+        """Flag the verification in the metadata hash, which expires with the conversation."""
+        meta_key = self._meta_key(identifier)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(meta_key, "verified", 1)
+            pipe.expire(meta_key, self.stale_timeout_seconds)
+            await pipe.execute()
+
+    async def get_messages(self, identifier: str, start: int = 0, stop: Optional[int] = None) -> List[Message]:
+        """Read a range of messages (slice semantics), oldest first."""
+        # LRANGE's end index is inclusive
+        end = -1 if stop is None else stop - 1
+        if stop == 0:
+            return []
+        raw = await self.client.lrange(self._key(identifier), start, end)
+        return [self._decode(item) for item in raw]
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get write statistics."""
+        return {
+            "batches_written": self.batches_written,
+            "messages_written": self.messages_written,
+        }
+
+    async def close(self) -> None:
+        """Close the Redis connection pool."""
+        await self.client.aclose()
@@ -1,115 +1,396 @@
+import asyncio
+import itertools
 import logging
-from collections import deque
-from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional
+import math
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from collections.abc import Sequence
+from typing import ClassVar, Dict, Iterator, List, Optional, Union
 from dataclasses import dataclass, field
 
+from app.config import settings
+
 logger = logging.getLogger(__name__)
 
 
-@dataclass
 class Message:
-    """A message in the conversation."""
-    role: str
-    content: str
-    timestamp: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    """A message in the conversation.
+
+    Uses ``__slots__`` and an integer epoch-seconds timestamp to keep the
+    per-message footprint small. Older messages can be zlib-compressed in
+    place with ``compress``; ``content`` transparently decompresses.
+    """
+
+    __slots__ = ("role", "_body", "timestamp")
+
+    def __init__(self, role: str, content: str, timestamp: Optional[int] = None):
+        self.role = role
+        self._body: Union[str, bytes] = content
+        self.timestamp = int(time.time()) if timestamp is None else int(timestamp)
+
+    @property
+    def content(self) -> str:
+        """The message text."""
+        body = self._body
+        return body if isinstance(body, str) else zlib.decompress(body).decode("utf-8")
+
+    @property
+    def compressed(self) -> bool:
+        """True if the body is stored compressed."""
+        return isinstance(self._body, bytes)
+
+    def compress(self, min_chars: int) -> None:
+        """Compress the body if it is at least ``min_chars`` long and it pays off."""
+        body = self._body
+        if isinstance(body, bytes) or len(body) < min_chars:
+            return
+        packed = zlib.compress(body.encode("utf-8"), 6)
+        if len(packed) < len(body):
+            self._body = packed
+
+    def as_dict(self) -> Dict[str, str]:
+        """The message as an OpenAI chat message dict."""
+        return {"role": self.role, "content": self.content}
+
+    def __repr__(self) -> str:
+        return f"Message(role={self.role!r}, content={self.content!r}, timestamp={self.timestamp})"
+
+
+class HistoryView(Sequence):
+    """Read-only view over the tail of a conversation's messages.
+
+    Nothing is copied when the view is created; message dicts are built
+    lazily as the view is iterated or indexed.
+    """
+
+    __slots__ = ("_messages", "_start")
+
+    def __init__(self, messages: deque, start: int):
+        self._messages = messages
+        self._start = start
+
+    def __len__(self) -> int:
+        return len(self._messages) - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        return self._messages[self._start + index].as_dict()
 
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        return (msg.as_dict() for msg in itertools.islice(self._messages, self._start, None))
 
-@dataclass
+
+@dataclass(slots=True)
 class Conversation:
     """A conversation session for a user."""
     messages: deque[Message] = field(default_factory=lambda: deque(maxlen=50))
-    last_activity: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
-    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    last_activity: int = field(default_factory=lambda: int(time.time()))
+    created_at: int = field(default_factory=lambda: int(time.time()))
+    # Messages added since the last commit to a persistent backend
+    pending: List[Message] = field(default_factory=list, repr=False)
+    # Total messages ever added; message i of ``messages`` has absolute
+    # index ``total_messages - len(messages) + i``
+    total_messages: int = 0
+    # Rolling summary of the first ``summarized_count`` messages
+    summary: str = ""
+    summarized_count: int = 0
+    summarizing: bool = field(default=False, repr=False)
+    # Set once verify_customer_pin succeeds; unlocks order tools
+    verified: bool = False
+
+    # Messages this close to the end stay uncompressed
+    HOT_MESSAGES: ClassVar[int] = 10
+    # Older messages at least this long are zlib-compressed
+    COMPRESS_MIN_CHARS: ClassVar[int] = 256
 
     def add_message(self, role: str, content: str) -> None:
         """Add a message to the conversation."""
-        self.messages.append(Message(role=role, content=content))
-        self.last_activity = datetime.now(timezone.utc)
+        message = Message(role=role, content=content)
+        self.messages.append(message)
+        self.pending.append(message)
+        self.total_messages += 1
+        self.last_activity = message.timestamp
+        # Compress the message that just left the hot window
+        if len(self.messages) > self.HOT_MESSAGES:
+            self.messages[-self.HOT_MESSAGES - 1].compress(self.COMPRESS_MIN_CHARS)
+
+    @property
+    def first_index(self) -> int:
+        """Absolute index of the oldest retained message."""
+        return self.total_messages - len(self.messages)
+
+    def drain_pending(self) -> List[Message]:
+        """Return and clear the messages not yet committed."""
+        pending, self.pending = self.pending, []
+        return pending
 
-    def get_history(self, limit: Optional[int] = None, include_all: bool = False) -> List[Dict[str, str]]:
-        """Get conversation history as a list of message dicts.
+    def get_history(self, limit: Optional[int] = None, include_all: bool = False) -> HistoryView:
+        """Get conversation history as a view of message dicts.
 
         Args:
             limit: Maximum number of recent messages to include (None for all)
             include_all: If True, include all messages ignoring limit
 
         Returns:
-            List of message dictionaries with 'role' and 'content' keys
+            Sequence of message dictionaries with 'role' and 'content' keys
         """
         if include_all or limit is None:
-            messages = list(self.messages)
+            start = 0
         else:
-            messages = list(self.messages)[-limit:]
-
-        return [
-            {"role": msg.role, "content": msg.content}
-            for msg in messages
-        ]
+            start = max(0, len(self.messages) - limit)
+        return HistoryView(self.messages, start)
 
     def is_stale(self, timeout_minutes: int = 30) -> bool:
         """Check if the conversation is stale (no activity for timeout minutes)."""
-        return datetime.now(timezone.utc) - self.last_activity > timedelta(minutes=timeout_minutes)
+        return time.time() - self.last_activity > timeout_minutes * 60
+
+
+class ConversationBackend(ABC):
+    """Interface for conversation storage backends.
+
+    The agent loads a ``Conversation`` at the start of a turn, adds messages
+    to it, and commits the new messages in one batch at the end of the turn.
+    """
+
+    @abstractmethod
+    async def load(self, identifier: str) -> Conversation:
+        """Load (or start) the conversation for an identifier."""
+
+    @abstractmethod
+    async def commit(self, identifier: str, conversation: Conversation) -> None:
+        """Persist the conversation's pending messages (append-only)."""
+
+    @abstractmethod
+    async def delete(self, identifier: str) -> bool:
+        """Delete a conversation. Returns True if it existed."""
+
+    async def save_summary(self, identifier: str, conversation: Conversation) -> None:
+        """Persist the conversation's rolling summary.
+
+        The in-memory store keeps the ``Conversation`` itself, so the default
+        does nothing.
+        """
+
+    async def save_verified(self, identifier: str, conversation: Conversation) -> None:
+        """Persist that the conversation's customer passed PIN verification.
 
+        Like ``save_summary``, a no-op for the in-memory store.
+        """
+
+    @abstractmethod
+    async def get_messages(self, identifier: str, start: int = 0, stop: Optional[int] = None) -> List[Message]:
+        """Read a range of a conversation's messages, oldest first.
+
+        ``start`` and ``stop`` follow Python slice semantics over the
+        retained history, so ``start=-10`` reads the last ten messages.
+        """
+
+    @abstractmethod
+    def get_stats(self) -> Dict[str, int]:
+        """Get statistics about the backend."""
+
+    async def start(self) -> None:
+        """Start any background maintenance."""
+
+    async def close(self) -> None:
+        """Release backend resources."""
 
-class ConversationStore:
-    """In-memory store for user conversations keyed by IP address."""
 
-    def __init__(self, max_conversations: int = 1000, stale_timeout_minutes: int = 30):
-        self.conversations: Dict[str, Conversation] = {}
+class _Shard:
+    """One partition of the in-memory store: conversations in LRU order, and a lock."""
+
+    __slots__ = ("conversations", "lock", "evicted_capacity", "evicted_stale")
+
+    def __init__(self):
+        self.conversations: OrderedDict[str, Conversation] = OrderedDict()
+        self.lock = threading.Lock()
+        self.evicted_capacity = 0
+        self.evicted_stale = 0
+
+
+class ConversationStore(ConversationBackend):
+    """In-memory store for user conversations keyed by session or IP address.
+
+    This is the default backend. Its ``Conversation`` objects are the
+    storage, so ``commit`` only clears the pending list.
+
+    Conversations are spread over ``shards`` partitions by a hash of their
+    identifier, each with its own lock and its own share of
+    ``max_conversations``. Store operations never await, so on the event
+    loop they are atomic anyway; the locks keep them safe from worker
+    threads without one lock serializing every user. Within a shard,
+    conversations are kept in LRU order: every access moves one to the
+    end, so the least recently active conversation is always first. That
+    makes both capacity eviction and expiry O(1) per removed conversation;
+    expiry runs in a background sweeper task, never on the request path.
+    """
+
+    def __init__(
+        self,
+        max_conversations: int = 1000,
+        stale_timeout_minutes: int = 30,
+        sweep_interval_seconds: float = 60.0,
+        shards: int = 16,
+    ):
+        self.shards = [_Shard() for _ in range(max(1, shards))]
         self.max_conversations = max_conversations
+        self.max_per_shard = max(1, math.ceil(max_conversations / len(self.shards)))
         self.stale_timeout_minutes = stale_timeout_minutes
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def _shard(self, identifier: str) -> _Shard:
+        return self.shards[zlib.crc32(identifier.encode("utf-8")) % len(self.shards)]
 
     def get_or_create_conversation(self, identifier: str) -> Conversation:
-        """Get or create a conversation for the given identifier (IP)."""
-        # Clean up stale conversations periodically
-        if len(self.conversations) > self.max_conversations * 0.8:
-            self._cleanup_stale()
+        """Get or create a conversation for the given identifier."""
+        shard = self._shard(identifier)
+        with shard.lock:
+            conversation = shard.conversations.get(identifier)
+            if conversation is not None:
+                shard.conversations.move_to_end(identifier)
+                return conversation
 
-        if identifier not in self.conversations:
-            self.conversations[identifier] = Conversation()
-            logger.debug(f"Created new conversation for {identifier}")
+            conversation = Conversation()
+            shard.conversations[identifier] = conversation
 
-        return self.conversations[identifier]
+            # Enforce the shard's cap by evicting its least recently used
+            while len(shard.conversations) > self.max_per_shard:
+                shard.conversations.popitem(last=False)
+                shard.evicted_capacity += 1
+        logger.debug(f"Created new conversation for {identifier}")
+        return conversation
 
     def get_conversation(self, identifier: str) -> Optional[Conversation]:
         """Get an existing conversation or None if not found."""
-        return self.conversations.get(identifier)
+        shard = self._shard(identifier)
+        with shard.lock:
+            return shard.conversations.get(identifier)
 
     def delete_conversation(self, identifier: str) -> bool:
         """Delete a conversation. Returns True if it existed."""
-        if identifier in self.conversations:
-            del self.conversations[identifier]
-            logger.debug(f"Deleted conversation for {identifier}")
-            return True
-        return False
-
-    def _cleanup_stale(self) -> None:
-        """Remove stale conversations to free memory."""
-        stale_keys = [
-            key for key, conv in self.conversations.items()
-            if conv.is_stale(self.stale_timeout_minutes)
-        ]
-        for key in stale_keys:
-            del self.conversations[key]
-        if stale_keys:
-            logger.info(f"Cleaned up {len(stale_keys)} stale conversations")
+        shard = self._shard(identifier)
+        with shard.lock:
+            if shard.conversations.pop(identifier, None) is None:
+                return False
+        logger.debug(f"Deleted conversation for {identifier}")
+        return True
+
+    def sweep_stale(self) -> int:
+        """Remove stale conversations from each shard's LRU head.
+
+        Stops at the first conversation in a shard that is still active, so
+        the cost is proportional to the number of conversations removed.
+
+        Returns:
+            Number of conversations removed
+        """
+        removed = 0
+        for shard in self.shards:
+            with shard.lock:
+                conversations = shard.conversations
+                while conversations:
+                    identifier, conversation = next(iter(conversations.items()))
+                    if not conversation.is_stale(self.stale_timeout_minutes):
+                        break
+                    del conversations[identifier]
+                    shard.evicted_stale += 1
+                    removed += 1
+        if removed:
+            logger.info(f"Cleaned up {removed} stale conversations")
+        return removed
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval_seconds)
+            try:
+                self.sweep_stale()
+            except Exception as e:
+                logger.error(f"Conversation sweep failed: {e}")
+
+    async def start(self) -> None:
+        """Start the background expiry sweeper."""
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def close(self) -> None:
+        """Stop the background expiry sweeper."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+
+    async def load(self, identifier: str) -> Conversation:
+        """Get or create the conversation for an identifier."""
+        return self.get_or_create_conversation(identifier)
+
+    async def commit(self, identifier: str, conversation: Conversation) -> None:
+        """Messages already live in memory; just clear the pending list."""
+        conversation.drain_pending()
+
+    async def delete(self, identifier: str) -> bool:
+        """Delete a conversation. Returns True if it existed."""
+        return self.delete_conversation(identifier)
+
+    async def get_messages(self, identifier: str, start: int = 0, stop: Optional[int] = None) -> List[Message]:
+        """Read a range of a conversation's messages, oldest first."""
+        conversation = self.get_conversation(identifier)
+        if conversation is None:
+            return []
+        return list(conversation.messages)[start:stop]
 
     def get_stats(self) -> Dict[str, int]:
         """Get statistics about the store."""
+        sizes = [len(shard.conversations) for shard in self.shards]
         return {
-            "total_conversations": len(self.conversations),
+            "total_conversations": sum(sizes),
             "max_conversations": self.max_conversations,
+            "shards": len(self.shards),
+            "largest_shard": max(sizes),
+            "evicted_capacity": sum(shard.evicted_capacity for shard in self.shards),
+            "evicted_stale": sum(shard.evicted_stale for shard in self.shards),
         }
 
 
 # Global conversation store instance
-_store: Optional[ConversationStore] = None
+_store: Optional[ConversationBackend] = None
 
 
-def get_conversation_store() -> ConversationStore:
-    """Get or create the global conversation store instance."""
+def get_conversation_store() -> ConversationBackend:
+    """Get or create the global conversation store for ``CONVERSATION_BACKEND``."""
     global _store
     if _store is None:
-        _store = ConversationStore()
+        backend = settings.CONVERSATION_BACKEND.lower()
+        if backend == "sqlite":
+            from app.conversation_backends import SQLiteConversationStore
+
+            _store = SQLiteConversationStore(
+                settings.CONVERSATION_SQLITE_PATH,
+                stale_timeout_minutes=settings.CONVERSATION_STALE_MINUTES,
+                sweep_interval_seconds=settings.CONVERSATION_SWEEP_INTERVAL_SECONDS,
+            )
+        elif backend == "redis":
+            from app.conversation_backends import RedisConversationStore
+
+            _store = RedisConversationStore(
+                settings.CONVERSATION_REDIS_URL,
+                stale_timeout_minutes=settings.CONVERSATION_STALE_MINUTES,
+            )
+        elif backend == "memory":
+            _store = ConversationStore(
+                max_conversations=settings.CONVERSATION_MAX,
+                stale_timeout_minutes=settings.CONVERSATION_STALE_MINUTES,
+                sweep_interval_seconds=settings.CONVERSATION_SWEEP_INTERVAL_SECONDS,
+                shards=settings.CONVERSATION_SHARDS,
+            )
+        else:
+            raise ValueError(f"Unknown CONVERSATION_BACKEND: {settings.CONVERSATION_BACKEND}")
+        logger.info(f"Using {backend} conversation store")
     return _store
@@ -0,0 +1,246 @@
+import asyncio
+import contextvars
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Circuit breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class DependencyUnavailableError(Exception):
+    """A request was refused because a dependency's circuit is open."""
+
+    def __init__(self, dependency: str, retry_after: int):
+        super().__init__(f"Dependency {dependency} is unavailable")
+        self.dependency = dependency
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Tracks whether calls to a dependency should be attempted.
+
+    Opens after ``failure_threshold`` consecutive failures. While open,
+    ``allow`` refuses calls; once ``reset_timeout`` has passed it lets one
+    trial call through per ``reset_timeout`` (half-open). Any success
+    closes the circuit again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 2, reset_timeout: float = 15.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+        self._opened_at = 0.0
+        self._trial_at = 0.0
+
+    def record_success(self) -> None:
+        if self.state != CLOSED:
+            logger.info(f"Circuit {self.name} closed")
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.last_error = None
+
+    def record_failure(self, error: str) -> None:
+        self.consecutive_failures += 1
+        self.last_error = error
+        if self.state == HALF_OPEN or (
+            self.state == CLOSED and self.consecutive_failures >= self.failure_threshold
+        ):
+            if self.state == CLOSED:
+                self.trips += 1
+                logger.warning(f"Circuit {self.name} opened after {self.consecutive_failures} failures: {error}")
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead; counts refusals."""
+        if self.state == CLOSED:
+            return True
+        now = time.monotonic()
+        since = now - max(self._opened_at, self._trial_at)
+        if since >= self.reset_timeout:
+            self.state = HALF_OPEN
+            self._trial_at = now
+            return True
+        self.rejected += 1
+        return False
+
+    def retry_after(self) -> int:
+        """Seconds until the next trial call would be allowed."""
+        if self.state == CLOSED:
+            return 0
+        remaining = self.reset_timeout - (time.monotonic() - max(self._opened_at, self._trial_at))
+        return max(1, int(remaining + 0.999))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "trips": self.trips,
+            "rejected": self.rejected,
+            "last_error": self.last_error,
+        }
+
+
+class _Dependency:
+    """Latest probe result for one dependency."""
+
+    __slots__ = ("probe", "breaker", "healthy", "latency_ms", "checked_at", "checks", "failures")
+
+    def __init__(self, probe: Callable[[], Awaitable[Any]], breaker: CircuitBreaker):
+        self.probe = probe
+        self.breaker = breaker
+        # None until the first probe finishes
+        self.healthy: Optional[bool] = None
+        self.latency_ms: Optional[float] = None
+        # Wall-clock time of the last probe
+        self.checked_at: Optional[float] = None
+        self.checks = 0
+        self.failures = 0
+
+
+class HealthMonitor:
+    """Probes dependencies in the background so health reads never wait.
+
+    Each registered probe runs every ``interval`` seconds (±``jitter`` as a
+    fraction, so replicas don't probe in lockstep), or every
+    ``retry_interval`` while its circuit is not closed. A probe raising or
+    exceeding ``timeout`` counts as a failure. Results feed the
+    dependency's ``CircuitBreaker``, which callers consult before doing
+    work that needs the dependency.
+    """
+
+    def __init__(
+        self,
+        interval: float = 30.0,
+        jitter: float = 0.2,
+        timeout: float = 5.0,
+        retry_interval: float = 5.0,
+        failure_threshold: int = 2,
+        reset_timeout: float = 15.0,
+    ):
+        self.interval = interval
+        self.jitter = jitter
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._dependencies: Dict[str, _Dependency] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def register(self, name: str, probe: Callable[[], Awaitable[Any]]) -> None:
+        """Add a dependency probed by ``probe``, which raises when the dependency is down."""
+        breaker = CircuitBreaker(name, self.failure_threshold, self.reset_timeout)
+        self._dependencies[name] = _Dependency(probe, breaker)
+
+    def breaker(self, name: str) -> CircuitBreaker:
+        return self._dependencies[name].breaker
+
+    def healthy(self, name: str) -> Optional[bool]:
+        """Result of the last probe (None before the first one)."""
+        return self._dependencies[name].healthy
+
+    async def check(self, name: str) -> bool:
+        """Probe one dependency now and record the result."""
+        dependency = self._dependencies[name]
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(dependency.probe(), timeout=self.timeout)
+            error = None
+        except asyncio.TimeoutError:
+            error = f"probe timed out after {self.timeout}s"
+        except Exception as e:
+            error = f"{e.__class__.__name__}: {e}"
+        dependency.latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        dependency.checked_at = time.time()
+        dependency.checks += 1
+        if error is None:
+            if dependency.healthy is False:
+                logger.info(f"{name} is reachable again ({dependency.latency_ms:.0f}ms)")
+            dependency.healthy = True
+            dependency.breaker.record_success()
+        else:
+            if dependency.healthy is not False:
+                logger.warning(f"{name} health probe failed: {error}")
+            dependency.healthy = False
+            dependency.failures += 1
+            dependency.breaker.record_failure(error)
+        return error is None
+
+    def _delay(self, name: str) -> float:
+        if self._dependencies[name].breaker.state != CLOSED:
+            return self.retry_interval
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def _probe_loop(self, name: str) -> None:
+        while True:
+            await asyncio.sleep(self._delay(name))
+            await self.check(name)
+
+    def start(self) -> None:
+        """Start probing in the background; the first probes run after one interval."""
+        for name in self._dependencies:
+            if name not in self._tasks:
+                # Long-lived, so it must not inherit the caller's trace context
+                self._tasks[name] = asyncio.create_task(self._probe_loop(name), context=contextvars.Context())
+
+    async def close(self) -> None:
+        """Stop background probes."""
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get each dependency's last probe result and circuit state."""
+        return {
+            name: {
+                "healthy": dependency.healthy,
+                "latency_ms": dependency.latency_ms,
+                "checked_at": (
+                    datetime.fromtimestamp(dependency.checked_at, timezone.utc).isoformat()
+                    if dependency.checked_at is not None else None
+                ),
+                "checks": dependency.checks,
+                "failures": dependency.failures,
+                "circuit": dependency.breaker.get_stats(),
+            }
+            for name, dependency in self._dependencies.items()
+        }
+
+
+# Global health monitor instance
+_monitor: Optional[HealthMonitor] = None
+
+
+def get_health_monitor() -> HealthMonitor:
+    """Get or create the global health monitor, probing the MCP server and the LLM provider."""
+    global _monitor
+    if _monitor is None:
+        # Imported here: the LLM service reports call failures to this module
+        from app.llm_service import get_llm_service
+        from app.mcp_client import get_mcp_client
+
+        _monitor = HealthMonitor(
+            interval=settings.HEALTH_CHECK_INTERVAL_SECONDS,
+            jitter=settings.HEALTH_CHECK_JITTER,
+            timeout=settings.HEALTH_CHECK_TIMEOUT_SECONDS,
+            retry_interval=settings.HEALTH_CHECK_RETRY_SECONDS,
+            failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout=settings.CIRCUIT_RESET_SECONDS,
+        )
+        _monitor.register("mcp", get_mcp_client().ping)
+        _monitor.register("llm", get_llm_service().ping)
+    return _monitor
@@ -0,0 +1,139 @@
+import base64
+import hashlib
+import hmac
+import logging
+import secrets
+from typing import Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Random bytes in a session ID, and signature bytes kept from the HMAC
+SESSION_ID_BYTES = 18
+SIGNATURE_BYTES = 18
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+class SessionManager:
+    """Identifies the user behind a request, for conversation keying.
+
+    A session is a random ID plus an HMAC-SHA256 signature
+    (``<id>.<signature>``), so the server keeps no session table and a
+    forged or altered token is simply ignored. A request is identified, in
+    order, by a valid token in the ``header_name`` header, a valid token in
+    the ``cookie_name`` cookie, or the client address. The address is taken
+    from ``X-Forwarded-For`` only as far as ``trusted_proxies`` hops allow,
+    since clients can prepend anything to that header.
+    """
+
+    def __init__(
+        self,
+        secret: bytes,
+        cookie_name: str = "chat_session",
+        header_name: str = "X-Session-ID",
+        trusted_proxies: int = 0,
+        max_age_seconds: int = 7 * 24 * 3600,
+        secure_cookie: bool = False,
+    ):
+        # Keyed once; each signature copies the keyed state instead of rehashing the key
+        self._mac = hmac.new(secret, digestmod=hashlib.sha256)
+        self.cookie_name = cookie_name
+        self.header_name = header_name
+        self.trusted_proxies = trusted_proxies
+        self.max_age_seconds = max_age_seconds
+        self.secure_cookie = secure_cookie
+
+    def _sign(self, session_id: str) -> str:
+        mac = self._mac.copy()
+        mac.update(session_id.encode("ascii"))
+        return _b64(mac.digest()[:SIGNATURE_BYTES])
+
+    def issue(self) -> str:
+        """Create a new signed session token."""
+        session_id = _b64(secrets.token_bytes(SESSION_ID_BYTES))
+        return f"{session_id}.{self._sign(session_id)}"
+
+    def verify(self, token: Optional[str]) -> Optional[str]:
+        """Return the session ID of a validly signed token, else None."""
+        if not token:
+            return None
+        session_id, _, signature = token.partition(".")
+        if not session_id or not signature or not token.isascii():
+            return None
+        if not hmac.compare_digest(signature, self._sign(session_id)):
+            return None
+        return session_id
+
+    def session_id(self, request: Request) -> Optional[str]:
+        """The session ID from the request's header or cookie, if validly signed."""
+        return (
+            self.verify(request.headers.get(self.header_name))
+            or self.verify(request.cookies.get(self.cookie_name))
+        )
+
+    def client_address(self, request: Request) -> str:
+        """The client IP, trusting the last ``trusted_proxies`` X-Forwarded-For hops."""
+        peer = request.client.host if request.client else "unknown"
+        if self.trusted_proxies <= 0:
+            return peer
+        forwarded = request.headers.get("x-forwarded-for")
+        if not forwarded:
+            return peer
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        # Each trusted proxy appended the address it received the request from. With
+        # fewer hops than proxies the header did not pass through all of them, so any
+        # of its entries may be client-supplied.
+        if len(hops) >= self.trusted_proxies:
+            return hops[-self.trusted_proxies]
+        return peer
+
+    def identify(self, request: Request) -> str:
+        """The conversation key for a request: its session, else its client address."""
+        session_id = self.session_id(request)
+        if session_id is not None:
+            return f"session:{session_id}"
+        return self.client_address(request)
+
+    def set_cookie(self, response: Response, token: str) -> None:
+        """Attach the session cookie to a response."""
+        response.set_cookie(
+            self.cookie_name,
+            token,
+            max_age=self.max_age_seconds,
+            httponly=True,
+            samesite="lax",
+            secure=self.secure_cookie,
+        )
+
+
+# Global session manager instance
+_sessions: Optional[SessionManager] = None
+
+
+def get_session_manager() -> SessionManager:
+    """Get or create the global session manager."""
+    global _sessions
+    if _sessions is None:
+        secret = settings.SESSION_SECRET.encode("utf-8")
+        if not secret:
+            logger.warning(
+                "SESSION_SECRET is not set; using a random key, so sessions end on restart "
+                "and are not shared between workers"
+            )
+            secret = secrets.token_bytes(32)
+        _sessions = SessionManager(
+            secret,
+            cookie_name=settings.SESSION_COOKIE_NAME,
+            header_name=settings.SESSION_HEADER_NAME,
+            trusted_proxies=settings.TRUSTED_PROXY_COUNT,
+            max_age_seconds=settings.SESSION_MAX_AGE_SECONDS,
+            secure_cookie=settings.SESSION_COOKIE_SECURE,
+        )
+    return _sessions
@@ -0,0 +1,325 @@
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Mapping, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes; lower numbers are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+LANE_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BACKGROUND: "background"}
+
+DURATION_PART_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """Seconds until a rate-limit window resets.
+
+    Accepts OpenAI-style durations (``"6m0s"``, ``"20ms"``), plain seconds
+    and OpenRouter-style epoch timestamps in seconds or milliseconds.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        number = float(value)
+    except ValueError:
+        parts = DURATION_PART_PATTERN.findall(value)
+        if not parts:
+            return None
+        return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts)
+    if number > 1e12:
+        return max(0.0, number / 1000 - time.time())
+    if number > 1e9:
+        return max(0.0, number - time.time())
+    return number
+
+
+def _header_number(headers: Mapping[str, str], name: str) -> Optional[float]:
+    value = headers.get(name)
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """Continuously refilling bucket sized in units per minute.
+
+    A rate of 0 means unlimited. Holds at most ``burst_seconds`` worth of
+    refill so capacity that went unused earlier cannot all be spent in one
+    burst. A cost larger than the capacity is allowed once the bucket is
+    full; the level then goes negative and later callers wait it out.
+    """
+
+    def __init__(self, per_minute: float = 0.0, burst_seconds: float = 10.0):
+        self.burst_seconds = burst_seconds
+        self.per_minute = 0.0
+        self.level = 0.0
+        self._updated = time.monotonic()
+        self.set_rate(per_minute)
+
+    @property
+    def capacity(self) -> float:
+        return max(1.0, self.per_minute / 60 * self.burst_seconds)
+
+    def set_rate(self, per_minute: float) -> None:
+        """Change the refill rate, keeping the current level within capacity."""
+        self._refill()
+        first = self.per_minute <= 0
+        self.per_minute = max(0.0, per_minute)
+        self.level = self.capacity if first else min(self.level, self.capacity)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.per_minute > 0:
+            self.level = min(self.capacity, self.level + (now - self._updated) * self.per_minute / 60)
+        self._updated = now
+
+    def wait_time(self, cost: float) -> float:
+        """Seconds until ``cost`` can be taken (0 if it can be taken now)."""
+        if self.per_minute <= 0:
+            return 0.0
+        self._refill()
+        needed = min(cost, self.capacity)
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) * 60 / self.per_minute
+
+    def take(self, cost: float) -> None:
+        if self.per_minute > 0:
+            self._refill()
+            self.level -= cost
+
+    def give_back(self, amount: float) -> None:
+        """Return (or, if negative, additionally charge) ``amount`` units."""
+        if self.per_minute > 0:
+            self._refill()
+            self.level = min(self.capacity, self.level + amount)
+
+    def cap_level(self, remaining: float) -> None:
+        """Lower the level to what the provider says is left."""
+        if self.per_minute > 0:
+            self._refill()
+            self.level = min(self.level, remaining)
+
+
+class Grant:
+    """Permission for one LLM request, reserving its estimated tokens."""
+
+    __slots__ = ("_scheduler", "tokens", "_settled")
+
+    def __init__(self, scheduler: "LLMScheduler", tokens: int):
+        self._scheduler = scheduler
+        self.tokens = tokens
+        self._settled = False
+
+    def settle(self, actual_tokens: Optional[int]) -> None:
+        """Replace the reservation with the tokens actually used (None keeps it)."""
+        if self._settled:
+            return
+        self._settled = True
+        if actual_tokens is not None:
+            self._scheduler.tokens.give_back(self.tokens - actual_tokens)
+
+
+class _Waiter:
+    __slots__ = ("future", "tokens", "enqueued_at")
+
+    def __init__(self, future: asyncio.Future, tokens: int):
+        self.future = future
+        self.tokens = tokens
+        self.enqueued_at = time.monotonic()
+
+
+class LLMScheduler:
+    """Admits LLM requests against request and token budgets.
+
+    Requests wait in priority lanes (interactive before background); within
+    a lane users are served round-robin so one busy conversation cannot
+    starve others. Budgets are token buckets in requests/min and tokens/min,
+    seeded from Settings and adapted to the provider's rate-limit headers.
+    A 429 pauses all dispatch until the limit resets, so waiting requests
+    back off together instead of retrying into the limit.
+    """
+
+    def __init__(self, rpm: float = 0.0, tpm: float = 0.0, burst_seconds: float = 10.0):
+        self.configured_rpm = rpm
+        self.configured_tpm = tpm
+        self.requests = TokenBucket(rpm, burst_seconds)
+        self.tokens = TokenBucket(tpm, burst_seconds)
+        self._lanes: Dict[int, OrderedDict[str, deque[_Waiter]]] = {
+            PRIORITY_INTERACTIVE: OrderedDict(),
+            PRIORITY_BACKGROUND: OrderedDict(),
+        }
+        self._paused_until = 0.0
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.granted = 0
+        self.queued = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+
+    def _ready_in(self, tokens: int) -> float:
+        return max(
+            self._paused_until - time.monotonic(),
+            self.requests.wait_time(1),
+            self.tokens.wait_time(tokens),
+        )
+
+    def _take(self, tokens: int) -> Grant:
+        self.requests.take(1)
+        self.tokens.take(tokens)
+        self.granted += 1
+        return Grant(self, tokens)
+
+    async def acquire(self, tokens: int, priority: int = PRIORITY_INTERACTIVE, user: str = "") -> Grant:
+        """Wait for budget to send a request estimated at ``tokens`` tokens."""
+        if not any(self._lanes.values()) and self._ready_in(tokens) <= 0:
+            return self._take(tokens)
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = _Waiter(future, tokens)
+        self._lanes[priority].setdefault(user, deque()).append(waiter)
+        self.queued += 1
+        self._ensure_dispatcher()
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # Granted just as the caller gave up: return the reservation
+            if future.done() and not future.cancelled():
+                grant = future.result()
+                self.requests.give_back(1)
+                grant.settle(0)
+            raise
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        """Peek the next waiter: highest-priority lane, least recently served user."""
+        for lane in self._lanes.values():
+            while lane:
+                user, waiters = next(iter(lane.items()))
+                while waiters and waiters[0].future.done():
+                    waiters.popleft()
+                if waiters:
+                    return waiters[0]
+                del lane[user]
+        return None
+
+    def _pop_waiter(self) -> None:
+        """Remove the waiter ``_next_waiter`` returned and rotate its user to the back."""
+        for lane in self._lanes.values():
+            if lane:
+                user, waiters = next(iter(lane.items()))
+                waiters.popleft()
+                if waiters:
+                    lane.move_to_end(user)
+                else:
+                    del lane[user]
+                return
+
+    def _ensure_dispatcher(self) -> None:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        else:
+            self._wakeup.set()
+
+    async def _dispatch(self) -> None:
+        while True:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            delay = self._ready_in(waiter.tokens)
+            if delay > 0:
+                # Re-check early if a higher-priority request arrives
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._pop_waiter()
+            self.wait_seconds += time.monotonic() - waiter.enqueued_at
+            waiter.future.set_result(self._take(waiter.tokens))
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """Adapt budgets to rate-limit response headers.
+
+        OpenAI-style ``x-ratelimit-{limit,remaining,reset}-{requests,tokens}``
+        are per-minute: a provider limit below the configured one (or any
+        limit when none is configured) becomes the bucket rate. Remaining
+        counts lower the current level, and an exhausted window pauses
+        dispatch until it resets. OpenRouter's unsuffixed ``x-ratelimit-*``
+        headers have no fixed interval, so they only feed remaining/reset.
+        """
+        for kind, bucket, configured in (
+            ("requests", self.requests, self.configured_rpm),
+            ("tokens", self.tokens, self.configured_tpm),
+        ):
+            limit = _header_number(headers, f"x-ratelimit-limit-{kind}")
+            if limit and (configured <= 0 or limit < configured) and limit != bucket.per_minute:
+                bucket.set_rate(limit)
+            self._apply_remaining(
+                bucket,
+                _header_number(headers, f"x-ratelimit-remaining-{kind}"),
+                headers.get(f"x-ratelimit-reset-{kind}"),
+            )
+        self._apply_remaining(
+            self.requests,
+            _header_number(headers, "x-ratelimit-remaining"),
+            headers.get("x-ratelimit-reset"),
+        )
+
+    def _apply_remaining(self, bucket: TokenBucket, remaining: Optional[float], reset: Optional[str]) -> None:
+        if remaining is None:
+            return
+        bucket.cap_level(remaining)
+        if remaining <= 0:
+            self.pause(parse_reset(reset) or 1.0)
+
+    def pause(self, seconds: float) -> None:
+        """Stop dispatching for ``seconds`` (e.g. after a 429)."""
+        until = time.monotonic() + seconds
+        if until > self._paused_until:
+            self._paused_until = until
+            self.throttled += 1
+            logger.warning(f"LLM rate limit reached, pausing dispatch for {seconds:.1f}s")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get budget, queue and throttling statistics."""
+        return {
+            "rpm": self.requests.per_minute,
+            "tpm": self.tokens.per_minute,
+            "queued": {
+                LANE_NAMES[priority]: sum(len(waiters) for waiters in lane.values())
+                for priority, lane in self._lanes.items()
+            },
+            "granted": self.granted,
+            "waited": self.queued,
+            "avg_wait_ms": round(self.wait_seconds / self.queued * 1000, 1) if self.queued else 0.0,
+            "throttled": self.throttled,
+            "paused_for_seconds": round(max(0.0, self._paused_until - time.monotonic()), 2),
+        }
+
+
+# Global scheduler instance
+_scheduler: Optional[LLMScheduler] = None
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Get or create the global LLM scheduler."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler(
+            rpm=settings.LLM_RPM_LIMIT,
+            tpm=settings.LLM_TPM_LIMIT,
+            burst_seconds=settings.LLM_RATE_BURST_SECONDS,
+        )
+    return _scheduler
@@ -1,37 +1,232 @@
+import asyncio
 import logging
-from typing import Any, Optional
+import random
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
 
-from openai import AsyncOpenAI
+import httpx
+from openai import (
+    APIConnectionError,
+    APIStatusError,
+    APITimeoutError,
+    AsyncOpenAI,
+    InternalServerError,
+    RateLimitError,
+)
+from openai.types import CompletionUsage
+from openai.types.chat import ChatCompletion, ChatCompletionChunk, ChatCompletionMessage, ChatCompletionMessageToolCall
+from openai.types.chat.chat_completion_message_tool_call import Function
 
 from app.config import settings
+from app.health_monitor import get_health_monitor
+from app.llm_scheduler import PRIORITY_INTERACTIVE, Grant, get_llm_scheduler
+from app.metrics import LLM_QUEUE_SECONDS
+from app.model_router import get_model_router
+from app.tracing import get_current_span, get_tracer
 
 logger = logging.getLogger(__name__)
 
+# Errors worth retrying: network failures, timeouts, 429s and 5xx responses
+RETRYABLE_ERRORS = (APIConnectionError, RateLimitError, InternalServerError)
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def build_http_client() -> httpx.AsyncClient:
+    """Build the pooled httpx client used for LLM requests from Settings."""
+    http2 = settings.LLM_HTTP2 and _http2_available()
+    if settings.LLM_HTTP2 and not http2:
+        logger.warning("LLM_HTTP2 is enabled but the 'h2' package is missing; using HTTP/1.1")
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        timeout=httpx.Timeout(
+            connect=settings.LLM_CONNECT_TIMEOUT_SECONDS,
+            read=settings.LLM_READ_TIMEOUT_SECONDS,
+            write=settings.LLM_CONNECT_TIMEOUT_SECONDS,
+            pool=settings.LLM_POOL_TIMEOUT_SECONDS,
+        ),
+    )
+
 
 class LLMService:
     """Service for interacting with OpenAI-compatible LLM APIs."""
 
     def __init__(self):
+        self.http_client = build_http_client()
         self.client = AsyncOpenAI(
             api_key=settings.OPENROUTER_API_KEY,
             base_url=settings.OPENROUTER_BASE_URL,
+            http_client=self.http_client,
+            # Retries are handled by _with_retries so they share one deadline
+            max_retries=0,
         )
         self.model = settings.MODEL_NAME
+        self.requests = 0
+        self.in_flight = 0
+        self.retries = 0
+        self.failures = 0
 
-    async def chat(
+    def _estimate_request_tokens(self, params: dict[str, Any]) -> int:
+        """Tokens to reserve for a request: estimated prompt plus max completion.
+
+        Uses roughly four characters per token; the reservation is corrected
+        to the reported usage once the completion finishes.
+        """
+        prompt_chars = sum(len(str(message.get("content") or "")) for message in params["messages"])
+        tool_chars = len(str(params.get("tools", "")))
+        return (prompt_chars + tool_chars) // 4 + params["max_tokens"]
+
+    async def _with_retries(
+        self,
+        operation: Callable[[], Awaitable[Any]],
+        tokens: int,
+        priority: int,
+        user: str,
+        max_retries: int,
+        timeout: Optional[float] = None,
+    ) -> tuple[Any, Grant]:
+        """Run ``operation`` under the scheduler with jittered exponential backoff.
+
+        Each attempt waits for a scheduler grant for ``tokens`` tokens and
+        feeds the response's rate-limit headers back to the scheduler; a 429
+        that will be retried pauses the scheduler for everyone. Retries stop
+        after ``max_retries`` attempts or when the next attempt would start
+        past ``LLM_RETRY_DEADLINE_SECONDS``. A server ``Retry-After`` header
+        raises the backoff to at least that long. ``timeout`` bounds each
+        attempt, not counting time queued in the scheduler.
+
+        Returns:
+            The parsed response and its grant, for settling actual usage
+        """
+        scheduler = get_llm_scheduler()
+        deadline = time.monotonic() + settings.LLM_RETRY_DEADLINE_SECONDS
+        attempt = 0
+        self.requests += 1
+        self.in_flight += 1
+        try:
+            while True:
+                queued_at = time.perf_counter()
+                grant = await scheduler.acquire(tokens, priority, user)
+                LLM_QUEUE_SECONDS.labels("background" if priority else "interactive").observe(
+                    time.perf_counter() - queued_at
+                )
+                try:
+                    raw = await asyncio.wait_for(operation(), timeout) if timeout else await operation()
+                    scheduler.update_from_headers(raw.headers)
+                    return raw.parse(), grant
+                except RETRYABLE_ERRORS as e:
+                    grant.settle(0)
+                    attempt += 1
+                    backoff = min(
+                        settings.LLM_RETRY_MAX_BACKOFF_SECONDS,
+                        settings.LLM_RETRY_BASE_BACKOFF_SECONDS * 2 ** (attempt - 1),
+                    )
+                    delay = random.uniform(0, backoff)
+                    retry_after = _retry_after_seconds(e)
+                    if retry_after is not None:
+                        delay = max(delay, retry_after)
+                    if isinstance(e, RateLimitError):
+                        scheduler.update_from_headers(e.response.headers)
+                    if attempt > max_retries or time.monotonic() + delay >= deadline:
+                        self.failures += 1
+                        raise
+                    if isinstance(e, RateLimitError):
+                        scheduler.pause(delay)
+                    self.retries += 1
+                    span = get_current_span()
+                    if span is not None:
+                        span.set_attribute("llm.retries", attempt)
+                    logger.warning(f"LLM request failed ({e.__class__.__name__}), retry {attempt} in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+                except BaseException:
+                    grant.settle(0)
+                    self.failures += 1
+                    raise
+        finally:
+            self.in_flight -= 1
+
+    async def _with_fallback(
         self,
         messages: list[dict[str, str]],
-        tools: Optional[list[dict]] = None,
-    ) -> Any:
-        """Send a chat completion request to the LLM."""
-        from openai.types.chat import ChatCompletion
+        tools: Optional[list[dict]],
+        priority: int,
+        user: str,
+        create: Callable[[dict[str, Any]], Awaitable[Any]],
+        tool_choice: str = "auto",
+    ) -> tuple[Any, Grant, str]:
+        """Run ``create`` on the routed model, moving down the route on failure.
+
+        Every model but the last gets one attempt of at most
+        ``MODEL_FALLBACK_TIMEOUT_SECONDS``; a timeout or overload (connection
+        error, 429, 5xx) moves on to the next model. The last model gets the
+        usual retries; its success or outage feeds the ``llm`` circuit breaker.
 
+        Returns:
+            The parsed response, its scheduler grant and the model that served it
+        """
+        router = get_model_router()
+        route = router.route(messages, tools, priority)
+        span = get_current_span()
+        if span is not None:
+            span.set_attribute("llm.route", route.rule)
+        for index, model in enumerate(route.models):
+            last = index == len(route.models) - 1
+            params = self._build_params(messages, tools, model, tool_choice)
+            started = time.perf_counter()
+            try:
+                result, grant = await self._with_retries(
+                    lambda: create(params),
+                    self._estimate_request_tokens(params),
+                    priority,
+                    user,
+                    max_retries=settings.LLM_MAX_RETRIES if last else 0,
+                    timeout=None if last else settings.MODEL_FALLBACK_TIMEOUT_SECONDS,
+                )
+            except (asyncio.TimeoutError, *RETRYABLE_ERRORS) as e:
+                elapsed = time.perf_counter() - started
+                if last:
+                    router.record(model, elapsed, "error")
+                    if not isinstance(e, RateLimitError):
+                        # Rate limiting is not an outage; anything else counts against the circuit
+                        get_health_monitor().breaker("llm").record_failure(f"{e.__class__.__name__}: {e}")
+                    raise
+                router.record(model, elapsed, "fallback")
+                timed_out = isinstance(e, (asyncio.TimeoutError, APITimeoutError))
+                router.record_fallback(model, "timeout" if timed_out else "overloaded")
+                continue
+            except Exception:
+                router.record(model, time.perf_counter() - started, "error")
+                raise
+            router.record(model, time.perf_counter() - started, "ok")
+            get_health_monitor().breaker("llm").record_success()
+            return result, grant, model
+        raise RuntimeError("Model route is empty")
+
+    def _build_params(
+        self,
+        messages: list[dict[str, str]],
+        tools: Optional[list[dict]] = None,
+        model: Optional[str] = None,
+        tool_choice: str = "auto",
+    ) -> dict[str, Any]:
+        """Build the chat completion request parameters."""
         params: dict[str, Any] = {
             "extra_headers": {
                 "HTTP-Referer": "https://github.com/estebmaister/andela_bot",
                 "X-Title": "andela_bot"
             },
-            "model": self.model,
+            "model": model or self.model,
             "messages": messages,
             "temperature": settings.TEMPERATURE,
             "max_tokens": settings.MAX_TOKENS,
@@ -39,27 +234,187 @@ class LLMService:
 
         if tools:
             params["tools"] = tools
-            params["tool_choice"] = "auto"
+            params["tool_choice"] = tool_choice
+
+        return params
+
+    async def chat(
+        self,
+        messages: list[dict[str, str]],
+        tools: Optional[list[dict]] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        user: str = "",
+        tool_choice: str = "auto",
+    ) -> Any:
+        """Send a chat completion request to the LLM.
+
+        The model is chosen by the model router, with fallback.
 
-        response: ChatCompletion = await self.client.chat.completions.create(**params)
+        Args:
+            messages: Chat messages
+            tools: Optional tool definitions
+            priority: Scheduler lane (interactive or background)
+            user: Identifier used to share the scheduler fairly across users
+            tool_choice: ``auto``, or ``none`` to send the tools without allowing calls
+        """
+        with get_tracer().start_as_current_span("LLMService.chat", attributes={
+            "gen_ai.request.tools": len(tools or []),
+            "gen_ai.request.messages": len(messages),
+        }) as span:
+            response: ChatCompletion
+            response, grant, model = await self._with_fallback(
+                messages,
+                tools,
+                priority,
+                user,
+                lambda params: self.client.chat.completions.with_raw_response.create(**params),
+                tool_choice,
+            )
+            span.set_attribute("gen_ai.request.model", model)
+            grant.settle(response.usage.total_tokens if response.usage is not None else None)
+            if response.usage is not None:
+                span.set_attributes({
+                    "gen_ai.usage.input_tokens": response.usage.prompt_tokens,
+                    "gen_ai.usage.output_tokens": response.usage.completion_tokens,
+                })
         return response
 
-    async def health_check(self) -> bool:
-        """Check if LLM service is accessible."""
-        try:
-            await self.client.chat.completions.create(
-                extra_headers={
-                    "HTTP-Referer": "https://github.com/estebmaister/andela_bot",
-                    "X-Title": "andela_bot"
-                },
-                model=self.model,
-                messages=[{"role": "user", "content": "test"}],
-                max_tokens=5,
+    async def chat_stream(
+        self,
+        messages: list[dict[str, str]],
+        tools: Optional[list[dict]] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        user: str = "",
+        tool_choice: str = "auto",
+    ) -> "SettlingStream":
+        """Send a streaming chat completion request to the LLM.
+
+        Takes the same arguments as ``chat``. Fallback applies until the
+        stream opens. The final chunk carries the token usage for the whole
+        completion.
+        """
+        stream, grant, model = await self._with_fallback(
+            messages,
+            tools,
+            priority,
+            user,
+            lambda params: self.client.chat.completions.with_raw_response.create(
+                **params,
+                stream=True,
+                stream_options={"include_usage": True},
+            ),
+            tool_choice,
+        )
+        return SettlingStream(stream, grant, model)
+
+    async def ping(self) -> None:
+        """List models (no tokens spent); raises if the provider is unreachable."""
+        await self.client.models.list()
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get connection pool utilization and retry metrics."""
+        stats: dict[str, Any] = {
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+            "retries": self.retries,
+            "failures": self.failures,
+            "routing": get_model_router().get_stats(),
+            "max_connections": settings.LLM_MAX_CONNECTIONS,
+        }
+        # httpx does not expose pool state publicly; read httpcore's pool if present
+        pool = getattr(getattr(self.http_client, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is not None:
+            stats["connections"] = len(connections)
+            stats["idle_connections"] = sum(1 for conn in connections if conn.is_idle())
+            stats["http2_connections"] = sum(
+                1 for conn in connections if "HTTP/2" in getattr(conn, "info", lambda: "")()
             )
-            return True
-        except Exception as e:
-            logger.error(f"LLM health check failed: {e}")
-            return False
+        return stats
+
+    async def close(self) -> None:
+        """Close pooled connections."""
+        await self.http_client.aclose()
+
+
+class SettlingStream:
+    """A completion stream that settles its scheduler grant from the usage chunk."""
+
+    def __init__(self, stream: Any, grant: Grant, model: str):
+        self._stream = stream
+        self._grant = grant
+        self.model = model
+
+    async def __aiter__(self) -> AsyncIterator[ChatCompletionChunk]:
+        async for chunk in self._stream:
+            if chunk.usage is not None:
+                self._grant.settle(chunk.usage.total_tokens)
+            yield chunk
+
+    async def close(self) -> None:
+        # Without a usage chunk the estimate stands
+        self._grant.settle(None)
+        await self._stream.close()
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read a Retry-After header (seconds) from an API error, if any."""
+    if not isinstance(error, APIStatusError):
+        return None
+    value = error.response.headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class StreamAccumulator:
+    """Reassemble a streamed completion into a message and usage.
+
+    Content deltas are returned from ``add`` so callers can forward them as
+    they arrive; tool call fragments are merged by their ``index``.
+    """
+
+    def __init__(self):
+        self._content: list[str] = []
+        self._tool_calls: dict[int, dict[str, str]] = {}
+        self.usage: Optional[CompletionUsage] = None
+
+    def add(self, chunk: ChatCompletionChunk) -> str:
+        """Merge a chunk and return its content delta (may be empty)."""
+        if chunk.usage is not None:
+            self.usage = chunk.usage
+        if not chunk.choices:
+            return ""
+        delta = chunk.choices[0].delta
+        for tool_call in delta.tool_calls or []:
+            entry = self._tool_calls.setdefault(tool_call.index, {"id": "", "name": "", "arguments": ""})
+            if tool_call.id:
+                entry["id"] = tool_call.id
+            if tool_call.function is not None:
+                entry["name"] += tool_call.function.name or ""
+                entry["arguments"] += tool_call.function.arguments or ""
+        if delta.content:
+            self._content.append(delta.content)
+            return delta.content
+        return ""
+
+    @property
+    def message(self) -> ChatCompletionMessage:
+        """The assembled assistant message."""
+        tool_calls = [
+            ChatCompletionMessageToolCall(
+                id=entry["id"],
+                type="function",
+                function=Function(name=entry["name"], arguments=entry["arguments"]),
+            )
+            for _, entry in sorted(self._tool_calls.items())
+        ]
+        return ChatCompletionMessage(
+            role="assistant",
+            content="".join(self._content) or None,
+            tool_calls=tool_calls or None,
+        )
 
 
 # Global LLM service instance
@@ -1,73 +1,456 @@
 import asyncio
+import contextvars
 import logging
-from typing import Any, Optional
+import time
+from datetime import timedelta
+from typing import Any, Awaitable, Optional, TypeVar
 from contextlib import asynccontextmanager
 
+import anyio
 from mcp import ClientSession
 from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared.exceptions import McpError
 
 from app.config import settings
+from app.tool_cache import ToolResultCache
+from app.tracing import STATUS_ERROR, get_tracer
 
 logger = logging.getLogger(__name__)
 
+# JSON-RPC error code the MCP SDK uses when a request times out
+REQUEST_TIMEOUT_CODE = 408
+# Error code the streamable HTTP transport reports when the server dropped the session (HTTP 404)
+SESSION_TERMINATED_CODE = 32600
+
+T = TypeVar("T")
+
+# Sessions being closed in the background, referenced until their close finishes
+_closing: set[asyncio.Task] = set()
+
+
+def _close_in_background(pooled: "PooledSession") -> None:
+    task = asyncio.create_task(pooled.close())
+    _closing.add(task)
+    task.add_done_callback(_closing.discard)
+
+
+class PooledSession:
+    """A long-lived, initialized MCP session owned by a background task.
+
+    The streamable HTTP transport and ``ClientSession`` are anyio task-group
+    based, so they must be entered and exited from the same task. Each pooled
+    session therefore runs its own task that keeps the connection open until
+    ``close()`` is called or the transport fails.
+
+    Requests go through ``call_tool``, ``list_tools`` and ``ping``, which
+    fail fast with ``ConnectionError`` once the transport has stopped
+    reading; the SDK itself would leave them waiting for the read timeout.
+    """
+
+    def __init__(self, server_url: str, request_timeout: float):
+        self.server_url = server_url
+        self.request_timeout = request_timeout
+        self.session: Optional[ClientSession] = None
+        self.last_used = time.monotonic()
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._broken = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._error: Optional[BaseException] = None
+
+    async def open(self, timeout: float) -> None:
+        """Connect and run the MCP handshake, raising if it fails."""
+        # The session outlives the request that opened it; don't inherit its trace context
+        self._task = asyncio.create_task(self._run(), context=contextvars.Context())
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            await self.close()
+            raise ConnectionError(f"Timed out connecting to MCP server after {timeout}s")
+        if self.session is None:
+            await self.close()
+            raise ConnectionError(f"Failed to open MCP session: {self._error}")
+
+    async def _run(self) -> None:
+        try:
+            async with streamablehttp_client(self.server_url) as (read_stream, write_stream, _):
+                session_writer, session_reader = anyio.create_memory_object_stream(0)
+                async with anyio.create_task_group() as forwarder:
+                    forwarder.start_soon(self._forward, read_stream, session_writer)
+                    async with ClientSession(
+                        session_reader,
+                        write_stream,
+                        read_timeout_seconds=timedelta(seconds=self.request_timeout),
+                    ) as session:
+                        await session.initialize()
+                        self.session = session
+                        self._ready.set()
+                        await self._closing.wait()
+                    forwarder.cancel_scope.cancel()
+        except Exception as e:
+            self._error = e
+            if self.session is not None:
+                logger.warning(f"MCP session closed unexpectedly: {e}")
+        finally:
+            self.session = None
+            self._broken.set()
+            self._ready.set()
+
+    async def _forward(self, read_stream, session_writer) -> None:
+        """Pass server messages to the session, noting when the transport stops.
+
+        The transport closes its read stream when a POST fails (for example
+        with HTTP 400 after a server restart dropped the session), but the
+        SDK does not fail the requests already waiting on it.
+        """
+        try:
+            async with session_writer:
+                async for message in read_stream:
+                    await session_writer.send(message)
+        finally:
+            if not self._closing.is_set():
+                logger.warning("MCP session transport closed")
+            self._broken.set()
+            self._closing.set()
+
+    async def _guard(self, request: Awaitable[T]) -> T:
+        """Await a request, raising ``ConnectionError`` as soon as the transport breaks."""
+        call = asyncio.ensure_future(request)
+        broken = asyncio.ensure_future(self._broken.wait())
+        try:
+            await asyncio.wait((call, broken), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            broken.cancel()
+            if not call.done():
+                call.cancel()
+        if call.done() and not call.cancelled():
+            return call.result()
+        raise ConnectionError("MCP session transport closed")
+
+    async def call_tool(self, name: str, arguments: dict[str, Any]) -> Any:
+        """Call a tool over this session."""
+        if not self.alive:
+            raise ConnectionError("MCP session is not connected")
+        return await self._guard(self.session.call_tool(name, arguments))
+
+    async def list_tools(self) -> Any:
+        """List the server's tools over this session."""
+        if not self.alive:
+            raise ConnectionError("MCP session is not connected")
+        return await self._guard(self.session.list_tools())
+
+    @property
+    def alive(self) -> bool:
+        """True while the transport task is running with an initialized session."""
+        return (
+            self.session is not None
+            and not self._broken.is_set()
+            and self._task is not None
+            and not self._task.done()
+        )
+
+    async def send_ping(self, timeout: float) -> None:
+        """Ping the server over this session; raises if it does not answer."""
+        if not self.alive:
+            raise ConnectionError("MCP session is not connected")
+        await asyncio.wait_for(self._guard(self.session.send_ping()), timeout=timeout)
+
+    async def ping(self, timeout: float) -> bool:
+        """Check that the session still answers requests."""
+        try:
+            await self.send_ping(timeout)
+            return True
+        except Exception as e:
+            logger.info(f"MCP session ping failed: {e}")
+            return False
+
+    async def close(self) -> None:
+        """Close the session and wait for the transport task to finish."""
+        self._closing.set()
+        if self._task is None or self._task.done():
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout=5)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            self._task.cancel()
+        except Exception:
+            pass
+
+
+class MCPSessionPool:
+    """Bounded pool of initialized MCP sessions.
+
+    Idle sessions are reused LIFO so the most recently used (warmest)
+    connection is handed out first. Sessions that sat idle longer than
+    ``ping_interval`` are pinged before reuse and transparently replaced if
+    they no longer respond. When a session breaks, the idle ones are pinged
+    before their next use too, since a server restart invalidates them all.
+    """
+
+    def __init__(
+        self,
+        server_url: str,
+        size: int = 4,
+        ping_interval: float = 30.0,
+        connect_timeout: float = 10.0,
+        request_timeout: float = 30.0,
+    ):
+        self.server_url = server_url
+        self.size = max(1, size)
+        self.ping_interval = ping_interval
+        self.connect_timeout = connect_timeout
+        self.request_timeout = request_timeout
+        self._idle: list[PooledSession] = []
+        self._slots = asyncio.Semaphore(self.size)
+        self._closed = False
+        self._in_use = 0
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.reconnects = 0
+        self.broken = 0
+        self.connect_failures = 0
+
+    async def _connect(self) -> PooledSession:
+        pooled = PooledSession(self.server_url, self.request_timeout)
+        try:
+            await pooled.open(timeout=self.connect_timeout)
+        except Exception:
+            self.connect_failures += 1
+            raise
+        return pooled
+
+    async def acquire(self, fresh: bool = False) -> PooledSession:
+        """Check out a healthy session, connecting a new one if needed.
+
+        Args:
+            fresh: Skip the idle sessions and connect a new one
+        """
+        if self._closed:
+            raise RuntimeError("MCP session pool is closed")
+        if self._slots.locked():
+            self.waits += 1
+        await self._slots.acquire()
+        try:
+            while self._idle and not fresh:
+                pooled = self._idle.pop()
+                idle_for = time.monotonic() - pooled.last_used
+                if pooled.alive and (idle_for < self.ping_interval or await pooled.ping(self.connect_timeout)):
+                    self.hits += 1
+                    self._in_use += 1
+                    return pooled
+                # Dead or unresponsive session: drop it and try the next one
+                self.reconnects += 1
+                _close_in_background(pooled)
+            self.misses += 1
+            pooled = await self._connect()
+            self._in_use += 1
+            return pooled
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, pooled: PooledSession, broken: bool = False) -> None:
+        """Return a session to the pool, discarding it if it is broken."""
+        self._in_use -= 1
+        try:
+            if broken or self._closed or not pooled.alive:
+                _close_in_background(pooled)
+                if broken:
+                    self.broken += 1
+                    # Whatever broke this session may have broken the idle ones too
+                    for idle in self._idle:
+                        idle.last_used = float("-inf")
+            else:
+                pooled.last_used = time.monotonic()
+                self._idle.append(pooled)
+        finally:
+            self._slots.release()
+
+    async def warm(self, count: int = 1) -> None:
+        """Pre-open up to ``count`` sessions so the first request skips the handshake."""
+        for _ in range(min(count, self.size) - len(self._idle)):
+            self._idle.append(await self._connect())
+
+    async def close(self) -> None:
+        """Close all idle sessions and refuse new checkouts."""
+        self._closed = True
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*(pooled.close() for pooled in idle), *_closing, return_exceptions=True)
+
+    def get_stats(self) -> dict[str, int]:
+        """Get pool utilization and reconnect metrics."""
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "in_use": self._in_use,
+            "hits": self.hits,
+            "misses": self.misses,
+            "waits": self.waits,
+            "reconnects": self.reconnects,
+            "broken": self.broken,
+            "connect_failures": self.connect_failures,
+        }
+
 
 class MCPClient:
     """Client for connecting to the company's MCP server via Streamable HTTP."""
 
     def __init__(self, server_url: str):
         self.server_url = server_url
+        self.pool = MCPSessionPool(
+            server_url,
+            size=settings.MCP_POOL_SIZE,
+            ping_interval=settings.MCP_POOL_PING_INTERVAL_SECONDS,
+            connect_timeout=settings.MCP_CONNECT_TIMEOUT_SECONDS,
+            request_timeout=settings.MCP_REQUEST_TIMEOUT_SECONDS,
+        )
+        self.cache: Optional[ToolResultCache] = None
+        if settings.TOOL_CACHE_ENABLED:
+            self.cache = ToolResultCache(
+                max_bytes=settings.TOOL_CACHE_MAX_BYTES,
+                ttls=settings.TOOL_CACHE_TTLS,
+                default_ttl=settings.TOOL_CACHE_DEFAULT_TTL_SECONDS,
+                never_cache=settings.TOOL_CACHE_NEVER + settings.MCP_MUTATING_TOOLS,
+            )
+        # Health probes use their own session so they never wait behind tool calls for a pool slot
+        self._probe: Optional[PooledSession] = None
+        self._probe_lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        """Warm the session pool. Failures are logged, not raised."""
+        try:
+            await self.pool.warm(settings.MCP_POOL_WARM_SESSIONS)
+            logger.info(f"MCP session pool warmed ({len(self.pool._idle)} sessions)")
+        except Exception as e:
+            logger.warning(f"Could not warm MCP session pool: {e}")
+
+    async def close(self) -> None:
+        """Close all pooled sessions and the health probe session."""
+        await self.pool.close()
+        probe, self._probe = self._probe, None
+        if probe is not None:
+            await probe.close()
 
     @asynccontextmanager
-    async def get_session(self):
-        """Get an active MCP session."""
-        async with streamablehttp_client(self.server_url) as (read_stream, write_stream, _):
-            async with ClientSession(read_stream, write_stream) as session:
-                await session.initialize()
-                yield session
+    async def get_session(self, fresh: bool = False):
+        """Check out a pooled MCP session, returning it to the pool afterwards.
+
+        Args:
+            fresh: Connect a new session instead of reusing an idle one
+        """
+        pooled = await self.pool.acquire(fresh=fresh)
+        broken = False
+        try:
+            yield pooled
+        except McpError as e:
+            # Protocol-level errors leave the session usable, except timeouts and lost sessions
+            broken = e.error.code in (REQUEST_TIMEOUT_CODE, SESSION_TERMINATED_CODE)
+            raise
+        except asyncio.CancelledError:
+            # A cancelled request (turn deadline, unused prefetch) leaves the session usable
+            raise
+        except BaseException:
+            broken = True
+            raise
+        finally:
+            self.pool.release(pooled, broken=broken)
+
+    async def fetch_tools(self) -> list[dict[str, Any]]:
+        """List available tools from the MCP server, formatted for OpenAI.
+
+        Raises:
+            Exception: Any connection or protocol error, so callers can tell
+                a failure apart from a server with no tools
+        """
+        async with self.get_session() as session:
+            response = await session.list_tools()
+            return [
+                {
+                    "type": "function",
+                    "function": {
+                        "name": tool.name,
+                        "description": tool.description,
+                        "parameters": tool.inputSchema,
+                    },
+                }
+                for tool in response.tools
+            ]
 
     async def list_tools(self) -> list[dict[str, Any]]:
-        """List available tools from the MCP server."""
+        """List available tools from the MCP server ([] on error)."""
         try:
-            async with self.get_session() as session:
-                response = await session.list_tools()
-                return [
-                    {
-                        "type": "function",
-                        "function": {
-                            "name": tool.name,
-                            "description": tool.description,
-                            "parameters": tool.inputSchema,
-                        },
-                    }
-                    for tool in response.tools
-                ]
+            return await self.fetch_tools()
         except Exception as e:
             logger.error(f"Failed to list MCP tools: {e}")
             return []
 
     async def call_tool(self, name: str, arguments: dict[str, Any]) -> str:
-        """Call a tool on the MCP server."""
-        try:
-            async with self.get_session() as session:
-                result = await session.call_tool(name, arguments)
-                # Extract text content from result
-                if result.content:
-                    content = result.content[0]
-                    return content.text if hasattr(content, "text") else str(content)
-                return "No content returned"
-        except Exception as e:
-            logger.error(f"Tool call failed: {name}({arguments}): {e}")
-            return f"Error: {str(e)}"
+        """Call a tool on the MCP server, serving read-only tools from the cache."""
+        with get_tracer().start_as_current_span("MCPClient.call_tool", attributes={"mcp.tool.name": name}) as span:
+            if self.cache is None:
+                result = await self._call_tool_uncached(name, arguments)
+            else:
+                result = await self.cache.get_or_call(
+                    name,
+                    arguments,
+                    lambda: self._call_tool_uncached(name, arguments),
+                )
+            if result.startswith("Error"):
+                span.set_status(STATUS_ERROR, result)
+            return result
 
-    async def health_check(self) -> bool:
-        """Check if MCP server is accessible."""
-        try:
-            async with self.get_session() as session:
-                await session.initialize()
-                return True
-        except Exception as e:
-            logger.error(f"MCP health check failed: {e}")
-            return False
+    async def _call_tool_uncached(self, name: str, arguments: dict[str, Any]) -> str:
+        """Call a tool on the MCP server.
+
+        If the pooled session breaks mid-call or the server no longer knows
+        it, the call is retried once on a newly connected session, unless the
+        tool is listed in ``MCP_MUTATING_TOOLS``.
+        """
+        attempts = 1 if name in settings.MCP_MUTATING_TOOLS else 2
+        for attempt in range(attempts):
+            try:
+                async with self.get_session(fresh=attempt > 0) as session:
+                    result = await session.call_tool(name, arguments)
+                    # Extract text content from result
+                    if result.content:
+                        content = result.content[0]
+                        return content.text if hasattr(content, "text") else str(content)
+                    return "No content returned"
+            except Exception as e:
+                session_lost = not isinstance(e, McpError) or e.error.code == SESSION_TERMINATED_CODE
+                if session_lost and attempt + 1 < attempts:
+                    logger.warning(f"MCP session broke during {name}, retrying on a new session: {e}")
+                    continue
+                logger.error(f"Tool call failed: {name}({arguments}): {e}")
+                return f"Error: {str(e)}"
+        return "Error: tool call failed"
+
+    async def ping(self) -> None:
+        """Ping the MCP server; raises if it is unreachable.
+
+        The ping goes over a dedicated session outside the pool, so a server
+        that is busy serving every pooled session still answers it and is not
+        reported down. The session is kept for the next probe and replaced
+        after a failure.
+        """
+        async with self._probe_lock:
+            probe = self._probe
+            if probe is None or not probe.alive:
+                probe = self._probe = PooledSession(self.server_url, self.pool.request_timeout)
+            try:
+                if probe.session is None:
+                    await probe.open(timeout=self.pool.connect_timeout)
+                await probe.send_ping(timeout=self.pool.request_timeout)
+            except BaseException:
+                # Includes cancellation by the probe timeout: the session may be stuck mid-request
+                self._probe = None
+                _close_in_background(probe)
+                raise
+
+    def get_stats(self) -> dict[str, int]:
+        """Get session pool statistics."""
+        return self.pool.get_stats()
 
 
 # Global MCP client instance
@@ -0,0 +1,434 @@
+import logging
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from app.models import cached_prompt_tokens
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from cache hits up to slow multi-round turns
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return f"{{{pairs}}}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # One slot per bucket plus +Inf; counts are not cumulative until rendered
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Metric:
+    """A metric family: one child per distinct combination of label values.
+
+    Children are plain objects with ``__slots__`` held in a dict, so an
+    update is a dict lookup plus an add (well under a microsecond). Metrics
+    are only touched from the event loop thread, so no locking is needed.
+    """
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, Any] = {}
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def labels(self, *values: str) -> Any:
+        """Get the child for the given label values, creating it on first use."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        """Render the family in the Prometheus text exposition format."""
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+            *self._render_samples(),
+        ]
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    type_name = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increment an unlabelled counter."""
+        self.labels().inc(amount)
+
+    def _render_samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+            for values, child in list(self._children.items())
+        ]
+
+
+class Histogram(_Metric):
+    """Histogram with fixed bucket upper bounds."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        """Record a value on an unlabelled histogram."""
+        self.labels().observe(value)
+
+    def _render_samples(self) -> List[str]:
+        lines = []
+        bucket_labels = self.labelnames + ("le",)
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                labels = _format_labels(bucket_labels, values + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """Gauge or counter whose samples are read from a callback at scrape time.
+
+    Used for values another component already tracks (e.g. store size), so
+    the hot path pays nothing for them.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], Dict[LabelValues, float]],
+        labelnames: Iterable[str] = (),
+        type_name: str = "gauge",
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+        self.type_name = type_name
+
+    def _render_samples(self) -> List[str]:
+        try:
+            samples = self.collect()
+        except Exception as e:
+            logger.warning(f"Metric {self.name} collection failed: {e}")
+            return []
+        return [
+            f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}"
+            for values, value in samples.items()
+        ]
+
+
+class Registry:
+    """Collection of metric families rendered together by ``/metrics``."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric family, rejecting duplicate names."""
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Render all families in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "chatbot_http_request_duration_seconds",
+    "HTTP request time until the last response byte, by route.",
+    ("method", "route", "status"),
+))
+LLM_CALL_SECONDS = REGISTRY.register(Histogram(
+    "chatbot_llm_call_duration_seconds",
+    "LLM completion time by phase: first call of a turn, intermediate tool rounds, final answer, summary.",
+    ("phase",),
+))
+TOOL_CALL_SECONDS = REGISTRY.register(Histogram(
+    "chatbot_mcp_tool_duration_seconds",
+    "MCP tool call time (including cache hits), by tool.",
+    ("tool",),
+))
+LLM_QUEUE_SECONDS = REGISTRY.register(Histogram(
+    "chatbot_llm_queue_duration_seconds",
+    "Time LLM requests waited for the rate-limit scheduler, by lane.",
+    ("lane",),
+))
+LLM_MODEL_SECONDS = REGISTRY.register(Histogram(
+    "chatbot_llm_model_duration_seconds",
+    "LLM attempt time by model and outcome (ok, fallback or error).",
+    ("model", "outcome"),
+))
+HISTORY_SECONDS = REGISTRY.register(Histogram(
+    "chatbot_history_assembly_duration_seconds",
+    "Time to load a conversation and build its history context, by stage.",
+    ("stage",),
+))
+TOKENS = REGISTRY.register(Counter(
+    "chatbot_llm_tokens_total",
+    "Tokens reported in completion usage, by direction (prompt or completion).",
+    ("direction",),
+))
+TOOL_ERRORS = REGISTRY.register(Counter(
+    "chatbot_mcp_tool_errors_total",
+    "Failed MCP tool calls, by tool and reason (error or timeout).",
+    ("tool", "reason"),
+))
+
+LLM_FALLBACKS = REGISTRY.register(Counter(
+    "chatbot_llm_fallbacks_total",
+    "LLM calls moved to the next model, by the model that failed and reason (timeout or overloaded).",
+    ("model", "reason"),
+))
+
+TOOL_TOKENS_SAVED = REGISTRY.register(Counter(
+    "chatbot_llm_tool_schema_tokens_saved_total",
+    "Estimated prompt tokens saved by not sending irrelevant tool schemas.",
+))
+PREFETCH_CALLS = REGISTRY.register(Counter(
+    "chatbot_prefetch_calls_total",
+    "Speculatively prefetched tool calls, by tool and outcome (hit, unused or error).",
+    ("tool", "outcome"),
+))
+PREFETCH_SECONDS_SAVED = REGISTRY.register(Counter(
+    "chatbot_prefetch_seconds_saved_total",
+    "Tool call time already spent by prefetches when the model asked for the same call.",
+))
+
+
+def record_usage(usage: Any) -> None:
+    """Count the tokens of an OpenAI ``CompletionUsage`` (or None)."""
+    if usage is None:
+        return
+    TOKENS.labels("prompt").inc(usage.prompt_tokens or 0)
+    TOKENS.labels("completion").inc(usage.completion_tokens or 0)
+    TOKENS.labels("cached_prompt").inc(cached_prompt_tokens(usage))
+
+
+def _store_stats() -> Dict[str, Any]:
+    from app.conversation_store import get_conversation_store
+
+    return get_conversation_store().get_stats()
+
+
+def _collect_conversations() -> Dict[LabelValues, float]:
+    stats = _store_stats()
+    return {(): stats["total_conversations"]} if "total_conversations" in stats else {}
+
+
+def _collect_evictions() -> Dict[LabelValues, float]:
+    stats = _store_stats()
+    return {
+        (reason,): stats[f"evicted_{reason}"]
+        for reason in ("capacity", "stale")
+        if f"evicted_{reason}" in stats
+    }
+
+
+REGISTRY.register(CallbackMetric(
+    "chatbot_conversations",
+    "Conversations held by the in-memory store.",
+    _collect_conversations,
+))
+REGISTRY.register(CallbackMetric(
+    "chatbot_conversation_evictions_total",
+    "Conversations evicted from the in-memory store, by reason.",
+    _collect_evictions,
+    labelnames=("reason",),
+    type_name="counter",
+))
+
+
+def _admission_stats() -> Dict[str, Any]:
+    from app.admission import get_admission_controller
+
+    return get_admission_controller().get_stats()
+
+
+REGISTRY.register(CallbackMetric(
+    "chatbot_admission_in_flight",
+    "Chat turns currently admitted.",
+    lambda: {(): _admission_stats()["in_flight"]},
+))
+REGISTRY.register(CallbackMetric(
+    "chatbot_admission_waiting",
+    "Chat turns waiting for a global slot.",
+    lambda: {(): _admission_stats()["waiting"]},
+))
+REGISTRY.register(CallbackMetric(
+    "chatbot_admission_rejections_total",
+    "Requests shed by admission control, by reason.",
+    lambda: {
+        (reason,): _admission_stats()[f"rejected_{reason}"]
+        for reason in ("queue_full", "timeout", "user")
+    },
+    labelnames=("reason",),
+    type_name="counter",
+))
+
+
+def _health_stats() -> Dict[str, Any]:
+    from app.health_monitor import get_health_monitor
+
+    return get_health_monitor().get_stats()
+
+
+REGISTRY.register(CallbackMetric(
+    "chatbot_dependency_up",
+    "Whether the last health probe of a dependency (mcp or llm) succeeded.",
+    lambda: {
+        (name,): float(stats["healthy"])
+        for name, stats in _health_stats().items()
+        if stats["healthy"] is not None
+    },
+    labelnames=("dependency",),
+))
+REGISTRY.register(CallbackMetric(
+    "chatbot_dependency_probe_latency_seconds",
+    "Duration of the last health probe of a dependency.",
+    lambda: {
+        (name,): stats["latency_ms"] / 1000
+        for name, stats in _health_stats().items()
+        if stats["latency_ms"] is not None
+    },
+    labelnames=("dependency",),
+))
+REGISTRY.register(CallbackMetric(
+    "chatbot_circuit_open",
+    "Whether a dependency's circuit breaker is open or half-open.",
+    lambda: {
+        (name,): float(stats["circuit"]["state"] != "closed")
+        for name, stats in _health_stats().items()
+    },
+    labelnames=("dependency",),
+))
+REGISTRY.register(CallbackMetric(
+    "chatbot_circuit_rejections_total",
+    "Calls refused by an open circuit: failed-fast chats (llm) or turns answered without tools (mcp).",
+    lambda: {(name,): stats["circuit"]["rejected"] for name, stats in _health_stats().items()},
+    labelnames=("dependency",),
+    type_name="counter",
+))
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request until its last body chunk.
+
+    Timing stops at the end of the body rather than at the response headers,
+    so streamed responses are measured in full. Requests are labelled by
+    route template to keep label cardinality bounded.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = "500"
+        recorded = False
+
+        def record() -> None:
+            nonlocal recorded
+            if recorded:
+                return
+            recorded = True
+            route = scope.get("route")
+            REQUEST_SECONDS.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                status,
+            ).observe(time.perf_counter() - started)
+
+        async def send_wrapper(message: dict) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            record()
+
+
+def render_metrics() -> str:
+    """Render every registered metric."""
+    return REGISTRY.render()
@@ -0,0 +1,141 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.llm_scheduler import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+from app.metrics import LLM_FALLBACKS, LLM_MODEL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class _ModelStats:
+    __slots__ = ("calls", "failures", "fallbacks", "seconds")
+
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.fallbacks = 0
+        self.seconds = 0.0
+
+
+class Route:
+    """The models to try for one LLM call, in order, and the rule that chose them."""
+
+    __slots__ = ("rule", "models")
+
+    def __init__(self, rule: str, models: List[str]):
+        self.rule = rule
+        self.models = models
+
+
+class ModelRouter:
+    """Picks a model per LLM call and the fallbacks to try after it.
+
+    Calls that need little reasoning go to the fast model: background
+    summaries, any call that follows tool results (the model mostly turns
+    them into an answer), other calls offered no tools, and short user
+    messages such as greetings. Everything else goes to the primary model.
+    Each route continues with the primary model (if not already first) and
+    then ``fallbacks``, so a timed-out or overloaded model is replaced
+    instead of failing the turn.
+    """
+
+    def __init__(
+        self,
+        primary: str,
+        fast: str = "",
+        fallbacks: Optional[List[str]] = None,
+        short_message_chars: int = 80,
+    ):
+        self.primary = primary
+        self.fast = fast or primary
+        self.fallbacks = list(fallbacks or [])
+        self.short_message_chars = short_message_chars
+        self._stats: Dict[str, _ModelStats] = {}
+        self.routes: Dict[str, int] = {}
+
+    def _rule(self, messages: List[Dict[str, Any]], tools: Optional[List[dict]], priority: int) -> str:
+        if priority == PRIORITY_BACKGROUND:
+            return "background"
+        if messages and messages[-1].get("role") == "tool":
+            return "post_tool"
+        if not tools:
+            return "no_tools"
+        last_user = next((m for m in reversed(messages) if m.get("role") == "user"), None)
+        if last_user is not None and len(str(last_user.get("content") or "")) <= self.short_message_chars:
+            return "short_message"
+        return "default"
+
+    def route(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[dict]] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+    ) -> Route:
+        """Choose the models for a call.
+
+        Args:
+            messages: Chat messages about to be sent
+            tools: Tool definitions offered to the model, if any
+            priority: Scheduler lane of the call
+
+        Returns:
+            The matching rule name and the models to try, without duplicates
+        """
+        rule = self._rule(messages, tools, priority)
+        first = self.primary if rule == "default" else self.fast
+        models = list(dict.fromkeys([first, self.primary, *self.fallbacks]))
+        self.routes[rule] = self.routes.get(rule, 0) + 1
+        return Route(rule, models)
+
+    def record(self, model: str, seconds: float, outcome: str) -> None:
+        """Record one attempt: ``ok``, ``fallback`` (replaced by the next model) or ``error``."""
+        stats = self._stats.get(model)
+        if stats is None:
+            stats = self._stats[model] = _ModelStats()
+        stats.calls += 1
+        stats.seconds += seconds
+        if outcome == "fallback":
+            stats.fallbacks += 1
+        elif outcome == "error":
+            stats.failures += 1
+        LLM_MODEL_SECONDS.labels(model, outcome).observe(seconds)
+
+    def record_fallback(self, model: str, reason: str) -> None:
+        LLM_FALLBACKS.labels(model, reason).inc()
+        logger.warning(f"LLM model {model} {reason}, falling back")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get route counts and per-model call statistics."""
+        return {
+            "primary": self.primary,
+            "fast": self.fast,
+            "fallbacks": self.fallbacks,
+            "routes": dict(self.routes),
+            "models": {
+                model: {
+                    "calls": stats.calls,
+                    "failures": stats.failures,
+                    "fallbacks": stats.fallbacks,
+                    "avg_ms": round(stats.seconds / stats.calls * 1000, 1) if stats.calls else 0.0,
+                }
+                for model, stats in self._stats.items()
+            },
+        }
+
+
+# Global model router instance
+_router: Optional[ModelRouter] = None
+
+
+def get_model_router() -> ModelRouter:
+    """Get or create the global model router."""
+    global _router
+    if _router is None:
+        _router = ModelRouter(
+            primary=settings.MODEL_NAME,
+            fast=settings.MODEL_FAST_NAME,
+            fallbacks=settings.MODEL_FALLBACK_NAMES,
+            short_message_chars=settings.MODEL_ROUTE_SHORT_MESSAGE_CHARS,
+        )
+    return _router
@@ -5,7 +5,7 @@ from typing import Optional, List, Dict, Any
 class ChatRequest(BaseModel):
     """Request model for chat endpoint."""
     message: str = Field(..., description="User message")
-    remember: bool = Field(default=False, description="If True, use full conversation history instead of last 10 messages")
+    remember: bool = Field(default=False, description="If True, use the larger remember-mode history token budget")
     clear_history: bool = Field(default=False, description="If True, clear conversation history for this user")
 
 
@@ -15,14 +15,122 @@ class ToolCall(BaseModel):
     arguments: Dict[str, Any] = Field(default_factory=dict, description="Tool arguments")
 
 
+class RoundStats(BaseModel):
+    """Timing breakdown for one LLM + tools round of a chat turn."""
+    round: int = Field(..., description="1-based round number")
+    llm_ms: float = Field(default=0.0, description="Time spent in the LLM call")
+    tool_ms: float = Field(default=0.0, description="Time spent executing tools")
+    tool_calls: int = Field(default=0, description="Number of tools executed")
+    tools_offered: int = Field(default=0, description="Tool schemas sent with the LLM call")
+    tool_tokens_saved: int = Field(default=0, description="Estimated prompt tokens saved by omitting tool schemas")
+
+
+class Usage(BaseModel):
+    """Token usage accumulated over a chat turn."""
+    prompt_tokens: int = Field(default=0, description="Prompt tokens sent")
+    completion_tokens: int = Field(default=0, description="Completion tokens received")
+    total_tokens: int = Field(default=0, description="Total tokens")
+    cached_tokens: int = Field(default=0, description="Prompt tokens served from the provider's prompt cache")
+
+    def add(self, usage: Any) -> None:
+        """Accumulate an OpenAI ``CompletionUsage`` (or None)."""
+        if usage is None:
+            return
+        self.prompt_tokens += usage.prompt_tokens or 0
+        self.completion_tokens += usage.completion_tokens or 0
+        self.total_tokens += usage.total_tokens or 0
+        self.cached_tokens += cached_prompt_tokens(usage)
+
+    def merge(self, other: Optional["Usage"]) -> None:
+        """Accumulate another ``Usage`` (or None)."""
+        if other is None:
+            return
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.total_tokens += other.total_tokens
+        self.cached_tokens += other.cached_tokens
+
+
+def cached_prompt_tokens(usage: Any) -> int:
+    """Prompt tokens a ``CompletionUsage`` reports as cache hits (0 if not reported)."""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+
+
+class ContextStats(BaseModel):
+    """How the conversation history was sized for a request."""
+    history_messages: int = Field(default=0, description="Recent messages sent verbatim")
+    summarized_messages: int = Field(default=0, description="Earlier messages folded into the summary")
+    estimated_prompt_tokens: int = Field(default=0, description="Estimated tokens for system prompt, summary and history")
+
+
 class ChatResponse(BaseModel):
     """Response model for chat endpoint."""
     response: str = Field(..., description="Agent response message")
     tool_calls: Optional[List[ToolCall]] = Field(default=None, description="Tool calls made")
+    rounds: Optional[List[RoundStats]] = Field(default=None, description="Per-round LLM/tool timings")
+    usage: Optional[Usage] = Field(default=None, description="Token usage for the turn")
+    context: Optional[ContextStats] = Field(default=None, description="History sizing for the request")
+    cached: bool = Field(default=False, description="True if served from the response cache")
+    degraded: bool = Field(default=False, description="True if answered without tools because the MCP server is down")
 
 
 class HealthResponse(BaseModel):
     """Response model for health check endpoint."""
-    status: str = Field(..., description="Service status")
+    status: str = Field(..., description="Service status: ok, or degraded while a dependency is down")
     mcp_connected: bool = Field(..., description="MCP server connection status")
     llm_configured: bool = Field(..., description="LLM configuration status")
+    llm_reachable: Optional[bool] = Field(default=None, description="Result of the last LLM provider probe")
+    dependencies: Optional[Dict[str, Any]] = Field(
+        default=None, description="Last probe result, latency, timestamp and circuit state per dependency"
+    )
+
+
+class BatchConversation(BaseModel):
+    """One scripted conversation in a batch."""
+    id: Optional[str] = Field(default=None, description="Caller's ID for the conversation, echoed in its result")
+    messages: List[str] = Field(..., min_length=1, description="User messages, sent in order")
+    remember: bool = Field(default=False, description="If True, use the larger remember-mode history token budget")
+
+
+class BatchRequest(BaseModel):
+    """Request model for the batch chat endpoint."""
+    conversations: List[BatchConversation] = Field(..., min_length=1, description="Independent conversations to run")
+    concurrency: Optional[int] = Field(
+        default=None, ge=1, description="Conversations run at once (capped at BATCH_MAX_CONCURRENCY)"
+    )
+
+
+class BatchTurn(BaseModel):
+    """One user message of a batch conversation and the agent's reply."""
+    message: str = Field(..., description="User message")
+    response: str = Field(..., description="Agent response message")
+    tool_calls: Optional[List[ToolCall]] = Field(default=None, description="Tool calls made")
+    latency_ms: float = Field(..., description="Time to answer this message")
+    usage: Optional[Usage] = Field(default=None, description="Token usage for the turn")
+    cached: bool = Field(default=False, description="True if served from the response cache")
+    degraded: bool = Field(default=False, description="True if answered without tools because the MCP server is down")
+
+
+class BatchResult(BaseModel):
+    """NDJSON line for one finished batch conversation."""
+    type: str = Field(default="result", description="Line type")
+    index: int = Field(..., description="Position of the conversation in the request")
+    id: Optional[str] = Field(default=None, description="The conversation's ID from the request")
+    ok: bool = Field(..., description="False if a turn failed; later messages were not sent")
+    turns: List[BatchTurn] = Field(default_factory=list, description="Completed turns, in order")
+    latency_ms: float = Field(..., description="Time to run the whole conversation")
+    usage: Usage = Field(default_factory=Usage, description="Token usage over all turns")
+    error: Optional[str] = Field(default=None, description="Why the conversation stopped, if it failed")
+
+
+class BatchSummary(BaseModel):
+    """Final NDJSON line of a batch."""
+    type: str = Field(default="summary", description="Line type")
+    conversations: int = Field(..., description="Conversations run")
+    succeeded: int = Field(..., description="Conversations whose turns all succeeded")
+    failed: int = Field(..., description="Conversations that stopped on an error")
+    elapsed_ms: float = Field(..., description="Wall time for the whole batch")
+    p50_ms: float = Field(..., description="Median conversation latency")
+    p95_ms: float = Field(..., description="95th percentile conversation latency")
+    usage: Usage = Field(default_factory=Usage, description="Token usage over the whole batch")
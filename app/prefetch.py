@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.config import settings
+from app.metrics import PREFETCH_CALLS, PREFETCH_SECONDS_SAVED
+from app.tool_cache import ToolResultCache
+from app.tool_selector import VERIFY_TOOL
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PrefetchRule:
+    """Call ``tool`` with ``argument`` set to each match of ``pattern`` in the user message."""
+    tool: str
+    argument: str
+    pattern: re.Pattern
+
+
+def _key(name: str, arguments: Dict[str, Any]) -> str:
+    """Cache-style key for a call, ignoring the case of string arguments.
+
+    Models often re-case an identifier the user typed (``mon-2701`` vs
+    ``MON-2701``); both should find the same prefetch.
+    """
+    return ToolResultCache.make_key(
+        name, {key: value.casefold() if isinstance(value, str) else value for key, value in arguments.items()}
+    )
+
+
+def _accepts(tool: Dict[str, Any], argument: str) -> bool:
+    """Whether a tool schema takes ``argument`` and needs nothing else."""
+    parameters = tool["function"].get("parameters") or {}
+    required = set(parameters.get("required") or ())
+    return argument in (parameters.get("properties") or {}) and required <= {argument}
+
+
+class _Speculation:
+    """One prefetched call: its task and when it started and finished."""
+
+    __slots__ = ("tool", "task", "started", "finished")
+
+    def __init__(self, tool: str, task: asyncio.Task, started: float):
+        self.tool = tool
+        self.task = task
+        self.started = started
+        self.finished: Optional[float] = None
+
+
+class TurnPrefetch:
+    """The speculative calls started for one turn.
+
+    ``take`` hands a prefetched result to the tool call that matches it
+    (same tool, same arguments up to case); ``close`` cancels and counts the calls the
+    model never made.
+    """
+
+    def __init__(self, prefetcher: "Prefetcher"):
+        self._prefetcher = prefetcher
+        self._calls: Dict[str, _Speculation] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def add(self, name: str, arguments: Dict[str, Any], call: Awaitable[str]) -> None:
+        speculation = _Speculation(name, asyncio.ensure_future(call), time.perf_counter())
+        speculation.task.add_done_callback(lambda _: setattr(speculation, "finished", time.perf_counter()))
+        self._calls[_key(name, arguments)] = speculation
+
+    async def take(self, name: str, arguments: Dict[str, Any], timeout: float) -> Optional[str]:
+        """The prefetched result for this call, waiting up to ``timeout`` if it is still running.
+
+        Returns None if the call was not prefetched or the prefetch failed,
+        in which case the caller makes the call itself. Raises
+        ``asyncio.TimeoutError`` if the prefetch is still running at ``timeout``.
+        """
+        speculation = self._calls.pop(_key(name, arguments), None)
+        if speculation is None:
+            return None
+        requested = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(asyncio.shield(speculation.task), timeout=timeout)
+        except asyncio.TimeoutError:
+            speculation.task.cancel()
+            self._prefetcher.record(name, "error")
+            raise
+        if result.startswith("Error"):
+            self._prefetcher.record(name, "error")
+            return None
+        # Time the call had already been running when the model asked for it
+        saved = min(speculation.finished or requested, requested) - speculation.started
+        self._prefetcher.record(name, "hit", saved)
+        return result
+
+    def close(self) -> None:
+        """Cancel the prefetched calls that were never used."""
+        for speculation in self._calls.values():
+            speculation.task.cancel()
+            self._prefetcher.record(speculation.tool, "unused")
+        self._calls.clear()
+
+
+class Prefetcher:
+    """Starts likely read-only tool calls alongside a turn's first LLM call.
+
+    Each rule maps an entity in the user's message (a SKU, an order ID) to
+    the tool the model would call for it. A rule only fires when its tool is
+    offered to the model in the first round, and rules for ``verified_tools``
+    only once the conversation has passed PIN verification. Rules for
+    ``never_prefetch`` tools (mutating and other PII tools) and for
+    ``verify_customer_pin`` are dropped. At most ``max_calls`` calls are
+    started per turn, each bounded by ``timeout``.
+    """
+
+    def __init__(
+        self,
+        rules: Iterable[PrefetchRule],
+        call: Callable[[str, Dict[str, Any]], Awaitable[str]],
+        max_calls: int = 3,
+        timeout: float = 20.0,
+        never_prefetch: Iterable[str] = (),
+        verified_tools: Iterable[str] = (),
+        enabled: bool = True,
+    ):
+        rules = list(rules)
+        never = set(never_prefetch) | {VERIFY_TOOL}
+        self.rules = [rule for rule in rules if rule.tool not in never]
+        for rule in rules:
+            if rule.tool in never:
+                logger.warning(f"Not prefetching {rule.tool}: it is mutating or returns PII")
+        self.verified_tools = set(verified_tools)
+        self._call = call
+        self.max_calls = max_calls
+        self.timeout = timeout
+        self.enabled = enabled
+        self.started = 0
+        self.hits = 0
+        self.unused = 0
+        self.errors = 0
+        self.seconds_saved = 0.0
+
+    def extract(
+        self, message: str, tools: List[Dict[str, Any]], verified: bool = False
+    ) -> List[Tuple[str, Dict[str, Any]]]:
+        """The calls to prefetch for a user message, given the tools offered."""
+        offered = {tool["function"]["name"]: tool for tool in tools}
+        calls: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        for rule in self.rules:
+            if rule.tool in self.verified_tools and not verified:
+                continue
+            tool = offered.get(rule.tool)
+            if tool is None or not _accepts(tool, rule.argument):
+                continue
+            for match in rule.pattern.finditer(message):
+                arguments = {rule.argument: match.group(0)}
+                calls.setdefault(_key(rule.tool, arguments), (rule.tool, arguments))
+                if len(calls) >= self.max_calls:
+                    return list(calls.values())
+        return list(calls.values())
+
+    async def _guarded_call(self, name: str, arguments: Dict[str, Any]) -> str:
+        # Never raises, so an unused task cannot leave an unretrieved exception
+        try:
+            return await asyncio.wait_for(self._call(name, arguments), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            return f"Error: tool {name} timed out"
+        except Exception as e:
+            return f"Error: {e}"
+
+    def start(self, message: str, tools: List[Dict[str, Any]], verified: bool = False) -> Optional[TurnPrefetch]:
+        """Start the prefetches for a turn's first round; None if there are none.
+
+        Args:
+            message: The user's message
+            tools: Tools offered to the model in the first round
+            verified: Whether the conversation has passed PIN verification
+        """
+        if not self.enabled:
+            return None
+        calls = self.extract(message, tools, verified)
+        if not calls:
+            return None
+        prefetch = TurnPrefetch(self)
+        for name, arguments in calls:
+            logger.info(f"Prefetching tool: {name} with args: {arguments}")
+            prefetch.add(name, arguments, self._guarded_call(name, arguments))
+        self.started += len(calls)
+        return prefetch
+
+    def record(self, tool: str, outcome: str, seconds_saved: float = 0.0) -> None:
+        """Count a prefetch outcome: ``hit``, ``unused`` or ``error``."""
+        PREFETCH_CALLS.labels(tool, outcome).inc()
+        if outcome == "hit":
+            self.hits += 1
+            self.seconds_saved += seconds_saved
+            PREFETCH_SECONDS_SAVED.inc(seconds_saved)
+        elif outcome == "unused":
+            self.unused += 1
+        else:
+            self.errors += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get prefetch counts, hit rate and time saved."""
+        return {
+            "enabled": self.enabled,
+            "started": self.started,
+            "hits": self.hits,
+            "unused": self.unused,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / self.started, 3) if self.started else None,
+            "seconds_saved": round(self.seconds_saved, 3),
+        }
+
+
+# Global prefetcher instance
+_prefetcher: Optional[Prefetcher] = None
+
+
+def get_prefetcher() -> Prefetcher:
+    """Get or create the global prefetcher."""
+    global _prefetcher
+    if _prefetcher is None:
+        from app.mcp_client import get_mcp_client
+
+        _prefetcher = Prefetcher(
+            rules=[
+                PrefetchRule("get_product", "sku", re.compile(settings.PREFETCH_SKU_PATTERN, re.IGNORECASE)),
+                PrefetchRule("get_order", "order_id", re.compile(settings.PREFETCH_ORDER_PATTERN, re.IGNORECASE)),
+            ],
+            call=get_mcp_client().call_tool,
+            max_calls=settings.PREFETCH_MAX_CALLS,
+            timeout=settings.TOOL_TIMEOUT_SECONDS,
+            # PII tools gated on verification may be prefetched once the conversation is verified
+            never_prefetch=settings.MCP_MUTATING_TOOLS + [
+                tool for tool in settings.TOOL_CACHE_NEVER if tool not in settings.TOOL_VERIFIED_TOOLS
+            ],
+            verified_tools=settings.TOOL_VERIFIED_TOOLS,
+            enabled=settings.PREFETCH_ENABLED,
+        )
+    return _prefetcher
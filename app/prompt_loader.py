@@ -6,17 +6,23 @@ logger = logging.getLogger(__name__)
 # Base path for prompts
 PROMPTS_DIR = Path(__file__).parent.parent / "prompts"
 
+# Resolved prompt paths; only files that existed are remembered
+_resolved_paths: dict[str, Path] = {}
 
-def load_prompt(name: str, default: str = "") -> str:
-    """Load a prompt from the prompts directory.
+
+def get_prompt_path(name: str) -> Path:
+    """Resolve the file backing a prompt name.
 
     Args:
         name: Name of the prompt file (with or without extension)
-        default: Default value to return if file not found
 
     Returns:
-        The prompt content as a string
+        The first existing of ``name.md``, ``name.txt`` or ``name``
+        (the last one even if it does not exist)
     """
+    cached = _resolved_paths.get(name)
+    if cached is not None:
+        return cached
     # Try with .md extension first
     prompt_path = PROMPTS_DIR / f"{name}.md"
     if not prompt_path.exists():
@@ -25,6 +31,30 @@ def load_prompt(name: str, default: str = "") -> str:
     if not prompt_path.exists():
         # Try without extension
         prompt_path = PROMPTS_DIR / name
+    if prompt_path.exists():
+        _resolved_paths[name] = prompt_path
+    return prompt_path
+
+
+def get_prompt_mtime(name: str) -> float:
+    """Get the modification time of a prompt file, or 0.0 if it is missing."""
+    try:
+        return get_prompt_path(name).stat().st_mtime
+    except OSError:
+        return 0.0
+
+
+def load_prompt(name: str, default: str = "") -> str:
+    """Load a prompt from the prompts directory.
+
+    Args:
+        name: Name of the prompt file (with or without extension)
+        default: Default value to return if file not found
+
+    Returns:
+        The prompt content as a string
+    """
+    prompt_path = get_prompt_path(name)
 
     try:
         content = prompt_path.read_text(encoding="utf-8").strip()
@@ -65,3 +95,11 @@ def get_welcome_features() -> str:
         "welcome_features",
         default="Finding products, checking prices, and more.",
     )
+
+
+def get_history_summary_prompt() -> str:
+    """Get the system prompt used to summarize older conversation history."""
+    return load_prompt(
+        "history_summary",
+        default="Update the summary of a customer support conversation with the new messages.",
+    )
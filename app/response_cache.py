@@ -0,0 +1,205 @@
+import hashlib
+import logging
+import random
+import re
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from app.config import settings
+from app.models import ChatResponse
+
+logger = logging.getLogger(__name__)
+
+# Characters dropped when normalizing messages
+PUNCTUATION_PATTERN = re.compile(r"[^\w\s]")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# MinHash parameters for near-duplicate matching: 32 hashes in 8 bands of 4
+MINHASH_PERMUTATIONS = 32
+MINHASH_BANDS = 8
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1337)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(MINHASH_PERMUTATIONS)
+]
+
+
+def normalize_message(message: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    message = PUNCTUATION_PATTERN.sub(" ", message.lower())
+    return WHITESPACE_PATTERN.sub(" ", message).strip()
+
+
+def minhash_signature(text: str) -> tuple[int, ...]:
+    """MinHash signature over character trigrams of ``text``."""
+    padded = f"  {text} "
+    shingles = {zlib.crc32(padded[i:i + 3].encode("utf-8")) for i in range(len(padded) - 2)}
+    return tuple(
+        min((a * shingle + b) % _MERSENNE_PRIME for shingle in shingles)
+        for a, b in _PERMUTATIONS
+    )
+
+
+@dataclass
+class _Entry:
+    expires_at: float
+    response: ChatResponse
+    signature: Optional[tuple[int, ...]]
+
+
+class ResponseCache:
+    """Bounded TTL cache of first-turn responses for FAQ-style questions.
+
+    Keys combine the normalized message, the system prompt hash and the model,
+    and the whole cache is dropped when the system prompt changes. With a
+    positive ``fuzzy_threshold`` a MinHash LSH index also serves messages
+    whose estimated trigram Jaccard similarity to a cached one meets it.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 600.0, fuzzy_threshold: float = 0.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.fuzzy_threshold = fuzzy_threshold
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._bands: dict[tuple[int, tuple[int, ...]], set[str]] = {}
+        self._prompt: Optional[str] = None
+        self._prompt_hash = ""
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_prompt(self, system_prompt: str) -> None:
+        """Invalidate everything when the system prompt changes."""
+        if system_prompt is self._prompt:
+            return
+        prompt_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+        if self._prompt_hash and prompt_hash != self._prompt_hash:
+            logger.info("System prompt changed, invalidating response cache")
+            self.invalidations += 1
+            self.clear()
+        self._prompt = system_prompt
+        self._prompt_hash = prompt_hash
+
+    def _key(self, normalized: str, model: str) -> str:
+        return f"{model}\x00{self._prompt_hash}\x00{normalized}"
+
+    def _band_keys(self, model: str, signature: tuple[int, ...]) -> list[tuple[int, tuple[int, ...]]]:
+        rows = MINHASH_PERMUTATIONS // MINHASH_BANDS
+        return [
+            (hash((model, self._prompt_hash, band)), signature[band * rows:(band + 1) * rows])
+            for band in range(MINHASH_BANDS)
+        ]
+
+    def lookup(self, message: str, system_prompt: str, model: str) -> Optional[ChatResponse]:
+        """Return a cached response for ``message``, or None."""
+        self._check_prompt(system_prompt)
+        normalized = normalize_message(message)
+        if not normalized:
+            return None
+        key = self._key(normalized, model)
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            self._remove(key)
+            entry = None
+        if entry is None and self.fuzzy_threshold > 0:
+            key, entry = self._fuzzy_lookup(normalized, model)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.response.model_copy(update={"cached": True})
+
+    def _fuzzy_lookup(self, normalized: str, model: str) -> tuple[Optional[str], Optional[_Entry]]:
+        signature = minhash_signature(normalized)
+        candidates: set[str] = set()
+        for band_key in self._band_keys(model, signature):
+            candidates |= self._bands.get(band_key, set())
+        best_key, best_entry, best_score = None, None, self.fuzzy_threshold
+        now = time.monotonic()
+        for key in candidates:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= now:
+                continue
+            score = sum(a == b for a, b in zip(signature, entry.signature)) / MINHASH_PERMUTATIONS
+            if score >= best_score:
+                best_key, best_entry, best_score = key, entry, score
+        if best_entry is not None:
+            self.fuzzy_hits += 1
+        return best_key, best_entry
+
+    def store(self, message: str, system_prompt: str, model: str, response: ChatResponse) -> None:
+        """Cache ``response`` for ``message``, evicting the oldest entries if full."""
+        self._check_prompt(system_prompt)
+        normalized = normalize_message(message)
+        if not normalized:
+            return
+        key = self._key(normalized, model)
+        if key in self._entries:
+            self._remove(key)
+        signature = minhash_signature(normalized) if self.fuzzy_threshold > 0 else None
+        self._entries[key] = _Entry(
+            expires_at=time.monotonic() + self.ttl_seconds,
+            response=response.model_copy(update={"rounds": None, "usage": None, "context": None}),
+            signature=signature,
+        )
+        if signature is not None:
+            for band_key in self._band_keys(model, signature):
+                self._bands.setdefault(band_key, set()).add(key)
+        self.stores += 1
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        if entry.signature is None:
+            return
+        model = key.split("\x00", 1)[0]
+        for band_key in self._band_keys(model, entry.signature):
+            keys = self._bands.get(band_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._bands[band_key]
+
+    def clear(self) -> None:
+        """Drop all cached responses."""
+        self._entries.clear()
+        self._bands.clear()
+
+    def get_stats(self) -> dict[str, int]:
+        """Get hit/miss statistics and current size."""
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "fuzzy_hits": self.fuzzy_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+# Global response cache instance
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Get or create the global response cache instance."""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache(
+            max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+            fuzzy_threshold=settings.RESPONSE_CACHE_FUZZY_THRESHOLD,
+        )
+    return _response_cache
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+# Only the standard library is imported at load time, so main.py can use
+# this module to time the app and SDK imports
+logger = logging.getLogger(__name__)
+
+
+def process_age_seconds() -> Optional[float]:
+    """Seconds since this process started, from /proc (None where unavailable)."""
+    try:
+        with open("/proc/self/stat") as f:
+            # starttime is field 22; fields after the ")"-terminated command name start at 3
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupProfile:
+    """Boot timings: interpreter start, imports and each warm-up phase.
+
+    ``mark`` records the time since the previous mark (used for imports in
+    ``main.py``); ``phase`` times a warm-up step. ``ready`` flips once
+    warm-up has finished, whether or not every phase succeeded.
+    """
+
+    def __init__(self):
+        self._last_mark = time.perf_counter()
+        self.boot_ms: Dict[str, float] = {}
+        self.phases_ms: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.ready = False
+        self.warmup_ms: Optional[float] = None
+        # Seconds from process start until ready, where the OS reports it
+        self.process_to_ready_seconds: Optional[float] = None
+
+    def mark(self, name: str) -> None:
+        """Record the time since the previous mark (or since this profile was created)."""
+        now = time.perf_counter()
+        self.boot_ms[name] = round((now - self._last_mark) * 1000, 1)
+        self._last_mark = now
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a warm-up phase. Errors are recorded and logged, not raised."""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.errors[name] = f"{e.__class__.__name__}: {e}"
+            logger.warning(f"Warm-up phase {name} failed: {e}")
+        finally:
+            self.phases_ms[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    def mark_ready(self, warmup_seconds: float) -> None:
+        self.ready = True
+        self.warmup_ms = round(warmup_seconds * 1000, 1)
+        age = process_age_seconds()
+        self.process_to_ready_seconds = round(age, 2) if age is not None else None
+        logger.info(
+            f"Warm-up finished in {self.warmup_ms:.0f}ms "
+            f"(boot {sum(self.boot_ms.values()):.0f}ms, process age {self.process_to_ready_seconds}s)"
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get readiness and the boot and warm-up timings."""
+        return {
+            "ready": self.ready,
+            "boot_ms": self.boot_ms,
+            "warmup_ms": self.warmup_ms,
+            "phases_ms": self.phases_ms,
+            "errors": self.errors,
+            "process_to_ready_seconds": self.process_to_ready_seconds,
+        }
+
+
+async def warm_up(profile: "StartupProfile") -> None:
+    """Do the work the first request would otherwise pay for, then mark ready.
+
+    Builds the agent and precomputes the system prompt and static assets,
+    then warms the MCP session pool and tool list (plus tool schema token
+    counts) concurrently with the LLM connection. The first health probes
+    run as part of this, after which the health monitor takes over.
+    """
+    from app.agent import get_support_agent
+    from app.health_monitor import get_health_monitor
+    from app.mcp_client import get_mcp_client
+    from app.static_assets import get_static_assets
+    from app.tool_catalog import get_tool_catalog
+
+    started = time.perf_counter()
+    with profile.phase("agent"):
+        agent = get_support_agent()
+        # The SDK builds its resource objects on first access
+        _ = agent.llm_service.client.chat.completions.with_raw_response
+    monitor = get_health_monitor()
+
+    async def warm_mcp() -> None:
+        with profile.phase("mcp_pool"):
+            await get_mcp_client().start()
+            await monitor.check("mcp")
+        with profile.phase("tool_catalog"):
+            await get_tool_catalog().start()
+        with profile.phase("tool_schemas"):
+            # Computes and caches the per-tool token counts
+            agent.tool_selector.select(await agent.get_available_tools(), [], verified=True)
+
+    async def warm_llm() -> None:
+        with profile.phase("llm_connection"):
+            # Opens the pooled connection (TLS, HTTP/2) without spending tokens
+            await monitor.check("llm")
+
+    with profile.phase("prompts"):
+        agent.get_system_prompt()
+    with profile.phase("static_assets"):
+        get_static_assets().load()
+    await asyncio.gather(warm_mcp(), warm_llm())
+    monitor.start()
+    profile.mark_ready(time.perf_counter() - started)
+
+
+# Global startup profile instance
+_profile: Optional[StartupProfile] = None
+
+
+def get_startup_profile() -> StartupProfile:
+    """Get or create the global startup profile."""
+    global _profile
+    if _profile is None:
+        _profile = StartupProfile()
+    return _profile
@@ -0,0 +1,239 @@
+import gzip
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+from starlette.responses import Response
+
+from app.config import settings
+from app.prompt_loader import (
+    get_prompt_path,
+    get_welcome_features,
+    get_welcome_subtitle,
+    get_welcome_title,
+)
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Base path for the chat UI files
+STATIC_DIR = Path(__file__).parent.parent / "static"
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 256
+
+# Unversioned URLs: browsers revalidate with If-None-Match and get a 304
+REVALIDATE = "no-cache"
+
+
+class StaticAsset:
+    """One version of an asset, with its precomputed encodings and ETag."""
+
+    __slots__ = ("name", "media_type", "cache_control", "etag", "variants", "mtimes")
+
+    def __init__(self, name: str, body: bytes, media_type: str, cache_control: str, mtimes: Tuple[float, ...]):
+        self.name = name
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.mtimes = mtimes
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        # Content coding -> (body, strong ETag); each representation has its own ETag
+        self.variants: Dict[str, Tuple[bytes, str]] = {"identity": (body, self.etag)}
+        if len(body) >= MIN_COMPRESS_BYTES:
+            encoded = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                encoded["br"] = brotli.compress(body, quality=11)
+            for coding, data in encoded.items():
+                if len(data) < len(body):
+                    self.variants[coding] = (data, f'"{digest}-{coding}"')
+
+    @property
+    def body(self) -> bytes:
+        """The uncompressed body."""
+        return self.variants["identity"][0]
+
+    def matches(self, if_none_match: str) -> bool:
+        """Whether an If-None-Match header names any representation of this version."""
+        if if_none_match.strip() == "*":
+            return True
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return any(etag in tags for _, etag in self.variants.values())
+
+    def response(self, headers: Mapping[str, str]) -> Response:
+        """Build the response for a request: 304, or the best encoding the client accepts."""
+        if_none_match = headers.get("if-none-match")
+        accepted = _accepted_codings(headers.get("accept-encoding", ""))
+        coding = next((c for c in ("br", "gzip") if c in self.variants and c in accepted), "identity")
+        body, etag = self.variants[coding]
+        response_headers = {"ETag": etag, "Cache-Control": self.cache_control}
+        if len(self.variants) > 1:
+            response_headers["Vary"] = "Accept-Encoding"
+        if if_none_match and self.matches(if_none_match):
+            return Response(status_code=304, headers=response_headers)
+        if coding != "identity":
+            response_headers["Content-Encoding"] = coding
+        return Response(content=body, media_type=self.media_type, headers=response_headers)
+
+
+def _accepted_codings(accept_encoding: str) -> set:
+    """Content codings an Accept-Encoding header allows (q > 0)."""
+    codings = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        quality = params.strip().removeprefix("q=")
+        try:
+            if params and float(quality) <= 0:
+                continue
+        except ValueError:
+            continue
+        if coding.strip():
+            codings.add(coding.strip())
+    return codings
+
+
+class _Source:
+    """How to (re)build an asset: the files it depends on and a body builder."""
+
+    __slots__ = ("media_type", "cache_control", "paths", "build")
+
+    def __init__(self, media_type: str, cache_control: str, paths: List[Path], build: Callable[[], bytes]):
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.paths = paths
+        self.build = build
+
+
+def _mtimes(paths: List[Path]) -> Tuple[float, ...]:
+    mtimes = []
+    for path in paths:
+        try:
+            mtimes.append(path.stat().st_mtime)
+        except OSError:
+            mtimes.append(0.0)
+    return tuple(mtimes)
+
+
+def welcome_payload() -> bytes:
+    """The ``/v1/prompts/welcome`` JSON body."""
+    return json.dumps({
+        "title": get_welcome_title(),
+        "subtitle": get_welcome_subtitle(),
+        "features": get_welcome_features(),
+    }, ensure_ascii=False).encode("utf-8")
+
+
+class StaticAssets:
+    """Static responses held in memory: UI files and the welcome payload.
+
+    Each asset is built once with its gzip (and, if installed, brotli)
+    encoding and a strong ETag, so serving never reads the disk. With
+    ``reload_interval`` > 0, the files behind an asset are stat'ed at most
+    that often and the asset is rebuilt when one of them changed.
+    """
+
+    def __init__(self, reload_interval: float = 0.0):
+        self.reload_interval = reload_interval
+        self._sources: Dict[str, _Source] = {}
+        self._assets: Dict[str, StaticAsset] = {}
+        self._checked_at: Dict[str, float] = {}
+        self.reloads = 0
+
+    def register(
+        self,
+        name: str,
+        media_type: str,
+        paths: List[Path],
+        build: Optional[Callable[[], bytes]] = None,
+        cache_control: str = REVALIDATE,
+    ) -> None:
+        """Add an asset built by ``build`` (default: the bytes of the single file in ``paths``)."""
+        if build is None:
+            build = paths[0].read_bytes
+        self._sources[name] = _Source(media_type, cache_control, paths, build)
+
+    def _build(self, name: str) -> Optional[StaticAsset]:
+        source = self._sources[name]
+        mtimes = _mtimes(source.paths)
+        try:
+            body = source.build()
+        except OSError as e:
+            logger.warning(f"Static asset {name} unavailable: {e}")
+            return None
+        asset = StaticAsset(name, body, source.media_type, source.cache_control, mtimes)
+        self._assets[name] = asset
+        self._checked_at[name] = time.monotonic()
+        return asset
+
+    def load(self) -> int:
+        """Build every asset.
+
+        Returns:
+            Total uncompressed bytes loaded
+        """
+        loaded = 0
+        for name in self._sources:
+            asset = self._build(name)
+            if asset is not None:
+                loaded += len(asset.body)
+        return loaded
+
+    def get(self, name: str) -> Optional[StaticAsset]:
+        """Get an asset, building it on first use; None if unknown or missing."""
+        if name not in self._sources:
+            return None
+        asset = self._assets.get(name)
+        if asset is None:
+            return self._build(name)
+        if self.reload_interval > 0:
+            now = time.monotonic()
+            if now - self._checked_at[name] >= self.reload_interval:
+                self._checked_at[name] = now
+                if _mtimes(self._sources[name].paths) != asset.mtimes:
+                    logger.info(f"Static asset {name} changed on disk, reloading")
+                    self.reloads += 1
+                    asset = self._build(name) or asset
+        return asset
+
+    def get_stats(self) -> Dict[str, object]:
+        """Get asset sizes per encoding and the reload count."""
+        return {
+            "assets": {
+                name: {coding: len(body) for coding, (body, _) in asset.variants.items()}
+                for name, asset in self._assets.items()
+            },
+            "brotli": brotli is not None,
+            "reloads": self.reloads,
+        }
+
+
+# Global static assets instance
+_assets: Optional[StaticAssets] = None
+
+
+def get_static_assets() -> StaticAssets:
+    """Get or create the global static assets."""
+    global _assets
+    if _assets is None:
+        _assets = StaticAssets(reload_interval=settings.STATIC_RELOAD_SECONDS)
+        _assets.register("index.html", "text/html; charset=utf-8", [STATIC_DIR / "index.html"])
+        _assets.register(
+            "style.css",
+            "text/css; charset=utf-8",
+            [STATIC_DIR / "style.css"],
+            cache_control=f"public, max-age={settings.STATIC_MAX_AGE_SECONDS}",
+        )
+        _assets.register(
+            "welcome",
+            "application/json",
+            [get_prompt_path(name) for name in ("welcome_title", "welcome_subtitle", "welcome_features")],
+            build=welcome_payload,
+        )
+    return _assets
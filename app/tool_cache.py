@@ -0,0 +1,142 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ToolResultCache:
+    """TTL + LRU cache for read-only MCP tool results, bounded by bytes.
+
+    Entries are keyed on the tool name plus canonical JSON arguments. Only
+    tools with a positive TTL are cached; tools in the never-cache list are
+    always passed through. Concurrent misses for the same key share a single
+    upstream call.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttls: Optional[dict[str, float]] = None,
+        default_ttl: float = 0.0,
+        never_cache: Iterable[str] = (),
+    ):
+        self.max_bytes = max_bytes
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self.never_cache = set(never_cache)
+        # key -> (expires_at, result, size_bytes)
+        self._entries: OrderedDict[str, tuple[float, str, int]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.bypassed = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(name: str, arguments: dict[str, Any]) -> str:
+        """Build the cache key for a tool call."""
+        return name + "\x00" + json.dumps(arguments, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+    def ttl_for(self, name: str) -> float:
+        """TTL in seconds for a tool; 0 means the tool is not cached."""
+        if name in self.never_cache:
+            return 0.0
+        return self.ttls.get(name, self.default_ttl)
+
+    def is_cacheable(self, name: str) -> bool:
+        """True if results of this tool may be cached."""
+        return self.ttl_for(name) > 0
+
+    async def get_or_call(
+        self,
+        name: str,
+        arguments: dict[str, Any],
+        fetch: Callable[[], Awaitable[str]],
+    ) -> str:
+        """Return a cached result or call ``fetch`` and cache what it returns.
+
+        Args:
+            name: Tool name
+            arguments: Tool arguments
+            fetch: Zero-argument coroutine function performing the real call
+
+        Returns:
+            The tool result text
+        """
+        ttl = self.ttl_for(name)
+        if ttl <= 0:
+            self.bypassed += 1
+            return await fetch()
+
+        key = self.make_key(name, arguments)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self._remove(key)
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            # The fetch runs as its own task so a caller timing out does not
+            # cancel the call for everyone waiting on it
+            task = asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._on_fetched(key, ttl, done))
+        return await asyncio.shield(task)
+
+    def _on_fetched(self, key: str, ttl: float, task: asyncio.Future) -> None:
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        result = task.result()
+        # Never cache failures
+        if not isinstance(result, str) or result.startswith("Error"):
+            return
+        self._store(key, result, ttl)
+
+    def _store(self, key: str, result: str, ttl: float) -> None:
+        size = len(key) + len(result.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, result, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        self._entries.clear()
+        self._bytes = 0
+
+    def get_stats(self) -> dict[str, int]:
+        """Get hit/miss statistics and current size."""
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "bypassed": self.bypassed,
+            "evictions": self.evictions,
+            "inflight": len(self._inflight),
+        }
@@ -0,0 +1,153 @@
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.config import settings
+from app.mcp_client import get_mcp_client
+from app.tool_selector import canonical_tools
+
+logger = logging.getLogger(__name__)
+
+
+class ToolCatalog:
+    """The MCP tool list, kept fresh in the background.
+
+    Once a list has loaded, ``get_tools`` never waits on the MCP server: it
+    serves the current list while a background task refetches it every
+    ``refresh_interval`` seconds (stale-while-revalidate). A failed refresh,
+    or an empty list where there used to be tools, keeps the last good list
+    and is retried after ``retry_interval``. Tools are held in canonical
+    order and the list object is only replaced when the schemas change, as
+    identified by ``version`` (a hash of the canonical JSON).
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], Awaitable[List[Dict[str, Any]]]],
+        refresh_interval: float = 300.0,
+        retry_interval: float = 10.0,
+    ):
+        self._fetch = fetch
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.tools: List[Dict[str, Any]] = []
+        self.version: Optional[str] = None
+        # Wall-clock time of the last successful refresh
+        self.refreshed_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.refreshes = 0
+        self.failures = 0
+        self.changes = 0
+        self._last_attempt = float("-inf")
+        self._inflight: Optional[asyncio.Task] = None
+        self._refresher: Optional[asyncio.Task] = None
+
+    @property
+    def loaded(self) -> bool:
+        """True once any refresh has succeeded."""
+        return self.version is not None
+
+    async def refresh(self) -> bool:
+        """Refetch the tool list; concurrent callers share one fetch.
+
+        Returns:
+            True if the fetch succeeded (whether or not the tools changed)
+        """
+        if self._inflight is None or self._inflight.done():
+            # Shared by many callers, so it must not inherit one request's trace context
+            self._inflight = asyncio.create_task(self._refresh(), context=contextvars.Context())
+        return await asyncio.shield(self._inflight)
+
+    async def _refresh(self) -> bool:
+        self._last_attempt = time.monotonic()
+        try:
+            tools = await self._fetch()
+            if not tools and self.tools:
+                raise ValueError("MCP server returned no tools")
+        except Exception as e:
+            self.failures += 1
+            self.last_error = f"{e.__class__.__name__}: {e}"
+            logger.warning(f"Tool list refresh failed, keeping version {self.version}: {self.last_error}")
+            return False
+        tools = canonical_tools(tools)
+        version = hashlib.sha256(json.dumps(tools, separators=(",", ":")).encode("utf-8")).hexdigest()[:12]
+        if version != self.version:
+            if self.loaded:
+                self.changes += 1
+            self.tools = tools
+            self.version = version
+            logger.info(f"Loaded {len(tools)} tools from MCP server (version {version})")
+        self.refreshed_at = time.time()
+        self.refreshes += 1
+        self.last_error = None
+        return True
+
+    async def get_tools(self) -> List[Dict[str, Any]]:
+        """Get the current tool list.
+
+        Until a first refresh succeeds, a request joins the fetch in flight
+        or starts one at most every ``retry_interval`` seconds; otherwise it
+        gets an empty list and proceeds without tools.
+        """
+        if not self.loaded:
+            in_flight = self._inflight is not None and not self._inflight.done()
+            if in_flight or time.monotonic() - self._last_attempt >= self.retry_interval:
+                await self.refresh()
+        return self.tools
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            healthy = self.loaded and self.last_error is None
+            await asyncio.sleep(self.refresh_interval if healthy else self.retry_interval)
+            await self.refresh()
+
+    async def start(self) -> None:
+        """Load the tool list and start background refreshes. Failures are logged, not raised."""
+        await self.refresh()
+        if self._refresher is None:
+            self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def close(self) -> None:
+        """Stop background refreshes."""
+        for task in (self._refresher, self._inflight):
+            if task is not None:
+                task.cancel()
+        self._refresher = None
+        self._inflight = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the schema version, freshness and refresh counters."""
+        return {
+            "version": self.version,
+            "tools": len(self.tools),
+            "refreshed_at": (
+                datetime.fromtimestamp(self.refreshed_at, timezone.utc).isoformat()
+                if self.refreshed_at is not None else None
+            ),
+            "age_seconds": round(time.time() - self.refreshed_at, 1) if self.refreshed_at is not None else None,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "changes": self.changes,
+            "last_error": self.last_error,
+        }
+
+
+# Global tool catalog instance
+_catalog: Optional[ToolCatalog] = None
+
+
+def get_tool_catalog() -> ToolCatalog:
+    """Get or create the global tool catalog."""
+    global _catalog
+    if _catalog is None:
+        _catalog = ToolCatalog(
+            get_mcp_client().fetch_tools,
+            refresh_interval=settings.TOOL_CATALOG_REFRESH_SECONDS,
+            retry_interval=settings.TOOL_CATALOG_RETRY_SECONDS,
+        )
+    return _catalog
@@ -0,0 +1,169 @@
+import json
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.context_builder import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Account-related wording (or an email address) in recent user messages
+ACCOUNT_INTENT_PATTERN = re.compile(
+    r"\b(?:orders?|account|customer|pin|e-?mail|verif\w*|purchase\w*|bought|buy|checkout"
+    r"|deliver\w*|ship\w*|track\w*|refunds?|returns?)\b"
+    r"|[\w.+-]+@[\w-]+\.[\w.-]+",
+    re.IGNORECASE,
+)
+
+# Wording in a verify_customer_pin result that means the check passed
+VERIFICATION_PASSED_PATTERN = re.compile(
+    r"\b(?:verified|verification (?:passed|succeeded|successful)|success\w*|authenticated)\b",
+    re.IGNORECASE,
+)
+
+# Wording that means it did not, or negates the success wording
+VERIFICATION_FAILED_PATTERN = re.compile(
+    r"\b(?:invalid|incorrect|wrong|fail\w*|denied|mismatch\w*|unverified|unable|locked"
+    r"|not|no|cannot|can't|couldn't|doesn't|didn't|does not match|expired)\b",
+    re.IGNORECASE,
+)
+
+# Fields of a structured result that carry the outcome, checked in order
+VERIFICATION_FIELDS = ("verified", "success", "valid")
+
+VERIFY_TOOL = "verify_customer_pin"
+
+
+def canonical_tools(tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Sort tools by name and their schema keys alphabetically.
+
+    Any subset of the result then serializes to the same bytes on every
+    request, which keeps the request prefix cacheable by the provider.
+    """
+    return [
+        json.loads(json.dumps(tool, sort_keys=True))
+        for tool in sorted(tools, key=lambda tool: tool["function"]["name"])
+    ]
+
+
+def verification_succeeded(result: str) -> bool:
+    """Whether a ``verify_customer_pin`` result reports a verified customer.
+
+    Fails closed: a structured result must carry ``true`` in one of
+    ``VERIFICATION_FIELDS``, and a text result must use success wording
+    with no failure or negation wording. Anything else is a failure.
+    """
+    if result.startswith("Error"):
+        return False
+    try:
+        payload = json.loads(result)
+    except ValueError:
+        payload = None
+    if isinstance(payload, dict):
+        for field in VERIFICATION_FIELDS:
+            if field in payload:
+                return payload[field] is True
+        return False
+    return bool(VERIFICATION_PASSED_PATTERN.search(result)) and not VERIFICATION_FAILED_PATTERN.search(result)
+
+
+@dataclass
+class ToolSelection:
+    """The tools offered for one LLM call."""
+    tools: List[Dict[str, Any]]
+    # Estimated prompt tokens of the offered and the omitted tool schemas
+    tokens_sent: int
+    tokens_saved: int
+
+
+class ToolSelector:
+    """Offers each LLM call only the tools the conversation can use.
+
+    Tools not named in either list below are always offered.
+    ``account_tools`` (customer lookup and PIN verification) are offered
+    once recent user messages mention an account, an order or an email
+    address. ``verified_tools`` (order history and creation) stay hidden
+    until ``verify_customer_pin`` succeeds in the conversation. The
+    selection is a subsequence of the canonical tool list, so each distinct
+    subset keeps a byte-stable prefix.
+    """
+
+    def __init__(
+        self,
+        account_tools: List[str],
+        verified_tools: List[str],
+        intent_messages: int = 3,
+        enabled: bool = True,
+    ):
+        self.account_tools = set(account_tools)
+        self.verified_tools = set(verified_tools)
+        self.intent_messages = intent_messages
+        self.enabled = enabled
+        self._token_counts: Dict[str, int] = {}
+        self._token_source: Optional[List[Dict[str, Any]]] = None
+
+    def _tool_tokens(self, tools: List[Dict[str, Any]]) -> Dict[str, int]:
+        # Schemas only change when the tool list is reloaded
+        if self._token_source is not tools:
+            self._token_counts = {
+                tool["function"]["name"]: estimate_tokens(json.dumps(tool)) for tool in tools
+            }
+            self._token_source = tools
+        return self._token_counts
+
+    def has_account_intent(self, messages: List[Dict[str, Any]]) -> bool:
+        """Whether the last few user messages are about an account or order."""
+        checked = 0
+        for message in reversed(messages):
+            if message.get("role") != "user":
+                continue
+            if ACCOUNT_INTENT_PATTERN.search(str(message.get("content") or "")):
+                return True
+            checked += 1
+            if checked >= self.intent_messages:
+                break
+        return False
+
+    def _offered(self, name: str, account: bool, verified: bool) -> bool:
+        if name in self.verified_tools:
+            return verified
+        if name in self.account_tools:
+            return account
+        return True
+
+    def select(self, tools: List[Dict[str, Any]], messages: List[Dict[str, Any]], verified: bool) -> ToolSelection:
+        """Pick the tools to offer.
+
+        Args:
+            tools: Canonical tool list (see ``canonical_tools``)
+            messages: Messages about to be sent
+            verified: Whether the customer passed PIN verification
+
+        Returns:
+            The offered tools and the estimated schema tokens sent and saved
+        """
+        token_counts = self._tool_tokens(tools)
+        if not self.enabled:
+            return ToolSelection(tools, sum(token_counts.values()), 0)
+        account = verified or self.has_account_intent(messages)
+        selected = [tool for tool in tools if self._offered(tool["function"]["name"], account, verified)]
+        sent = sum(token_counts[tool["function"]["name"]] for tool in selected)
+        return ToolSelection(selected, sent, sum(token_counts.values()) - sent)
+
+
+# Global tool selector instance
+_selector: Optional[ToolSelector] = None
+
+
+def get_tool_selector() -> ToolSelector:
+    """Get or create the global tool selector."""
+    global _selector
+    if _selector is None:
+        _selector = ToolSelector(
+            account_tools=settings.TOOL_ACCOUNT_TOOLS,
+            verified_tools=settings.TOOL_VERIFIED_TOOLS,
+            enabled=settings.TOOL_PRUNING_ENABLED,
+        )
+    return _selector
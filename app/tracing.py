@@ -0,0 +1,366 @@
+import contextvars
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = "x-request-id"
+TRACEPARENT_HEADER = "traceparent"
+
+# W3C trace context: version-traceid-parentid-flags
+TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+# Client-supplied request IDs are echoed into logs and headers, so keep them tame
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+STATUS_UNSET = "UNSET"
+STATUS_OK = "OK"
+STATUS_ERROR = "ERROR"
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+_request_id: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+
+def _new_trace_id() -> str:
+    return f"{random.getrandbits(128):032x}"
+
+
+def _new_span_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+class Span:
+    """A timed operation within a trace.
+
+    Mirrors the OpenTelemetry span API (``set_attribute``, ``set_status``,
+    ``record_exception``, ``end``) so call sites would not change if the
+    OpenTelemetry SDK replaced this tracer. Unsampled spans keep their trace
+    context for propagation but record nothing.
+    """
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_span_id", "sampled", "attributes",
+        "events", "status", "status_description", "start_ns", "end_ns", "local_root", "_tracer",
+    )
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        trace_id: str,
+        parent_span_id: Optional[str],
+        sampled: bool,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self._tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_span_id()
+        self.parent_span_id = parent_span_id
+        self.sampled = sampled
+        self.attributes: Dict[str, Any] = dict(attributes or {}) if sampled else {}
+        self.events: List[Dict[str, Any]] = []
+        self.status = STATUS_UNSET
+        self.status_description = ""
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        # True for the first span of the trace in this process
+        self.local_root = False
+
+    def is_recording(self) -> bool:
+        return self.sampled and self.end_ns is None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if self.is_recording():
+            self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        if self.is_recording():
+            self.attributes.update(attributes)
+
+    def update_name(self, name: str) -> None:
+        self.name = name
+
+    def set_status(self, status: str, description: str = "") -> None:
+        self.status = status
+        self.status_description = description
+
+    def record_exception(self, exception: BaseException) -> None:
+        if self.is_recording():
+            self.events.append({
+                "name": "exception",
+                "timeUnixNano": time.time_ns(),
+                "attributes": {
+                    "exception.type": type(exception).__name__,
+                    "exception.message": str(exception),
+                },
+            })
+
+    def end(self) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if self.sampled:
+            self._tracer.exporter.export(self)
+
+    @property
+    def traceparent(self) -> str:
+        """W3C ``traceparent`` header value for this span."""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The span in OTLP/JSON field naming."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id or "",
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "durationMs": round(((self.end_ns or time.time_ns()) - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "events": self.events,
+            "status": {"code": self.status, "message": self.status_description},
+        }
+
+
+class SpanExporter:
+    """Receives sampled spans as they end."""
+
+    def export(self, span: Span) -> None:
+        """Export one finished span."""
+
+    def close(self) -> None:
+        """Flush and release resources."""
+
+
+class InMemorySpanExporter(SpanExporter):
+    """Keeps the most recent finished spans in memory, e.g. for offline tests."""
+
+    def __init__(self, max_spans: int = 1000):
+        self.spans: deque[Dict[str, Any]] = deque(maxlen=max_spans)
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span.to_dict())
+
+    def get_finished_spans(self, trace_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Finished spans, optionally only those of one trace."""
+        return [span for span in self.spans if trace_id is None or span["traceId"] == trace_id]
+
+    def clear(self) -> None:
+        self.spans.clear()
+
+
+class JsonlSpanExporter(SpanExporter):
+    """Appends one JSON object per span to a local file.
+
+    Lines go through the file's write buffer and are flushed when a trace's
+    local root span ends, i.e. once per completed request.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            if span.local_root:
+                self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class Tracer:
+    """Creates spans, samples traces and tracks the current span per task.
+
+    Sampling is parent-based: a trace's root decides (by ``sample_rate`` or
+    an incoming ``traceparent`` flag) and every child span follows it.
+    """
+
+    def __init__(self, exporter: Optional[SpanExporter] = None, sample_rate: float = 1.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate if exporter is not None else 0.0
+
+    def start_span(
+        self,
+        name: str,
+        attributes: Optional[Dict[str, Any]] = None,
+        traceparent: Optional[str] = None,
+    ) -> Span:
+        """Start a span under the current span, or a new (or propagated) trace."""
+        parent = _current_span.get()
+        if parent is not None:
+            return Span(self, name, parent.trace_id, parent.span_id, parent.sampled, attributes)
+        match = TRACEPARENT_PATTERN.match(traceparent or "")
+        if match:
+            trace_id, parent_span_id, flags = match.groups()
+            sampled = self.exporter is not None and bool(int(flags, 16) & 1)
+            span = Span(self, name, trace_id, parent_span_id, sampled, attributes)
+        else:
+            sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+            span = Span(self, name, _new_trace_id(), None, sampled, attributes)
+        span.local_root = True
+        return span
+
+    @contextmanager
+    def start_as_current_span(
+        self,
+        name: str,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[Span]:
+        """Start a span, make it current for the block and end it afterwards.
+
+        Exceptions are recorded on the span and re-raised.
+        """
+        span = self.start_span(name, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            span.set_status(STATUS_ERROR, str(e))
+            raise
+        finally:
+            span.end()
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # Async generators can be finalized from another context
+                pass
+
+    def close(self) -> None:
+        if self.exporter is not None:
+            self.exporter.close()
+
+
+def get_current_span() -> Optional[Span]:
+    """The span active in the current task, if any."""
+    return _current_span.get()
+
+
+def get_request_id() -> str:
+    """The current request's ID, or ``-`` outside a request."""
+    return _request_id.get()
+
+
+def install_log_record_factory() -> None:
+    """Add a ``request_id`` attribute to every log record."""
+    previous = logging.getLogRecordFactory()
+
+    def factory(*args: Any, **kwargs: Any) -> logging.LogRecord:
+        record = previous(*args, **kwargs)
+        record.request_id = _request_id.get()
+        return record
+
+    logging.setLogRecordFactory(factory)
+
+
+class TracingMiddleware:
+    """ASGI middleware opening the server span and request ID of each request.
+
+    The request ID comes from an ``X-Request-ID`` header when it looks sane,
+    otherwise it is the trace ID. It is returned in ``X-Request-ID`` along
+    with a ``traceparent`` header, and the span stays open until the last
+    body chunk so streamed responses are covered.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        tracer = get_tracer()
+        span = tracer.start_span(
+            f"{scope['method']} {scope['path']}",
+            attributes={"http.request.method": scope["method"], "url.path": scope["path"]},
+            traceparent=headers.get(TRACEPARENT_HEADER),
+        )
+        incoming_id = headers.get(REQUEST_ID_HEADER, "")
+        request_id = incoming_id if REQUEST_ID_PATTERN.match(incoming_id) else span.trace_id
+        span_token = _current_span.set(span)
+        request_token = _request_id.set(request_id)
+
+        def finish(status: Optional[int]) -> None:
+            if span.end_ns is not None:
+                return
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                span.update_name(f"{scope['method']} {route}")
+                span.set_attribute("http.route", route)
+            span.set_attribute("http.request_id", request_id)
+            if status is not None:
+                span.set_attribute("http.response.status_code", status)
+            if status is None or status >= 500:
+                span.set_status(STATUS_ERROR)
+            span.end()
+
+        status: Optional[int] = None
+
+        async def send_wrapper(message: dict) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-request-id", request_id.encode("latin-1")),
+                    (b"traceparent", span.traceparent.encode("latin-1")),
+                ]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish(status)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            finish(status)
+            _current_span.reset(span_token)
+            _request_id.reset(request_token)
+
+
+def build_exporter(kind: str) -> Optional[SpanExporter]:
+    """Create the span exporter named by ``TRACE_EXPORTER``."""
+    kind = kind.lower()
+    if kind == "none":
+        return None
+    if kind == "memory":
+        return InMemorySpanExporter(settings.TRACE_MEMORY_MAX_SPANS)
+    if kind == "jsonl":
+        return JsonlSpanExporter(os.path.expanduser(settings.TRACE_JSONL_PATH))
+    raise ValueError(f"Unknown TRACE_EXPORTER: {kind}")
+
+
+# Global tracer instance
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    """Get or create the global tracer configured from Settings."""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(
+            exporter=build_exporter(settings.TRACE_EXPORTER),
+            sample_rate=settings.TRACE_SAMPLE_RATE,
+        )
+    return _tracer
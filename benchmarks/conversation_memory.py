@@ -0,0 +1,67 @@
+"""Measure the memory footprint of in-memory conversations.
+
+Usage:
+    python -m benchmarks.conversation_memory [--conversations 200]
+
+Reports bytes per conversation for 10, 50 and 1000 appended messages
+(conversations retain at most their deque's ``maxlen`` messages).
+"""
+import argparse
+import gc
+import json
+import os
+import tracemalloc
+
+# Settings require an API key at import time; the benchmark never calls the LLM
+os.environ.setdefault("OPENROUTER_API_KEY", "benchmark")
+
+from app.conversation_store import Conversation  # noqa: E402
+
+USER_MESSAGE = "Do you have any 27-inch monitors in stock under $300? I need one for my home office."
+ASSISTANT_MESSAGE = (
+    "Yes! Here are a few 27-inch monitors currently in stock under $300:\n\n"
+    "1. **UltraView 27Q** (SKU MON-2701) - $279.99, 1440p IPS, 75Hz, 12 in stock\n"
+    "2. **ClearVision 27F** (SKU MON-2744) - $249.00, 1080p VA, 144Hz, 5 in stock\n"
+    "3. **ProDisplay 27S** (SKU MON-2790) - $299.00, 4K IPS, 60Hz, 3 in stock\n\n"
+    "Would you like more details on any of these, or help placing an order?"
+)
+
+
+def measure(message_count: int, conversations: int) -> dict:
+    """Measure retained bytes per conversation after ``message_count`` messages."""
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    store = []
+    for _ in range(conversations):
+        conversation = Conversation()
+        for i in range(message_count):
+            # Unique strings so message bodies are counted, not shared
+            if i % 2 == 0:
+                conversation.add_message("user", f"{USER_MESSAGE} [{i}]")
+            else:
+                conversation.add_message("assistant", f"{ASSISTANT_MESSAGE} [{i}]")
+        conversation.drain_pending()
+        store.append(conversation)
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    retained = len(store[0].messages)
+    return {
+        "messages_added": message_count,
+        "messages_retained": retained,
+        "bytes_per_conversation": round((after - before) / conversations),
+        "compressed_messages": sum(getattr(msg, "compressed", False) for msg in store[0].messages),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=200, help="Conversations per measurement")
+    args = parser.parse_args()
+    results = [measure(count, args.conversations) for count in (10, 50, 1000)]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
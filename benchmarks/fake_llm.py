@@ -0,0 +1,204 @@
+"""OpenAI-compatible stand-in for the LLM API with configurable latency.
+
+Usage:
+    python -m benchmarks.fake_llm [--port 9101] [--latency-ms 300] [--pattern mixed]
+
+Serves ``/v1/chat/completions`` (streaming and non-streaming) and
+``/v1/models``. Tool calls follow ``--pattern``:
+
+- ``none``: always answer directly
+- ``single``: one tool call, then answer
+- ``parallel``: ``--parallel-calls`` tool calls in one round, then answer
+- ``chain``: ``--chain-depth`` sequential rounds of one tool call each
+- ``mixed``: one of the above per conversation turn, chosen by a hash of
+  the user message so replays are deterministic
+
+Tools are picked in turn from the ones offered in the request, skipping
+``verify_customer_pin`` and ``create_order``, with placeholder arguments
+built from their JSON schemas.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import zlib
+from typing import Any, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+PATTERNS = ("none", "single", "parallel", "chain", "mixed")
+
+# Weights for the mixed pattern: most turns need no tools or one lookup
+MIXED_WEIGHTS = {"none": 0.4, "single": 0.3, "parallel": 0.2, "chain": 0.1}
+
+# Never chosen by the fake model; they need real customer data
+UNSAFE_TOOLS = {"verify_customer_pin", "create_order"}
+
+PLACEHOLDERS = {"string": "MON-2701", "integer": 1, "number": 1.0, "boolean": True}
+
+FILLER_WORDS = (
+    "Here is what I found for you: the item is in stock, ships in two days "
+    "and is covered by a one year warranty. Let me know if you need anything else."
+).split()
+
+
+def _placeholder_arguments(schema: dict[str, Any]) -> dict[str, Any]:
+    properties = schema.get("properties", {})
+    return {
+        name: PLACEHOLDERS.get(properties.get(name, {}).get("type", "string"), "x")
+        for name in schema.get("required", [])
+    }
+
+
+def create_app(
+    latency_ms: float = 300.0,
+    jitter_ms: float = 50.0,
+    token_ms: float = 5.0,
+    completion_words: int = 40,
+    pattern: str = "mixed",
+    parallel_calls: int = 2,
+    chain_depth: int = 2,
+) -> FastAPI:
+    """Build the fake LLM app."""
+    if pattern not in PATTERNS:
+        raise ValueError(f"Unknown pattern {pattern!r}; expected one of {PATTERNS}")
+    app = FastAPI(title="Fake LLM")
+    stats = {"requests": 0, "tool_call_rounds": 0}
+
+    def turn_pattern(user_message: str) -> str:
+        if pattern != "mixed":
+            return pattern
+        rng = random.Random(zlib.crc32(user_message.encode("utf-8")))
+        return rng.choices(list(MIXED_WEIGHTS), weights=list(MIXED_WEIGHTS.values()))[0]
+
+    def decide(body: dict[str, Any]) -> tuple[Optional[str], Optional[list[dict]]]:
+        """Return (content, tool_calls) for a request."""
+        messages = body["messages"]
+        tools = [tool["function"] for tool in body.get("tools") or []]
+        last_user = max(i for i, message in enumerate(messages) if message["role"] == "user")
+        rounds_done = sum(1 for message in messages[last_user:] if message.get("tool_calls"))
+        user_message = messages[last_user]["content"]
+
+        chosen = turn_pattern(user_message)
+        wanted = {"none": 0, "single": 1, "parallel": 1, "chain": chain_depth}[chosen]
+        candidates = [tool for tool in tools if tool["name"] not in UNSAFE_TOOLS]
+        if candidates and rounds_done < wanted:
+            count = parallel_calls if chosen == "parallel" else 1
+            picks = [candidates[(rounds_done + i) % len(candidates)] for i in range(count)]
+            tool_calls = [
+                {
+                    "id": f"call_{rounds_done}_{i}",
+                    "type": "function",
+                    "function": {
+                        "name": tool["name"],
+                        "arguments": json.dumps(_placeholder_arguments(tool.get("parameters") or {})),
+                    },
+                }
+                for i, tool in enumerate(picks)
+            ]
+            return None, tool_calls
+        return " ".join(FILLER_WORDS[i % len(FILLER_WORDS)] for i in range(completion_words)), None
+
+    def usage_for(body: dict[str, Any], content: Optional[str]) -> dict[str, int]:
+        prompt_tokens = len(json.dumps(body["messages"])) // 4
+        completion_tokens = len((content or "").split()) + 10
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    rate_limit_headers = {
+        "x-ratelimit-limit-requests": "10000",
+        "x-ratelimit-remaining-requests": "9999",
+        "x-ratelimit-limit-tokens": "10000000",
+        "x-ratelimit-remaining-tokens": "9999000",
+    }
+
+    @app.get("/v1/models")
+    async def models() -> dict[str, Any]:
+        return {"object": "list", "data": [{"id": "fake-model", "object": "model", "created": 0, "owned_by": "bench"}]}
+
+    @app.get("/stats")
+    async def get_stats() -> dict[str, int]:
+        return stats
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        await asyncio.sleep(max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000)
+        content, tool_calls = decide(body)
+        if tool_calls:
+            stats["tool_call_rounds"] += 1
+        usage = usage_for(body, content)
+        finish_reason = "tool_calls" if tool_calls else "stop"
+        base = {"id": f"chatcmpl-{time.time_ns()}", "created": int(time.time()), "model": body["model"]}
+
+        if body.get("stream"):
+            async def chunks():
+                chunk = {**base, "object": "chat.completion.chunk"}
+                if tool_calls:
+                    for index, tool_call in enumerate(tool_calls):
+                        delta = {"tool_calls": [{"index": index, **tool_call}]}
+                        yield f"data: {json.dumps({**chunk, 'choices': [{'index': 0, 'delta': delta}]})}\n\n"
+                else:
+                    for word in content.split(" "):
+                        delta = {"content": word + " "}
+                        yield f"data: {json.dumps({**chunk, 'choices': [{'index': 0, 'delta': delta}]})}\n\n"
+                        if token_ms:
+                            await asyncio.sleep(token_ms / 1000)
+                done = {"index": 0, "delta": {}, "finish_reason": finish_reason}
+                yield f"data: {json.dumps({**chunk, 'choices': [done]})}\n\n"
+                yield f"data: {json.dumps({**chunk, 'choices': [], 'usage': usage})}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(chunks(), media_type="text/event-stream", headers=rate_limit_headers)
+
+        if token_ms and content:
+            await asyncio.sleep(token_ms * len(content.split()) / 1000)
+        message: dict[str, Any] = {"role": "assistant", "content": content}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        return JSONResponse(
+            {
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": usage,
+            },
+            headers=rate_limit_headers,
+        )
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9101)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Time to first token")
+    parser.add_argument("--jitter-ms", type=float, default=50.0, help="Uniform +/- jitter on latency")
+    parser.add_argument("--token-ms", type=float, default=5.0, help="Delay per generated word")
+    parser.add_argument("--completion-words", type=int, default=40)
+    parser.add_argument("--pattern", choices=PATTERNS, default="mixed")
+    parser.add_argument("--parallel-calls", type=int, default=2)
+    parser.add_argument("--chain-depth", type=int, default=2)
+    args = parser.parse_args()
+    app = create_app(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        token_ms=args.token_ms,
+        completion_words=args.completion_words,
+        pattern=args.pattern,
+        parallel_calls=args.parallel_calls,
+        chain_depth=args.chain_depth,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""MCP Streamable-HTTP stand-in exposing the support tools with fixed latency.
+
+Usage:
+    python -m benchmarks.fake_mcp [--port 9102] [--latency-ms 40]
+
+Tool names match the production MCP server so cache and mutating-tool
+settings apply unchanged. Results are small canned JSON payloads; the
+server is served at ``/mcp``.
+"""
+import argparse
+import asyncio
+import json
+
+from mcp.server.fastmcp import FastMCP
+
+
+def create_server(host: str = "127.0.0.1", port: int = 9102, latency_ms: float = 40.0) -> FastMCP:
+    """Build the fake MCP server."""
+    server = FastMCP("fake-support", host=host, port=port, log_level="WARNING")
+    delay = latency_ms / 1000
+
+    @server.tool()
+    async def list_products(category: str = "") -> str:
+        """List products, optionally filtered by category."""
+        await asyncio.sleep(delay)
+        return json.dumps([
+            {"sku": f"MON-27{i:02d}", "name": f"Monitor {i}", "category": category or "monitors", "price": 199 + i}
+            for i in range(10)
+        ])
+
+    @server.tool()
+    async def get_product(sku: str) -> str:
+        """Get product details by SKU."""
+        await asyncio.sleep(delay)
+        return json.dumps({"sku": sku, "name": "UltraView 27Q", "price": 279.99, "stock": 12})
+
+    @server.tool()
+    async def search_products(query: str) -> str:
+        """Search products by keyword."""
+        await asyncio.sleep(delay)
+        return json.dumps([{"sku": "MON-2701", "name": f"{query} match", "price": 279.99}])
+
+    @server.tool()
+    async def get_customer(customer_id: str) -> str:
+        """Get customer details."""
+        await asyncio.sleep(delay)
+        return json.dumps({"customer_id": customer_id, "name": "Test Customer"})
+
+    @server.tool()
+    async def verify_customer_pin(email: str, pin: str) -> str:
+        """Verify a customer's email and PIN."""
+        await asyncio.sleep(delay)
+        return json.dumps({"verified": True, "customer_id": "CUST-1"})
+
+    @server.tool()
+    async def list_orders(customer_id: str) -> str:
+        """List a customer's orders."""
+        await asyncio.sleep(delay)
+        return json.dumps([{"order_id": "ORD-1001", "status": "shipped"}])
+
+    @server.tool()
+    async def get_order(order_id: str) -> str:
+        """Get order details."""
+        await asyncio.sleep(delay)
+        return json.dumps({"order_id": order_id, "status": "shipped", "items": 2})
+
+    @server.tool()
+    async def create_order(customer_id: str, sku: str, quantity: int = 1) -> str:
+        """Create an order."""
+        await asyncio.sleep(delay)
+        return json.dumps({"order_id": "ORD-2001", "customer_id": customer_id, "sku": sku, "quantity": quantity})
+
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9102)
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="Delay per tool call")
+    args = parser.parse_args()
+    create_server(args.host, args.port, args.latency_ms).run(transport="streamable-http")
+
+
+if __name__ == "__main__":
+    main()
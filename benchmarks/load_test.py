@@ -0,0 +1,441 @@
+"""Load-test main:app offline against local LLM and MCP stand-ins.
+
+Usage:
+    python -m benchmarks.load_test [--concurrency 16] [--requests 400]
+        [--endpoint chat|stream] [--corpus requests.jsonl] [--label NAME]
+        [--env KEY=VALUE ...] [--baseline benchmarks/results/<run>.json]
+
+Starts ``benchmarks.fake_llm``, ``benchmarks.fake_mcp`` and ``main:app`` as
+subprocesses on free ports, drives ``/v1/chat`` (or ``/v1/chat/stream``)
+with ``--concurrency`` virtual users, and writes a JSON report with
+p50/p95/p99 latency, throughput, app RSS and the app's ``/v1/stats``.
+
+Messages come from ``--corpus``: a JSONL file whose lines carry a
+``message``, ``body`` or ``title`` field (the backlog ``requests.jsonl``
+works), or a text file with one message per line. Each virtual user
+starts its own session, so it gets its own conversation. It also connects
+from its own loopback address (127.0.x.y), which keeps conversations apart
+on apps without sessions; pass ``--shared-ip`` where only 127.0.0.1 is
+routable.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_OUTPUT_DIR = ROOT / "benchmarks" / "results"
+
+DEFAULT_MESSAGES = [
+    "Do you have any 27-inch monitors in stock?",
+    "What's the price of SKU MON-2701?",
+    "Can you compare the UltraView 27Q and the ClearVision 27F?",
+    "What are your shipping options?",
+    "I want to check the status of my order ORD-1001.",
+    "Do you sell mechanical keyboards?",
+    "What's your return policy?",
+    "Which laptops do you have under $1000?",
+]
+
+
+def load_corpus(path: Optional[str]) -> list[str]:
+    """Read replay messages from a JSONL or plain-text file."""
+    if path is None:
+        return list(DEFAULT_MESSAGES)
+    messages = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            messages.append(line)
+            continue
+        if isinstance(record, dict):
+            text = record.get("message") or record.get("body") or record.get("title")
+            if text:
+                messages.append(str(text))
+        elif isinstance(record, str):
+            messages.append(record)
+    if not messages:
+        raise ValueError(f"No messages found in {path}")
+    return messages
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Linearly interpolated percentile ``q`` (0-100) of sorted values."""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(values: list[float]) -> dict[str, float]:
+    """p50/p95/p99/mean/max of a list of milliseconds."""
+    ordered = sorted(values)
+    return {
+        "p50": round(percentile(ordered, 50), 1),
+        "p95": round(percentile(ordered, 95), 1),
+        "p99": round(percentile(ordered, 99), 1),
+        "mean": round(sum(ordered) / len(ordered), 1) if ordered else 0.0,
+        "max": round(ordered[-1], 1) if ordered else 0.0,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Resident set size of a process in MiB (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        return None
+    return None
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Services:
+    """The fake LLM, fake MCP server and app under test, as subprocesses."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.llm_port = free_port()
+        self.mcp_port = free_port()
+        self.app_port = free_port()
+        self.processes: list[subprocess.Popen] = []
+        self.app: Optional[subprocess.Popen] = None
+
+    @property
+    def app_url(self) -> str:
+        return f"http://127.0.0.1:{self.app_port}"
+
+    def _spawn(self, module_args: list[str], env: Optional[dict[str, str]] = None) -> subprocess.Popen:
+        process = subprocess.Popen(
+            [sys.executable, "-m", *module_args],
+            cwd=ROOT,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL if not self.args.verbose else None,
+        )
+        self.processes.append(process)
+        return process
+
+    async def start(self) -> None:
+        args = self.args
+        self._spawn([
+            "benchmarks.fake_llm",
+            "--port", str(self.llm_port),
+            "--latency-ms", str(args.llm_latency_ms),
+            "--token-ms", str(args.token_ms),
+            "--pattern", args.pattern,
+        ])
+        self._spawn(["benchmarks.fake_mcp", "--port", str(self.mcp_port), "--latency-ms", str(args.mcp_latency_ms)])
+        await wait_for_port(self.llm_port)
+        await wait_for_port(self.mcp_port)
+
+        env = {
+            **os.environ,
+            "OPENROUTER_API_KEY": "benchmark",
+            "OPENROUTER_BASE_URL": f"http://127.0.0.1:{self.llm_port}/v1",
+            "MCP_SERVER_URL": f"http://127.0.0.1:{self.mcp_port}/mcp",
+            **dict(item.split("=", 1) for item in args.env),
+        }
+        self.app = self._spawn(
+            ["uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(self.app_port), "--log-level", "warning"],
+            env=env,
+        )
+        await wait_for_http(f"{self.app_url}/ready")
+
+    def stop(self) -> None:
+        for process in reversed(self.processes):
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+async def wait_for_port(port: int, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"Nothing listening on port {port} after {timeout}s")
+
+
+async def wait_for_http(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+class RssSampler:
+    """Samples a process's RSS in the background, keeping start/peak/end."""
+
+    def __init__(self, pid: Optional[int], interval: float = 0.25):
+        self.pid = pid
+        self.interval = interval
+        self.start: Optional[float] = None
+        self.peak: Optional[float] = None
+        self.end: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _sample(self) -> Optional[float]:
+        value = rss_mb(self.pid) if self.pid else None
+        if value is not None:
+            self.peak = max(self.peak or 0.0, value)
+        return value
+
+    async def _run(self) -> None:
+        while True:
+            self._sample()
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self) -> "RssSampler":
+        self.start = self._sample()
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._task.cancel()
+        self.end = self._sample()
+
+    def as_dict(self) -> dict[str, Optional[float]]:
+        return {"start": self.start, "peak": self.peak, "end": self.end}
+
+
+async def send_chat(client: httpx.AsyncClient, url: str, payload: dict, stream: bool) -> dict[str, Any]:
+    """Send one chat request; return its latency, time to first token and status."""
+    started = time.perf_counter()
+    first_token: Optional[float] = None
+    if not stream:
+        response = await client.post(f"{url}/v1/chat", json=payload)
+        ok = response.status_code == 200
+        return {
+            "ms": (time.perf_counter() - started) * 1000,
+            "ttft_ms": None,
+            "status": response.status_code,
+            "ok": ok,
+            "cached": ok and response.json().get("cached", False),
+        }
+    ok, cached, event = False, False, ""
+    async with client.stream("POST", f"{url}/v1/chat/stream", json=payload) as response:
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[7:]
+                if event == "token" and first_token is None:
+                    first_token = time.perf_counter()
+            elif line.startswith("data: ") and event == "done":
+                ok = response.status_code == 200
+                cached = json.loads(line[6:]).get("cached", False)
+            elif line.startswith("data: ") and event == "error":
+                ok = False
+    return {
+        "ms": (time.perf_counter() - started) * 1000,
+        "ttft_ms": (first_token - started) * 1000 if first_token else None,
+        "status": response.status_code,
+        "ok": ok,
+        "cached": cached,
+    }
+
+
+async def run_load(args: argparse.Namespace, url: str, messages: list[str]) -> tuple[list[dict], float]:
+    """Run ``args.requests`` chat turns over ``args.concurrency`` virtual users."""
+    counter = iter(range(args.warmup + args.requests))
+    results: list[dict] = []
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=1, max_keepalive_connections=1)
+    measure_from: list[float] = []
+
+    async def virtual_user(user: int) -> None:
+        transport = None
+        if not args.shared_ip:
+            transport = httpx.AsyncHTTPTransport(local_address=f"127.0.{user // 250}.{user % 250 + 2}")
+        async with httpx.AsyncClient(timeout=timeout, limits=limits, transport=transport) as client:
+            # Apps without sessions fall back to keying on the loopback address
+            session = await client.post(f"{url}/v1/session")
+            if session.status_code == 200:
+                body = session.json()
+                client.headers[body["header"]] = body["session"]
+            turn = 0
+            for index in counter:
+                if index == args.warmup and not measure_from:
+                    measure_from.append(time.perf_counter())
+                payload = {
+                    "message": messages[index % len(messages)],
+                    # Start a new conversation every --session-turns turns
+                    "clear_history": turn % args.session_turns == 0,
+                }
+                turn += 1
+                try:
+                    result = await send_chat(client, url, payload, args.endpoint == "stream")
+                except httpx.HTTPError as e:
+                    result = {"ms": None, "ttft_ms": None, "status": type(e).__name__, "ok": False, "cached": False}
+                if index >= args.warmup:
+                    results.append(result)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(virtual_user(user) for user in range(args.concurrency)))
+    elapsed = time.perf_counter() - (measure_from[0] if measure_from else started)
+    return results, elapsed
+
+
+def build_report(
+    args: argparse.Namespace,
+    results: list[dict],
+    elapsed: float,
+    rss: dict,
+    server_stats: Any,
+) -> dict[str, Any]:
+    ok = [result for result in results if result["ok"]]
+    statuses: dict[str, int] = {}
+    for result in results:
+        statuses[str(result["status"])] = statuses.get(str(result["status"]), 0) + 1
+    ttfts = [result["ttft_ms"] for result in ok if result["ttft_ms"] is not None]
+    return {
+        "label": args.label,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": git_commit(),
+        "config": {
+            "endpoint": args.endpoint,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "session_turns": args.session_turns,
+            "corpus": args.corpus,
+            "llm_latency_ms": args.llm_latency_ms,
+            "mcp_latency_ms": args.mcp_latency_ms,
+            "token_ms": args.token_ms,
+            "pattern": args.pattern,
+            "env": args.env,
+        },
+        "summary": {
+            "requests": len(results),
+            "errors": len(results) - len(ok),
+            "cached": sum(1 for result in ok if result["cached"]),
+            "duration_s": round(elapsed, 2),
+            "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": summarize([result["ms"] for result in ok]),
+            "ttft_ms": summarize(ttfts) if ttfts else None,
+            "rss_mb": rss,
+            "status_codes": statuses,
+        },
+        "server_stats": server_stats,
+    }
+
+
+def compare(report: dict, baseline: dict) -> list[str]:
+    """Lines comparing headline numbers against a baseline report."""
+    rows = [("throughput_rps", ("throughput_rps",))]
+    rows += [(f"latency {q}", ("latency_ms", q)) for q in ("p50", "p95", "p99")]
+    rows += [("rss peak MB", ("rss_mb", "peak"))]
+    lines = [f"{'metric':<16}{'baseline':>12}{'current':>12}{'change':>10}"]
+    for name, path in rows:
+        old, new = baseline["summary"], report["summary"]
+        for key in path:
+            old = (old or {}).get(key)
+            new = (new or {}).get(key)
+        change = f"{(new - old) / old * 100:+.1f}%" if old and new is not None else "n/a"
+        lines.append(f"{name:<16}{str(old):>12}{str(new):>12}{change:>10}")
+    return lines
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    messages = load_corpus(args.corpus)
+    services = None
+    pid = args.pid
+    url = args.target
+    if url is None:
+        services = Services(args)
+        await services.start()
+        url, pid = services.app_url, services.app.pid
+    try:
+        with RssSampler(pid) as rss:
+            results, elapsed = await run_load(args, url, messages)
+        async with httpx.AsyncClient() as client:
+            try:
+                server_stats = (await client.get(f"{url}/v1/stats")).json()
+            except (httpx.HTTPError, ValueError):
+                server_stats = None
+    finally:
+        if services is not None:
+            services.stop()
+    return build_report(args, results, elapsed, rss.as_dict(), server_stats)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=16, help="Virtual users")
+    parser.add_argument("--requests", type=int, default=400, help="Measured chat turns")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured turns first")
+    parser.add_argument("--endpoint", choices=("chat", "stream"), default="chat")
+    parser.add_argument("--corpus", help="JSONL or text file of messages to replay")
+    parser.add_argument("--session-turns", type=int, default=4, help="Turns per conversation before clearing")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--mcp-latency-ms", type=float, default=40.0)
+    parser.add_argument("--token-ms", type=float, default=5.0)
+    parser.add_argument("--pattern", default="mixed", help="Fake LLM tool-call pattern")
+    parser.add_argument("--env", action="append", default=[], help="Extra app setting, KEY=VALUE (repeatable)")
+    parser.add_argument("--target", help="Benchmark an already running app at this URL instead")
+    parser.add_argument("--pid", type=int, help="PID of the --target app, for RSS sampling")
+    parser.add_argument("--shared-ip", action="store_true", help="Send every user from 127.0.0.1")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--label", default="run", help="Name for this run in the report")
+    parser.add_argument("--output-dir", default=str(DEFAULT_OUTPUT_DIR))
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    parser.add_argument("--verbose", action="store_true", help="Show subprocess stderr")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output = output_dir / f"{time.strftime('%Y%m%d-%H%M%S')}-{args.label}.json"
+    output.write_text(json.dumps(report, indent=2))
+
+    print(json.dumps(report["summary"], indent=2))
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        print("\n".join(compare(report, baseline)))
+    print(f"Saved {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,37 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+# Imported first so the remaining imports can be timed
+from app.startup import get_startup_profile, warm_up
 
-from api.routes import router
-from app.config import settings
+startup_profile = get_startup_profile()
 
-# Configure logging
+from fastapi import FastAPI  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+
+startup_profile.mark("import_fastapi")
+
+from app.config import settings  # noqa: E402
+
+startup_profile.mark("settings")
+
+from api.routes import router  # noqa: E402
+from app.conversation_store import get_conversation_store  # noqa: E402
+from app.health_monitor import get_health_monitor  # noqa: E402
+from app.llm_service import get_llm_service  # noqa: E402
+from app.mcp_client import get_mcp_client  # noqa: E402
+from app.metrics import MetricsMiddleware  # noqa: E402
+from app.tool_catalog import get_tool_catalog  # noqa: E402
+from app.tracing import TracingMiddleware, get_tracer, install_log_record_factory  # noqa: E402
+
+startup_profile.mark("import_app")
+
+# Configure logging; records carry the current request ID
+install_log_record_factory()
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    format='%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'
 )
 logger = logging.getLogger(__name__)
 
@@ -21,8 +42,31 @@ async def lifespan(app: FastAPI):
     logger.info("Starting Customer Support Chatbot...")
     logger.info(f"MCP Server: {settings.MCP_SERVER_URL}")
     logger.info(f"LLM Model: {settings.MODEL_NAME}")
+    store = get_conversation_store()
+    await store.start()
+    # Warm the MCP pool, tool list, prompts and LLM connection; /ready flips when done
+    warmup = None
+    if settings.WARMUP_BLOCKING:
+        await warm_up(startup_profile)
+    else:
+        warmup = asyncio.create_task(warm_up(startup_profile))
     yield
     logger.info("Shutting down Customer Support Chatbot...")
+    if warmup is not None:
+        # Let warm-up stop before the MCP pool and HTTP client it uses are closed
+        warmup.cancel()
+        try:
+            await warmup
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Warm-up failed: {e}")
+    await get_health_monitor().close()
+    await get_tool_catalog().close()
+    await get_mcp_client().close()
+    await store.close()
+    await get_llm_service().close()
+    get_tracer().close()
 
 
 # Create FastAPI app
@@ -40,11 +84,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "traceparent"],
 )
 
+# Time every request until its last response byte
+app.add_middleware(MetricsMiddleware)
+
+# Outermost: assign the request ID and open the server span
+app.add_middleware(TracingMiddleware)
+
 # Include routes
 app.include_router(router)
 
+startup_profile.mark("app_setup")
+
 
 @app.get("/health")
 async def health():
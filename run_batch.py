@@ -0,0 +1,70 @@
+"""Run scripted conversations through the support agent, in process.
+
+Usage:
+    python run_batch.py conversations.jsonl [--output results.ndjson]
+        [--concurrency 8] [--limit N]
+
+Each input line is a conversation: ``{"id": ..., "messages": [...]}``, a
+record with a ``message``, ``body`` or ``title`` field (``requests.jsonl``
+works), or plain text for a single message. Results are written as NDJSON
+in completion order, one ``result`` line per conversation followed by a
+``summary`` line, the same format ``/v1/chat/batch`` streams. The app starts
+and shuts down as it does under uvicorn, using the same settings.
+"""
+import argparse
+import asyncio
+import sys
+from typing import TextIO
+
+from main import app, lifespan
+from app.admission import get_admission_controller
+from app.agent import get_support_agent
+from app.batch import BatchRunner, load_conversations
+from app.config import settings
+from app.models import BatchSummary
+
+
+async def run(args: argparse.Namespace, output: TextIO) -> BatchSummary:
+    conversations = load_conversations(args.input)
+    if args.limit:
+        conversations = conversations[:args.limit]
+    async with lifespan(app):
+        runner = BatchRunner(get_support_agent(), concurrency=args.concurrency, admission=get_admission_controller())
+        done = 0
+        async for item in runner.run(conversations):
+            output.write(item.model_dump_json() + "\n")
+            output.flush()
+            if isinstance(item, BatchSummary):
+                return item
+            done += 1
+            status = "ok" if item.ok else f"failed: {item.error}"
+            print(f"[{done}/{len(conversations)}] {item.id}: {item.latency_ms:.0f}ms {status}", file=sys.stderr)
+    raise RuntimeError("Batch ended without a summary")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="JSONL (or plain-text) file of conversations")
+    parser.add_argument("--output", "-o", help="NDJSON results file (default: stdout)")
+    parser.add_argument(
+        "--concurrency", type=int, default=settings.BATCH_MAX_CONCURRENCY, help="Conversations run at once"
+    )
+    parser.add_argument("--limit", type=int, help="Only run the first N conversations")
+    args = parser.parse_args()
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        summary = asyncio.run(run(args, output))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(
+        f"{summary.succeeded}/{summary.conversations} conversations succeeded in {summary.elapsed_ms / 1000:.1f}s "
+        f"(p50 {summary.p50_ms:.0f}ms, p95 {summary.p95_ms:.0f}ms, {summary.usage.total_tokens} tokens)",
+        file=sys.stderr,
+    )
+    sys.exit(1 if summary.failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import asyncio
+import os
+import time
+
+# Settings are read at import time and the API key is required
+os.environ.setdefault("OPENROUTER_API_KEY", "test-key")
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def run():
+    """Run a coroutine to completion on a fresh event loop."""
+    return asyncio.run
+
+
+class Clock:
+    """Shifts ``time.monotonic`` forward on demand, for TTL and timeout tests."""
+
+    def __init__(self):
+        self.offset = 0.0
+
+    def advance(self, seconds: float) -> None:
+        self.offset += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake clock: ``clock.advance(s)`` moves ``time.monotonic`` ahead by ``s`` seconds."""
+    fake = Clock()
+    real_monotonic = time.monotonic
+    monkeypatch.setattr(time, "monotonic", lambda: real_monotonic() + fake.offset)
+    return fake
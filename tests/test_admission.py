@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from app.admission import AdmissionController, OverloadedError
+
+
+def test_user_turns_are_serialized_and_excess_gets_429(run):
+    controller = AdmissionController(max_concurrent=4, max_queue=4, queue_timeout=1, max_user_queued=1)
+
+    async def scenario():
+        first = await controller.admit("alice")
+        queued = asyncio.create_task(controller.admit("alice"))
+        await asyncio.sleep(0.01)
+        assert not queued.done()
+        with pytest.raises(OverloadedError) as shed:
+            await controller.admit("alice")
+        # Other users are not affected
+        (await controller.admit("bob")).release()
+        first.release()
+        (await queued).release()
+        return shed.value
+
+    error = run(scenario())
+    assert error.status_code == 429
+    assert error.retry_after >= 1
+    assert controller.get_stats()["rejected_user"] == 1
+    assert controller.get_stats()["active_users"] == 0
+
+
+def test_full_queue_gets_503_immediately(run):
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=1)
+
+    async def scenario():
+        running = await controller.admit("alice")
+        waiting = asyncio.create_task(controller.admit("bob"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(OverloadedError) as shed:
+            await controller.admit("carol")
+        running.release()
+        (await waiting).release()
+        return shed.value
+
+    error = run(scenario())
+    assert error.status_code == 503
+    assert controller.get_stats()["rejected_queue_full"] == 1
+    assert controller.get_stats()["in_flight"] == 0
+
+
+def test_queue_wait_times_out_with_503(run):
+    controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=0.05)
+
+    async def scenario():
+        running = await controller.admit("alice")
+        with pytest.raises(OverloadedError) as shed:
+            await controller.admit("bob")
+        running.release()
+        # The slot the timed-out waiter gave up is still usable
+        (await asyncio.wait_for(controller.admit("carol"), timeout=0.1)).release()
+        return shed.value
+
+    assert run(scenario()).status_code == 503
+    stats = controller.get_stats()
+    assert (stats["rejected_timeout"], stats["waiting"], stats["in_flight"]) == (1, 0, 0)
+
+
+def test_ticket_release_is_idempotent(run):
+    controller = AdmissionController(max_concurrent=1)
+
+    async def scenario():
+        ticket = await controller.admit("alice")
+        ticket.release()
+        ticket.release()
+        async with await controller.admit("alice"):
+            assert controller.in_flight == 1
+
+    run(scenario())
+    assert controller.in_flight == 0
+
+
+def test_batch_turns_yield_to_queued_interactive_requests(run):
+    controller = AdmissionController(max_concurrent=2, max_queue=4, queue_timeout=1, max_batch=1)
+    order = []
+
+    async def turn(label, admit):
+        async with await admit:
+            order.append(label)
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        busy = [await controller.admit("alice"), await controller.admit("bob")]
+        tasks = [
+            asyncio.create_task(turn(f"batch{i}", controller.admit_batch(f"batch:{i}"))) for i in range(3)
+        ]
+        await asyncio.sleep(0.01)
+        tasks.append(asyncio.create_task(turn("carol", controller.admit("carol"))))
+        await asyncio.sleep(0.01)
+        stats = controller.get_stats()
+        for ticket in busy:
+            ticket.release()
+        await asyncio.gather(*tasks)
+        return stats
+
+    stats = run(scenario())
+    assert (stats["waiting"], stats["batch_waiting"]) == (1, 3)
+    assert order == ["carol", "batch0", "batch1", "batch2"]
+    assert controller.get_stats()["batch_admitted"] == 3
+
+
+def test_batch_lane_is_capped_across_batches(run):
+    controller = AdmissionController(max_concurrent=8, max_batch=2)
+    peak = 0
+
+    async def batch_turn(i):
+        nonlocal peak
+        async with await controller.admit_batch(f"batch:{i}"):
+            peak = max(peak, controller.batch_in_flight)
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        await asyncio.gather(*(batch_turn(i) for i in range(6)))
+
+    run(scenario())
+    assert peak == 2
+    assert controller.get_stats()["in_flight"] == 0
@@ -0,0 +1,188 @@
+import asyncio
+import json
+import time
+
+import pytest
+from openai.types import CompletionUsage
+from openai.types.chat import ChatCompletion, ChatCompletionMessage, ChatCompletionMessageToolCall
+from openai.types.chat.chat_completion import Choice
+from openai.types.chat.chat_completion_message_tool_call import Function
+
+from app.agent import SupportAgent
+from app.config import settings
+
+
+def tool(name):
+    return {
+        "type": "function",
+        "function": {"name": name, "description": name, "parameters": {"type": "object", "properties": {}}},
+    }
+
+
+def tool_call(call_id, name, **arguments):
+    return ChatCompletionMessageToolCall(
+        id=call_id, type="function", function=Function(name=name, arguments=json.dumps(arguments))
+    )
+
+
+def completion(content=None, tool_calls=None, tokens=10):
+    return ChatCompletion(
+        id="cmpl",
+        object="chat.completion",
+        created=0,
+        model="test-model",
+        choices=[Choice(
+            index=0,
+            finish_reason="tool_calls" if tool_calls else "stop",
+            message=ChatCompletionMessage(role="assistant", content=content, tool_calls=tool_calls),
+        )],
+        usage=CompletionUsage(prompt_tokens=tokens, completion_tokens=0, total_tokens=tokens),
+    )
+
+
+class FakeLLM:
+    """Replays scripted completions and records what each call was given."""
+
+    model = "test-model"
+
+    def __init__(self, *replies, delay=0.0):
+        self.replies = list(replies)
+        self.delay = delay
+        self.calls = []
+
+    async def chat(self, messages, tools=None, priority=0, user="", tool_choice="auto"):
+        self.calls.append({"messages": list(messages), "tools": tools, "tool_choice": tool_choice})
+        await asyncio.sleep(self.delay)
+        reply = self.replies.pop(0) if len(self.replies) > 1 else self.replies[0]
+        return reply() if callable(reply) else reply
+
+
+class FakeMCP:
+    """Tool calls that return ``<name> result`` after a per-tool delay."""
+
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.calls = []
+
+    async def call_tool(self, name, arguments):
+        self.calls.append(name)
+        await asyncio.sleep(self.delays.get(name, 0))
+        return f"{name} result"
+
+
+class FakeCatalog:
+    def __init__(self, names):
+        self.tools = [tool(name) for name in names]
+
+    async def get_tools(self):
+        return self.tools
+
+
+@pytest.fixture
+def make_agent():
+    def make(llm, mcp=None, tools=("get_product", "search_products", "list_products")):
+        agent = SupportAgent()
+        agent.llm_service = llm
+        agent.mcp_client = mcp or FakeMCP()
+        agent.tool_catalog = FakeCatalog(tools)
+        return agent
+
+    return make
+
+
+def chat(agent, message="Do you have the MON-2701?", user="agent-test"):
+    async def turn():
+        return await agent.chat(message, f"{user}-{time.monotonic_ns()}", use_response_cache=False)
+
+    return asyncio.run(turn())
+
+
+def tool_results(call):
+    return [(m["tool_call_id"], m["content"]) for m in call["messages"] if m["role"] == "tool"]
+
+
+def test_parallel_tool_results_keep_tool_call_order(make_agent):
+    llm = FakeLLM(
+        completion(tool_calls=[
+            tool_call("a", "search_products", query="monitor"),
+            tool_call("b", "get_product", sku="MON-2701"),
+            tool_call("c", "list_products"),
+        ]),
+        completion("Here it is."),
+    )
+    mcp = FakeMCP(delays={"search_products": 0.2, "get_product": 0.2, "list_products": 0.2})
+    response = chat(make_agent(llm, mcp))
+
+    assert response.response == "Here it is."
+    assert tool_results(llm.calls[1]) == [
+        ("a", "search_products result"),
+        ("b", "get_product result"),
+        ("c", "list_products result"),
+    ]
+    assert [call.name for call in response.tool_calls] == ["search_products", "get_product", "list_products"]
+    # Run concurrently: the round takes about as long as the slowest tool
+    assert response.rounds[0].tool_ms < 400
+
+
+def test_slow_tool_times_out_without_holding_up_the_others(make_agent, monkeypatch):
+    monkeypatch.setattr(settings, "TOOL_TIMEOUT_SECONDS", 0.05)
+    llm = FakeLLM(
+        completion(tool_calls=[tool_call("a", "search_products", query="x"), tool_call("b", "get_product", sku="Y")]),
+        completion("Done."),
+    )
+    chat(make_agent(llm, FakeMCP(delays={"search_products": 5})))
+    assert tool_results(llm.calls[1]) == [
+        ("a", "Error: tool search_products timed out"),
+        ("b", "get_product result"),
+    ]
+
+
+def test_tools_not_offered_are_refused(make_agent):
+    llm = FakeLLM(
+        completion(tool_calls=[tool_call("a", "create_order", sku="X"), tool_call("b", "get_product", sku="X")]),
+        completion("Done."),
+    )
+    mcp = FakeMCP()
+    chat(make_agent(llm, mcp, tools=("get_product", "create_order")))
+    assert tool_results(llm.calls[1])[0] == ("a", "Error: tool create_order is not available yet")
+    assert mcp.calls == ["get_product"]
+
+
+def test_turn_ends_with_a_final_pass_after_max_tool_rounds(make_agent, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_TOOL_ROUNDS", 2)
+    # Keeps calling tools for as long as it is allowed to
+    llm = FakeLLM(lambda: (
+        completion(tool_calls=[tool_call("a", "list_products")]) if llm.calls[-1]["tool_choice"] == "auto"
+        else completion("still looking")
+    ))
+    response = chat(make_agent(llm))
+    assert len(llm.calls) == 3
+    assert [call["tool_choice"] for call in llm.calls] == ["auto", "auto", "none"]
+    # The final pass keeps the schemas the earlier tool calls refer to
+    assert llm.calls[2]["tools"] == llm.calls[1]["tools"]
+    assert response.response == "still looking"
+    assert len(response.tool_calls) == 2
+
+
+def test_token_budget_forces_the_final_pass(make_agent, monkeypatch):
+    monkeypatch.setattr(settings, "TURN_TOKEN_BUDGET", 100)
+    llm = FakeLLM(
+        completion(tool_calls=[tool_call("a", "list_products")], tokens=150),
+        completion("Out of budget answer."),
+    )
+    response = chat(make_agent(llm))
+    assert len(llm.calls) == 2
+    assert llm.calls[1]["tool_choice"] == "none"
+    assert response.rounds[1].tools_offered == 3
+    assert response.response == "Out of budget answer."
+    assert response.usage.total_tokens == 160
+
+
+def test_turn_deadline_stops_a_slow_llm_call(make_agent, monkeypatch):
+    monkeypatch.setattr(settings, "TURN_DEADLINE_SECONDS", 0.05)
+    llm = FakeLLM(completion("too late"), delay=1)
+    started = time.perf_counter()
+    response = chat(make_agent(llm))
+    assert time.perf_counter() - started < 0.5
+    assert response.rounds == []
+    assert response.response == "I apologize, but I couldn't generate a response."
@@ -0,0 +1,59 @@
+from app.context_builder import build_context, estimate_message_tokens
+from app.conversation_store import Conversation
+
+
+def conversation_with(count, size=40):
+    conversation = Conversation()
+    for i in range(count):
+        conversation.add_message("user" if i % 2 == 0 else "assistant", f"message {i} " + "x" * size)
+    return conversation
+
+
+def test_everything_fits_a_large_budget():
+    conversation = conversation_with(6)
+    built = build_context(conversation, token_budget=10_000)
+    assert built.history_messages == 6
+    assert built.overflow == []
+    assert [m["content"] for m in built.messages] == [m.content for m in conversation.messages]
+
+
+def test_budget_keeps_newest_messages_and_reports_overflow():
+    conversation = conversation_with(10)
+    per_message = estimate_message_tokens(conversation.messages[-1].content)
+    built = build_context(conversation, token_budget=per_message * 3)
+    assert built.history_messages == 3
+    assert built.estimated_tokens <= per_message * 3
+    assert built.messages[-1]["content"].startswith("message 9 ")
+    assert [m.content for m in built.overflow] == [m.content for m in list(conversation.messages)[:7]]
+    assert built.overflow_end == 7
+
+
+def test_latest_message_is_kept_even_over_budget():
+    conversation = conversation_with(3, size=2000)
+    built = build_context(conversation, token_budget=1)
+    assert built.history_messages == 1
+    assert built.messages[-1]["content"].startswith("message 2 ")
+
+
+def test_summary_replaces_summarized_messages():
+    conversation = conversation_with(8)
+    conversation.summary = "The user asked about shipping."
+    conversation.summarized_count = 5
+    built = build_context(conversation, token_budget=10_000)
+    assert built.messages[0]["role"] == "system"
+    assert "The user asked about shipping." in built.messages[0]["content"]
+    assert built.history_messages == 3
+    assert built.overflow == []
+    assert built.overflow_end == 5
+
+
+def test_overflow_indexes_are_absolute_after_eviction():
+    conversation = Conversation()
+    conversation.messages = type(conversation.messages)(maxlen=4)
+    for i in range(6):
+        conversation.add_message("user", f"message {i}")
+    assert conversation.first_index == 2
+    per_message = estimate_message_tokens("message 5")
+    built = build_context(conversation, token_budget=per_message)
+    assert [m.content for m in built.overflow] == ["message 2", "message 3", "message 4"]
+    assert built.overflow_end == 5
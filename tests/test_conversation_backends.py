@@ -0,0 +1,171 @@
+import time
+
+import pytest
+
+from app.conversation_backends import MAX_LOADED_MESSAGES, RedisConversationStore, SQLiteConversationStore
+from app.conversation_store import Conversation
+
+
+def _add_turn(conversation: Conversation, number: int) -> None:
+    conversation.add_message("user", f"question {number}")
+    conversation.add_message("assistant", f"answer {number}")
+
+
+async def _roundtrip(store) -> None:
+    conversation = await store.load("alice")
+    assert conversation.total_messages == 0
+    _add_turn(conversation, 1)
+    await store.commit("alice", conversation)
+    assert conversation.pending == []
+
+    conversation = await store.load("alice")
+    _add_turn(conversation, 2)
+    await store.commit("alice", conversation)
+
+    loaded = await store.load("alice")
+    assert [m.content for m in loaded.messages] == ["question 1", "answer 1", "question 2", "answer 2"]
+    assert loaded.total_messages == 4
+    assert [m.content for m in await store.get_messages("alice", 1, 3)] == ["answer 1", "question 2"]
+    assert [m.content for m in await store.get_messages("alice", -1)] == ["answer 2"]
+
+    loaded.summary, loaded.summarized_count = "asked two questions", 2
+    await store.save_summary("alice", loaded)
+    await store.save_verified("alice", loaded)
+    reloaded = await store.load("alice")
+    assert (reloaded.summary, reloaded.summarized_count, reloaded.verified) == ("asked two questions", 2, True)
+
+    assert (await store.load("bob")).total_messages == 0
+    assert await store.delete("alice")
+    assert (await store.load("alice")).total_messages == 0
+    assert not await store.delete("alice")
+
+
+async def _keeps_recent_window(store) -> None:
+    conversation = await store.load("carol")
+    for number in range(MAX_LOADED_MESSAGES):
+        _add_turn(conversation, number)
+    await store.commit("carol", conversation)
+    loaded = await store.load("carol")
+    assert len(loaded.messages) == MAX_LOADED_MESSAGES
+    assert loaded.total_messages == 2 * MAX_LOADED_MESSAGES
+    assert loaded.first_index == MAX_LOADED_MESSAGES
+    assert loaded.messages[-1].content == f"answer {MAX_LOADED_MESSAGES - 1}"
+
+
+@pytest.fixture
+def sqlite_store(tmp_path):
+    store = SQLiteConversationStore(str(tmp_path / "conversations.db"), stale_timeout_minutes=30)
+    yield store
+    store._conn.close()
+
+
+def test_sqlite_roundtrip(sqlite_store, run):
+    run(_roundtrip(sqlite_store))
+
+
+def test_sqlite_keeps_recent_window(sqlite_store, run):
+    run(_keeps_recent_window(sqlite_store))
+
+
+def test_sqlite_concurrent_commits_get_distinct_sequence_numbers(sqlite_store, run):
+    import asyncio
+
+    async def scenario():
+        conversations = [await sqlite_store.load("dave") for _ in range(5)]
+        for number, conversation in enumerate(conversations):
+            _add_turn(conversation, number)
+        await asyncio.gather(*(sqlite_store.commit("dave", c) for c in conversations))
+        return await sqlite_store.load("dave")
+
+    loaded = run(scenario())
+    assert loaded.total_messages == 10
+    assert len(loaded.messages) == 10
+
+
+def test_sqlite_sweep_removes_stale_rows(sqlite_store, run):
+    async def scenario():
+        for identifier in ("old", "fresh"):
+            conversation = await sqlite_store.load(identifier)
+            _add_turn(conversation, 1)
+            await sqlite_store.commit(identifier, conversation)
+            conversation.summary, conversation.summarized_count = "summary", 2
+            await sqlite_store.save_summary(identifier, conversation)
+            await sqlite_store.save_verified(identifier, conversation)
+
+    run(scenario())
+    stale = time.time() - 31 * 60
+    with sqlite_store._lock:
+        sqlite_store._conn.execute("UPDATE messages SET created_at = ? WHERE identifier = 'old'", (stale,))
+        sqlite_store._conn.execute("UPDATE verifications SET verified_at = ? WHERE identifier = 'old'", (stale,))
+
+    assert sqlite_store.sweep_stale() == 1
+    counts = {
+        table: sqlite_store._conn.execute(
+            f"SELECT identifier, COUNT(*) FROM {table} GROUP BY identifier ORDER BY identifier"
+        ).fetchall()
+        for table in ("messages", "summaries", "verifications")
+    }
+    assert counts == {
+        "messages": [("fresh", 2)],
+        "summaries": [("fresh", 1)],
+        "verifications": [("fresh", 1)],
+    }
+    assert sqlite_store.get_stats()["swept_messages"] == 2
+    assert sqlite_store.sweep_stale() == 0
+    assert run(sqlite_store.load("fresh")).verified
+
+
+def test_sqlite_active_conversation_keeps_old_messages_and_summary(sqlite_store, run):
+    async def scenario():
+        conversation = await sqlite_store.load("erin")
+        _add_turn(conversation, 1)
+        await sqlite_store.commit("erin", conversation)
+        conversation.summary, conversation.summarized_count = "asked a question", 2
+        await sqlite_store.save_summary("erin", conversation)
+        with sqlite_store._lock:
+            sqlite_store._conn.execute("UPDATE messages SET created_at = ?", (time.time() - 40 * 60,))
+        _add_turn(conversation, 2)
+        await sqlite_store.commit("erin", conversation)
+        assert sqlite_store.sweep_stale() == 0
+        return await sqlite_store.load("erin")
+
+    loaded = run(scenario())
+    assert [m.content for m in loaded.messages] == ["question 1", "answer 1", "question 2", "answer 2"]
+    assert loaded.total_messages == 4
+    assert (loaded.summary, loaded.summarized_count) == ("asked a question", 2)
+
+
+def test_sqlite_inactive_conversation_expires_on_load(sqlite_store, run):
+    async def scenario():
+        conversation = await sqlite_store.load("frank")
+        _add_turn(conversation, 1)
+        await sqlite_store.commit("frank", conversation)
+        await sqlite_store.save_verified("frank", conversation)
+        with sqlite_store._lock:
+            sqlite_store._conn.execute("UPDATE messages SET created_at = ?", (time.time() - 31 * 60,))
+        return await sqlite_store.load("frank")
+
+    loaded = run(scenario())
+    assert (loaded.total_messages, len(loaded.messages), loaded.verified) == (0, 0, False)
+    assert sqlite_store._conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0] == 0
+
+
+@pytest.fixture
+def redis_store():
+    fakeredis = pytest.importorskip("fakeredis")
+    store = RedisConversationStore("redis://localhost:6379/0", stale_timeout_minutes=30)
+    store.client = fakeredis.FakeAsyncRedis()
+    return store
+
+
+def test_redis_roundtrip(redis_store, run):
+    run(_roundtrip(redis_store))
+
+
+def test_redis_keeps_recent_window_and_sets_expiry(redis_store, run):
+    async def scenario():
+        await _keeps_recent_window(redis_store)
+        return await redis_store.client.ttl(redis_store._key("carol"))
+
+    ttl = run(scenario())
+    assert 0 < ttl <= 30 * 60
@@ -0,0 +1,106 @@
+import time
+
+import pytest
+
+from app.conversation_store import Conversation, ConversationStore, Message
+
+LONG_TEXT = "Your order ORD-1001 with the UltraView 27Q monitor ships tomorrow. Ünïcødé ✓ " * 10
+
+
+def test_compressed_message_round_trips():
+    message = Message("assistant", LONG_TEXT, timestamp=1_700_000_000.9)
+    message.compress(min_chars=256)
+    assert message.compressed
+    assert message.content == LONG_TEXT
+    assert message.as_dict() == {"role": "assistant", "content": LONG_TEXT}
+    assert message.timestamp == 1_700_000_000
+    # Compressing again is a no-op
+    message.compress(min_chars=256)
+    assert message.content == LONG_TEXT
+
+
+def test_short_or_incompressible_messages_stay_plain():
+    short = Message("user", "hi")
+    short.compress(min_chars=256)
+    assert not short.compressed
+    noise = Message("user", "".join(chr(0x4E00 + (i * 7919) % 20000) for i in range(300)))
+    noise.compress(min_chars=10)
+    assert not noise.compressed
+
+
+def test_timestamps_are_integer_epoch_seconds():
+    before = int(time.time())
+    message = Message("user", "hello")
+    assert isinstance(message.timestamp, int)
+    assert before <= message.timestamp <= int(time.time())
+
+
+def test_messages_leaving_the_hot_window_are_compressed():
+    conversation = Conversation()
+    for i in range(Conversation.HOT_MESSAGES + 2):
+        conversation.add_message("user", f"{i} {LONG_TEXT}")
+    flags = [message.compressed for message in conversation.messages]
+    assert flags == [True, True] + [False] * Conversation.HOT_MESSAGES
+    assert [m.content for m in conversation.messages] == [
+        f"{i} {LONG_TEXT}" for i in range(Conversation.HOT_MESSAGES + 2)
+    ]
+
+
+def test_history_view_reads_the_tail_lazily():
+    conversation = Conversation()
+    for i in range(5):
+        conversation.add_message("user" if i % 2 == 0 else "assistant", f"message {i}")
+    history = conversation.get_history(limit=3)
+    assert len(history) == 3
+    assert list(history) == [
+        {"role": "user", "content": "message 2"},
+        {"role": "assistant", "content": "message 3"},
+        {"role": "user", "content": "message 4"},
+    ]
+    assert history[-1] == {"role": "user", "content": "message 4"}
+    assert history[1:] == [{"role": "assistant", "content": "message 3"}, {"role": "user", "content": "message 4"}]
+    with pytest.raises(IndexError):
+        history[3]
+    assert len(conversation.get_history()) == len(conversation.get_history(limit=2, include_all=True)) == 5
+    assert list(conversation.get_history(limit=0)) == []
+
+
+def test_store_evicts_least_recently_used_per_shard():
+    store = ConversationStore(max_conversations=3, shards=1)
+    for identifier in ("a", "b", "c"):
+        store.get_or_create_conversation(identifier)
+    store.get_or_create_conversation("a")  # a is now the most recent
+    store.get_or_create_conversation("d")
+    assert store.get_conversation("b") is None
+    assert all(store.get_conversation(identifier) is not None for identifier in ("a", "c", "d"))
+    assert store.get_stats()["evicted_capacity"] == 1
+
+
+def test_store_capacity_is_split_across_shards():
+    store = ConversationStore(max_conversations=64, shards=4)
+    assert store.max_per_shard == 16
+    for i in range(1000):
+        store.get_or_create_conversation(f"user-{i}")
+    stats = store.get_stats()
+    assert stats["total_conversations"] == 64
+    assert stats["largest_shard"] == 16
+    assert stats["evicted_capacity"] == 1000 - 64
+
+
+def test_identifier_always_maps_to_the_same_shard():
+    first, second = ConversationStore(shards=8), ConversationStore(shards=8)
+    conversation = first.get_or_create_conversation("session:abc")
+    assert first.get_or_create_conversation("session:abc") is conversation
+    assert first.shards.index(first._shard("session:abc")) == second.shards.index(second._shard("session:abc"))
+
+
+def test_sweep_removes_only_stale_conversations():
+    store = ConversationStore(stale_timeout_minutes=30, shards=2)
+    for identifier in ("old-1", "old-2", "active"):
+        store.get_or_create_conversation(identifier)
+    for identifier in ("old-1", "old-2"):
+        store.get_conversation(identifier).last_activity -= 31 * 60
+    assert store.sweep_stale() == 2
+    assert store.get_conversation("active") is not None
+    assert store.get_stats()["evicted_stale"] == 2
+    assert store.sweep_stale() == 0
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from app.health_monitor import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, HealthMonitor
+
+
+def tripped_breaker():
+    breaker = CircuitBreaker("mcp", failure_threshold=2, reset_timeout=10)
+    breaker.record_failure("boom")
+    breaker.record_failure("boom")
+    return breaker
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("mcp", failure_threshold=2, reset_timeout=10)
+    breaker.record_failure("boom")
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure("boom")
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert (breaker.trips, breaker.rejected, breaker.last_error) == (1, 1, "boom")
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker("mcp", failure_threshold=2)
+    breaker.record_failure("boom")
+    breaker.record_success()
+    breaker.record_failure("boom")
+    assert breaker.state == CLOSED
+
+
+def test_open_breaker_allows_one_trial_per_reset_timeout(clock):
+    breaker = tripped_breaker()
+    assert breaker.retry_after() == 10
+    clock.advance(10)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # Only one trial until the next reset_timeout
+    assert not breaker.allow()
+    clock.advance(10)
+    assert breaker.allow()
+
+
+def test_failed_trial_reopens_without_counting_a_new_trip(clock):
+    breaker = tripped_breaker()
+    clock.advance(10)
+    breaker.allow()
+    breaker.record_failure("still down")
+    assert breaker.state == OPEN
+    assert breaker.trips == 1
+    assert not breaker.allow()
+    assert breaker.retry_after() == 10
+
+
+def test_successful_trial_closes(clock):
+    breaker = tripped_breaker()
+    clock.advance(10)
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.retry_after() == 0
+    assert breaker.allow()
+
+
+async def healthy_probe():
+    return None
+
+
+async def failing_probe():
+    raise ConnectionError("refused")
+
+
+async def hanging_probe():
+    await asyncio.sleep(10)
+
+
+@pytest.mark.parametrize("probe, healthy", [(healthy_probe, True), (failing_probe, False), (hanging_probe, False)])
+def test_check_records_probe_result(run, probe, healthy):
+    monitor = HealthMonitor(timeout=0.05, failure_threshold=1)
+    monitor.register("mcp", probe)
+    assert monitor.healthy("mcp") is None
+    assert run(monitor.check("mcp")) is healthy
+    stats = monitor.get_stats()["mcp"]
+    assert stats["healthy"] is healthy
+    assert stats["checks"] == 1
+    assert stats["failures"] == (0 if healthy else 1)
+    assert stats["circuit"]["state"] == (CLOSED if healthy else OPEN)
+
+
+def test_timeout_is_reported_as_the_error(run):
+    monitor = HealthMonitor(timeout=0.05)
+    monitor.register("llm", hanging_probe)
+    run(monitor.check("llm"))
+    assert "timed out" in monitor.breaker("llm").last_error
+
+
+def test_recovery_closes_the_circuit(run):
+    monitor = HealthMonitor(failure_threshold=1)
+    outcomes = [failing_probe, healthy_probe]
+    monitor.register("mcp", lambda: outcomes.pop(0)())
+    run(monitor.check("mcp"))
+    assert monitor.breaker("mcp").state == OPEN
+    run(monitor.check("mcp"))
+    assert monitor.breaker("mcp").state == CLOSED
+    assert monitor.healthy("mcp") is True
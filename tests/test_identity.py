@@ -0,0 +1,71 @@
+import pytest
+from starlette.requests import Request
+
+from app.identity import SessionManager
+
+SECRET = b"test-secret"
+
+
+def make_request(headers=None, cookies=None, client=("203.0.113.9", 5000)):
+    raw = [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    if cookies:
+        raw.append((b"cookie", "; ".join(f"{k}={v}" for k, v in cookies.items()).encode()))
+    return Request({"type": "http", "method": "POST", "path": "/chat", "headers": raw, "client": client})
+
+
+def test_issued_tokens_verify():
+    sessions = SessionManager(SECRET)
+    token = sessions.issue()
+    session_id, _, _ = token.partition(".")
+    assert sessions.verify(token) == session_id
+    assert sessions.issue() != token
+
+
+@pytest.mark.parametrize("mangle", [
+    lambda token: token[:-1] + ("A" if token[-1] != "A" else "B"),
+    lambda token: ("X" if token[0] != "X" else "Y") + token[1:],
+    lambda token: token.partition(".")[0],
+    lambda token: token + "é",
+    lambda token: "",
+    lambda token: None,
+    lambda token: ".",
+])
+def test_tampered_or_malformed_tokens_are_rejected(mangle):
+    sessions = SessionManager(SECRET)
+    assert sessions.verify(mangle(sessions.issue())) is None
+
+
+def test_tokens_from_another_secret_are_rejected():
+    assert SessionManager(SECRET).verify(SessionManager(b"other-secret").issue()) is None
+
+
+def test_identify_prefers_header_then_cookie_then_address():
+    sessions = SessionManager(SECRET)
+    header_token, cookie_token = sessions.issue(), sessions.issue()
+    header_id, cookie_id = header_token.partition(".")[0], cookie_token.partition(".")[0]
+
+    both = make_request({"X-Session-ID": header_token}, {"chat_session": cookie_token})
+    assert sessions.identify(both) == f"session:{header_id}"
+    forged_header = make_request({"X-Session-ID": "forged.token"}, {"chat_session": cookie_token})
+    assert sessions.identify(forged_header) == f"session:{cookie_id}"
+    assert sessions.identify(make_request({}, {"chat_session": "forged.token"})) == "203.0.113.9"
+
+
+def test_forwarded_for_is_ignored_without_trusted_proxies():
+    sessions = SessionManager(SECRET)
+    assert sessions.identify(make_request({"X-Forwarded-For": "198.51.100.1"})) == "203.0.113.9"
+
+
+def test_forwarded_for_trusts_only_the_configured_hops():
+    sessions = SessionManager(SECRET, trusted_proxies=1)
+    # The client prepended a fake hop; the proxy appended the real one
+    request = make_request({"X-Forwarded-For": "10.0.0.1, 198.51.100.7"})
+    assert sessions.identify(request) == "198.51.100.7"
+    assert SessionManager(SECRET, trusted_proxies=2).identify(request) == "10.0.0.1"
+
+
+def test_short_forwarded_for_falls_back_to_the_peer():
+    # Fewer hops than trusted proxies: the header may be entirely client-supplied
+    sessions = SessionManager(SECRET, trusted_proxies=2)
+    assert sessions.identify(make_request({"X-Forwarded-For": "198.51.100.7"})) == "203.0.113.9"
+    assert sessions.identify(make_request({"X-Forwarded-For": " , "})) == "203.0.113.9"
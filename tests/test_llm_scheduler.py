@@ -0,0 +1,117 @@
+import asyncio
+import time
+
+import pytest
+
+from app.llm_scheduler import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, LLMScheduler, TokenBucket, parse_reset
+
+
+@pytest.mark.parametrize("value, expected", [("6m0s", 360.0), ("20ms", 0.02), ("1.5s", 1.5), ("12", 12.0)])
+def test_parse_reset_durations(value, expected):
+    assert parse_reset(value) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("value", [None, "", "soon"])
+def test_parse_reset_unparseable(value):
+    assert parse_reset(value) is None
+
+
+def test_parse_reset_epoch_timestamps():
+    assert parse_reset(str(time.time() + 30)) == pytest.approx(30, abs=1)
+    assert parse_reset(str((time.time() + 30) * 1000)) == pytest.approx(30, abs=1)
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(per_minute=600, burst_seconds=1)  # 10/s, capacity 10
+    assert bucket.wait_time(10) == 0
+    bucket.take(10)
+    assert bucket.wait_time(1) == pytest.approx(0.1, abs=0.01)
+    bucket.give_back(5)
+    assert bucket.wait_time(5) == 0
+
+
+def test_unlimited_bucket_never_waits():
+    bucket = TokenBucket(per_minute=0)
+    bucket.take(1_000_000)
+    assert bucket.wait_time(1_000_000) == 0
+
+
+async def _grant_order(scheduler: LLMScheduler, requests) -> list:
+    order = []
+
+    async def request(label, user, priority):
+        await scheduler.acquire(10, priority=priority, user=user)
+        order.append(label)
+
+    tasks = []
+    for label, user, priority in requests:
+        tasks.append(asyncio.create_task(request(label, user, priority)))
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_users_are_served_round_robin(run):
+    scheduler = LLMScheduler()
+    scheduler.pause(0.05)
+    order = run(_grant_order(scheduler, [
+        ("a1", "alice", PRIORITY_INTERACTIVE),
+        ("a2", "alice", PRIORITY_INTERACTIVE),
+        ("a3", "alice", PRIORITY_INTERACTIVE),
+        ("b1", "bob", PRIORITY_INTERACTIVE),
+        ("c1", "carol", PRIORITY_INTERACTIVE),
+    ]))
+    assert order == ["a1", "b1", "c1", "a2", "a3"]
+
+
+def test_interactive_lane_goes_before_background(run):
+    scheduler = LLMScheduler()
+    scheduler.pause(0.05)
+    order = run(_grant_order(scheduler, [
+        ("summary1", "alice", PRIORITY_BACKGROUND),
+        ("summary2", "bob", PRIORITY_BACKGROUND),
+        ("chat", "carol", PRIORITY_INTERACTIVE),
+    ]))
+    assert order == ["chat", "summary1", "summary2"]
+
+
+def test_rate_limit_headers_pause_dispatch(run):
+    scheduler = LLMScheduler()
+    scheduler.update_from_headers({"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "200ms"})
+    assert scheduler.throttled == 1
+
+    async def timed_acquire() -> float:
+        started = time.monotonic()
+        await scheduler.acquire(10)
+        return time.monotonic() - started
+
+    assert run(timed_acquire()) >= 0.15
+    assert scheduler.get_stats()["waited"] == 1
+
+
+def test_provider_limit_below_configured_becomes_the_rate():
+    scheduler = LLMScheduler(rpm=1000)
+    scheduler.update_from_headers({"x-ratelimit-limit-requests": "500", "x-ratelimit-limit-tokens": "20000"})
+    assert scheduler.requests.per_minute == 500
+    assert scheduler.tokens.per_minute == 20000
+    scheduler.update_from_headers({"x-ratelimit-limit-requests": "2000"})
+    assert scheduler.requests.per_minute == 500
+
+
+def test_cancelled_waiter_is_never_granted(run):
+    scheduler = LLMScheduler(tpm=6000, burst_seconds=0.1)  # capacity 10 tokens, refilled in 0.1s
+
+    async def scenario():
+        await scheduler.acquire(10)
+        waiter = asyncio.create_task(scheduler.acquire(10))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0.15)
+        granted_before = scheduler.granted
+        await asyncio.wait_for(scheduler.acquire(10), timeout=0.05)
+        return granted_before
+
+    assert run(scenario()) == 1
+    assert scheduler.granted == 2
@@ -0,0 +1,205 @@
+import asyncio
+import random
+
+import httpx
+import pytest
+from openai import APIConnectionError, APITimeoutError, BadRequestError, InternalServerError, RateLimitError
+
+from app import llm_service
+from app.config import settings
+from app.health_monitor import CLOSED, OPEN, HealthMonitor
+from app.llm_scheduler import LLMScheduler
+from app.llm_service import LLMService
+from app.model_router import ModelRouter
+
+REQUEST = httpx.Request("POST", "https://llm.test/v1/chat/completions")
+
+
+def status_error(cls, status, headers=None):
+    response = httpx.Response(status, headers=headers or {}, request=REQUEST)
+    return cls("upstream error", response=response, body=None)
+
+
+class Raw:
+    """Stands in for an OpenAI raw response."""
+
+    def __init__(self, value="ok", headers=None):
+        self.value = value
+        self.headers = httpx.Headers(headers or {})
+
+    def parse(self):
+        return self.value
+
+
+class Script:
+    """An operation that raises or returns the scripted outcomes in order."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    async def __call__(self, *args):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """An LLMService with its own scheduler, router and health monitor."""
+    scheduler = LLMScheduler()
+    router = ModelRouter(primary="big", fast="small", fallbacks=["backup"])
+    monitor = HealthMonitor(failure_threshold=1)
+    monitor.register("llm", lambda: None)
+    monkeypatch.setattr(llm_service, "get_llm_scheduler", lambda: scheduler)
+    monkeypatch.setattr(llm_service, "get_model_router", lambda: router)
+    monkeypatch.setattr(llm_service, "get_health_monitor", lambda: monitor)
+    monkeypatch.setattr(settings, "LLM_RETRY_BASE_BACKOFF_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "LLM_RETRY_MAX_BACKOFF_SECONDS", 0.04)
+    service = LLMService()
+    service.scheduler, service.router, service.monitor = scheduler, router, monitor
+    return service
+
+
+@pytest.fixture
+def backoffs(monkeypatch):
+    """Records the backoff cap of each retry and always picks the cap."""
+    caps = []
+
+    def uniform(low, high):
+        caps.append(high)
+        return high
+
+    monkeypatch.setattr(random, "uniform", uniform)
+    return caps
+
+
+def retry(service, operation, max_retries=3):
+    return asyncio.run(service._with_retries(operation, 100, 0, "alice", max_retries))
+
+
+def test_retries_with_exponential_backoff_until_success(service, backoffs):
+    operation = Script(
+        status_error(InternalServerError, 500),
+        APIConnectionError(request=REQUEST),
+        status_error(InternalServerError, 502),
+        Raw("answer"),
+    )
+    result, grant = retry(service, operation)
+    assert result == "answer"
+    assert operation.calls == 4
+    assert backoffs == [0.01, 0.02, 0.04]
+    assert (service.retries, service.failures, service.in_flight) == (3, 0, 0)
+
+
+def test_backoff_is_capped(service, backoffs):
+    retry(service, Script(*[status_error(InternalServerError, 500)] * 4, Raw()), max_retries=5)
+    assert backoffs == [0.01, 0.02, 0.04, 0.04]
+
+
+def test_gives_up_after_max_retries(service, backoffs):
+    operation = Script(*[status_error(InternalServerError, 500)] * 3)
+    with pytest.raises(InternalServerError):
+        retry(service, operation, max_retries=2)
+    assert operation.calls == 3
+    assert (service.retries, service.failures) == (2, 1)
+
+
+def test_stops_when_the_next_attempt_would_pass_the_deadline(service, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_RETRY_DEADLINE_SECONDS", 1.0)
+    operation = Script(status_error(RateLimitError, 429, {"retry-after": "5"}), Raw())
+    with pytest.raises(RateLimitError):
+        retry(service, operation)
+    assert operation.calls == 1
+    # Not retried, so nobody else is held back either
+    assert service.scheduler.throttled == 0
+
+
+def test_rate_limit_honors_retry_after_and_pauses_the_scheduler(service, backoffs):
+    operation = Script(status_error(RateLimitError, 429, {"retry-after": "0.1"}), Raw("answer"))
+    loop_time = []
+
+    async def scenario():
+        loop_time.append(asyncio.get_running_loop().time())
+        result = await service._with_retries(operation, 100, 0, "alice", 3)
+        loop_time.append(asyncio.get_running_loop().time())
+        return result
+
+    result, _ = asyncio.run(scenario())
+    assert result == "answer"
+    assert loop_time[1] - loop_time[0] >= 0.1
+    assert service.scheduler.throttled == 1
+
+
+def test_other_errors_are_not_retried(service):
+    operation = Script(status_error(BadRequestError, 400), Raw())
+    with pytest.raises(BadRequestError):
+        retry(service, operation)
+    assert operation.calls == 1
+    assert (service.retries, service.failures) == (0, 1)
+
+
+def fallback(service, create, messages=None):
+    messages = messages or [{"role": "user", "content": "hi"}]
+    return asyncio.run(service._with_fallback(messages, None, 0, "alice", create))
+
+
+def test_falls_back_to_the_next_model_on_timeout_or_overload(service, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 0)
+    models = []
+
+    async def create(params):
+        models.append(params["model"])
+        if params["model"] == "small":
+            raise APITimeoutError(request=REQUEST)
+        return Raw(f"from {params['model']}")
+
+    result, _, model = fallback(service, create)
+    assert (result, model) == ("from big", "big")
+    assert models == ["small", "big"]
+    stats = service.router.get_stats()["models"]
+    assert (stats["small"]["fallbacks"], stats["big"]["calls"]) == (1, 1)
+    assert service.monitor.breaker("llm").state == CLOSED
+
+
+def test_slow_model_is_abandoned_after_the_fallback_timeout(service, monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_FALLBACK_TIMEOUT_SECONDS", 0.05)
+
+    async def create(params):
+        if params["model"] == "small":
+            await asyncio.sleep(5)
+        return Raw(params["model"])
+
+    assert fallback(service, create)[2] == "big"
+
+
+def test_last_model_failure_opens_the_circuit(service, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 0)
+
+    async def create(params):
+        raise status_error(InternalServerError, 503)
+
+    with pytest.raises(InternalServerError):
+        fallback(service, create)
+    assert service.router.get_stats()["models"]["backup"]["failures"] == 1
+    assert service.monitor.breaker("llm").state == OPEN
+
+
+def test_rate_limited_last_model_does_not_open_the_circuit(service, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 0)
+
+    async def create(params):
+        raise status_error(RateLimitError, 429)
+
+    with pytest.raises(RateLimitError):
+        fallback(service, create)
+    assert service.monitor.breaker("llm").state == CLOSED
+
+
+def test_tool_choice_is_sent_with_the_tools(service):
+    tools = [{"type": "function", "function": {"name": "get_product"}}]
+    assert service._build_params([], tools, "big", "none")["tool_choice"] == "none"
+    assert service._build_params([], tools, "big")["tool_choice"] == "auto"
+    assert "tool_choice" not in service._build_params([], None, "big")
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import socket
+import time
+
+import pytest
+import uvicorn
+
+from app.mcp_client import MCPClient, MCPSessionPool
+from benchmarks.fake_mcp import create_server
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FakeMCPServer:
+    """The benchmark MCP stand-in served in-process, restartable on the same port."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}/mcp"
+        self.latency_ms = latency_ms
+        self._server = None
+        self._task = None
+
+    async def start(self) -> None:
+        app = create_server(port=self.port, latency_ms=self.latency_ms).streamable_http_app()
+        config = uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="critical", ws="none")
+        self._server = uvicorn.Server(config)
+        self._task = asyncio.create_task(self._server.serve())
+        while not self._server.started:
+            await asyncio.sleep(0.01)
+
+    async def stop(self) -> None:
+        # Pooled sessions hold their streams open, so don't wait for them to finish
+        self._server.should_exit = self._server.force_exit = True
+        await self._task
+
+    async def restart(self) -> None:
+        """Restart with a fresh session manager, so the server forgets every session."""
+        await self.stop()
+        await self.start()
+
+
+@pytest.fixture(autouse=True)
+def quiet_lifespan():
+    # A forced uvicorn exit logs the cancelled app lifespan
+    logging.getLogger("uvicorn.error").disabled = True
+    yield
+    logging.getLogger("uvicorn.error").disabled = False
+
+
+def with_server(scenario, latency_ms: float = 0.0):
+    async def main():
+        server = FakeMCPServer(latency_ms)
+        await server.start()
+        try:
+            return await scenario(server)
+        finally:
+            await server.stop()
+
+    return asyncio.run(main())
+
+
+def client_for(server: FakeMCPServer) -> MCPClient:
+    client = MCPClient(server.url)
+    client.cache = None
+    return client
+
+
+def test_pool_reuses_idle_sessions():
+    async def scenario(server):
+        pool = MCPSessionPool(server.url, size=2)
+        first = await pool.acquire()
+        pool.release(first)
+        second = await pool.acquire()
+        pool.release(second)
+        stats = pool.get_stats()
+        await pool.close()
+        return first is second, stats
+
+    reused, stats = with_server(scenario)
+    assert reused
+    assert (stats["hits"], stats["misses"], stats["idle"], stats["in_use"]) == (1, 1, 1, 0)
+
+
+def test_idle_session_is_pinged_and_replaced_after_server_restart():
+    async def scenario(server):
+        pool = MCPSessionPool(server.url, size=2, ping_interval=0)
+        stale = await pool.acquire()
+        pool.release(stale)
+        await server.restart()
+        started = time.monotonic()
+        pooled = await pool.acquire()
+        result = await pooled.call_tool("get_product", {"sku": "A-1"})
+        elapsed = time.monotonic() - started
+        pool.release(pooled)
+        stats = pool.get_stats()
+        await pool.close()
+        return pooled is not stale, result, elapsed, stats
+
+    replaced, result, elapsed, stats = with_server(scenario)
+    assert replaced
+    assert "UltraView" in result.content[0].text
+    assert elapsed < 5
+    assert (stats["reconnects"], stats["misses"]) == (1, 2)
+
+
+def test_broken_release_closes_session_and_flags_idle_ones_for_ping():
+    async def scenario(server):
+        pool = MCPSessionPool(server.url, size=2, ping_interval=3600)
+        first, second = await pool.acquire(), await pool.acquire()
+        pool.release(first)
+        pool.release(second, broken=True)
+        await asyncio.sleep(0.1)
+        stats = pool.get_stats()
+        await pool.close()
+        return first, second, stats
+
+    first, second, stats = with_server(scenario)
+    assert not second.alive
+    assert first.last_used == float("-inf")
+    assert (stats["broken"], stats["idle"], stats["in_use"]) == (1, 1, 0)
+
+
+def test_call_fails_fast_and_retries_on_a_fresh_session_after_restart():
+    async def scenario(server):
+        client = client_for(server)
+        await client.pool.warm(2)
+        await client.call_tool("get_product", {"sku": "A-1"})
+        await server.restart()
+        started = time.monotonic()
+        result = await client.call_tool("get_product", {"sku": "A-2"})
+        elapsed = time.monotonic() - started
+        stats = client.get_stats()
+        await client.close()
+        return result, elapsed, stats
+
+    result, elapsed, stats = with_server(scenario)
+    assert '"sku": "A-2"' in result
+    assert elapsed < 5
+    assert (stats["broken"], stats["misses"]) == (1, 1)
+
+
+def test_mutating_tool_is_not_retried_after_restart():
+    async def scenario(server):
+        client = client_for(server)
+        await client.pool.warm(1)
+        await server.restart()
+        started = time.monotonic()
+        result = await client.call_tool("create_order", {"customer_id": "CUST-1", "sku": "A-1"})
+        elapsed = time.monotonic() - started
+        stats = client.get_stats()
+        await client.close()
+        return result, elapsed, stats
+
+    result, elapsed, stats = with_server(scenario)
+    assert result.startswith("Error")
+    assert elapsed < 5
+    assert (stats["broken"], stats["misses"]) == (1, 0)
+
+
+def test_cancelled_call_returns_session_to_pool():
+    async def scenario(server):
+        client = client_for(server)
+        call = asyncio.create_task(client.call_tool("get_product", {"sku": "A-1"}))
+        await asyncio.sleep(0.1)
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        stats = client.get_stats()
+        result = await client.call_tool("get_product", {"sku": "A-1"})
+        await client.close()
+        return stats, result
+
+    stats, result = with_server(scenario, latency_ms=500)
+    assert (stats["broken"], stats["idle"], stats["in_use"]) == (0, 1, 0)
+    assert '"sku": "A-1"' in result
@@ -0,0 +1,56 @@
+import pytest
+
+from app.llm_scheduler import PRIORITY_BACKGROUND
+from app.model_router import ModelRouter
+
+TOOLS = [{"type": "function", "function": {"name": "get_product"}}]
+LONG = "I ordered a monitor last week and it arrived with a cracked stand, what are my options for a replacement?"
+
+
+@pytest.fixture
+def router():
+    return ModelRouter(primary="big", fast="small", fallbacks=["backup", "big"], short_message_chars=40)
+
+
+def user(content):
+    return {"role": "user", "content": content}
+
+
+def after_tools(content=LONG):
+    return [
+        user(content),
+        {"role": "assistant", "content": None, "tool_calls": [{"id": "a"}]},
+        {"role": "tool", "tool_call_id": "a", "content": "get_product result"},
+    ]
+
+
+@pytest.mark.parametrize("messages, tools, priority, rule", [
+    ([user(LONG)], TOOLS, PRIORITY_BACKGROUND, "background"),
+    (after_tools(), TOOLS, 0, "post_tool"),
+    (after_tools(), None, 0, "post_tool"),
+    ([user(LONG)], None, 0, "no_tools"),
+    ([user("hi there")], TOOLS, 0, "short_message"),
+    ([user(LONG)], TOOLS, 0, "default"),
+])
+def test_rules(router, messages, tools, priority, rule):
+    assert router.route(messages, tools, priority).rule == rule
+
+
+def test_fast_rules_fall_back_to_primary_then_fallbacks(router):
+    assert router.route(after_tools(), TOOLS).models == ["small", "big", "backup"]
+
+
+def test_default_rule_starts_with_the_primary_model(router):
+    assert router.route([user(LONG)], TOOLS).models == ["big", "backup"]
+
+
+def test_fast_model_defaults_to_the_primary():
+    router = ModelRouter(primary="big")
+    assert router.route([user("hi")]).models == ["big"]
+
+
+def test_routes_are_counted(router):
+    router.route(after_tools(), TOOLS)
+    router.route(after_tools(), None)
+    router.route([user(LONG)], TOOLS)
+    assert router.get_stats()["routes"] == {"post_tool": 2, "default": 1}
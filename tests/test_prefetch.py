@@ -0,0 +1,109 @@
+import asyncio
+import re
+
+import pytest
+
+from app.prefetch import Prefetcher, PrefetchRule
+
+SKU = re.compile(r"\b(?!ORD-)[A-Z]{2,5}-\d{3,6}\b", re.IGNORECASE)
+ORDER = re.compile(r"\bORD-\d{3,10}\b", re.IGNORECASE)
+
+
+def tool(name, argument):
+    return {"type": "function", "function": {
+        "name": name,
+        "parameters": {"type": "object", "properties": {argument: {"type": "string"}}, "required": [argument]},
+    }}
+
+
+TOOLS = [tool("get_product", "sku"), tool("get_order", "order_id"), tool("get_customer", "customer_id")]
+
+
+class Upstream:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+
+    async def __call__(self, name, arguments):
+        self.calls.append((name, arguments))
+        await asyncio.sleep(self.delay)
+        return f"{name} {arguments}"
+
+
+def make_prefetcher(upstream=None, **overrides):
+    options = dict(
+        rules=[
+            PrefetchRule("get_product", "sku", SKU),
+            PrefetchRule("get_order", "order_id", ORDER),
+            PrefetchRule("get_customer", "customer_id", re.compile(r"\bCUST-\d+\b")),
+            PrefetchRule("create_order", "sku", SKU),
+        ],
+        call=upstream or Upstream(),
+        never_prefetch=["create_order", "get_customer"],
+        verified_tools=["get_order", "create_order"],
+    )
+    options.update(overrides)
+    return Prefetcher(**options)
+
+
+def test_never_prefetch_rules_are_dropped():
+    prefetcher = make_prefetcher()
+    assert [rule.tool for rule in prefetcher.rules] == ["get_product", "get_order"]
+    assert prefetcher.extract("Customer CUST-7 wants MON-2701", TOOLS + [tool("create_order", "sku")]) == [
+        ("get_product", {"sku": "MON-2701"}),
+    ]
+
+
+def test_order_rule_waits_for_verification():
+    prefetcher = make_prefetcher()
+    message = "Where is ORD-1001? It had a MON-2701 in it."
+    assert prefetcher.extract(message, TOOLS) == [("get_product", {"sku": "MON-2701"})]
+    assert prefetcher.extract(message, TOOLS, verified=True) == [
+        ("get_product", {"sku": "MON-2701"}),
+        ("get_order", {"order_id": "ORD-1001"}),
+    ]
+
+
+def test_rules_need_their_tool_offered_and_respect_max_calls():
+    prefetcher = make_prefetcher(max_calls=2)
+    assert prefetcher.extract("MON-2701", [tool("get_order", "order_id")]) == []
+    calls = prefetcher.extract("MON-2701, mon-2701, KB-100 and HUB-42000", TOOLS)
+    # Matches differing only in case are prefetched once
+    assert calls == [("get_product", {"sku": "MON-2701"}), ("get_product", {"sku": "KB-100"})]
+
+
+def test_take_matches_ignoring_case_and_close_counts_unused(run):
+    upstream = Upstream()
+    prefetcher = make_prefetcher(upstream)
+
+    async def scenario():
+        prefetch = prefetcher.start("Compare MON-2701 and KB-100", TOOLS)
+        hit = await prefetch.take("get_product", {"sku": "mon-2701"}, timeout=1)
+        miss = await prefetch.take("get_product", {"sku": "MON-9999"}, timeout=1)
+        prefetch.close()
+        return hit, miss
+
+    hit, miss = run(scenario())
+    assert hit == "get_product {'sku': 'MON-2701'}"
+    assert miss is None
+    assert len(upstream.calls) == 2
+    stats = prefetcher.get_stats()
+    assert (stats["started"], stats["hits"], stats["unused"]) == (2, 1, 1)
+
+
+def test_take_times_out_on_a_slow_prefetch(run):
+    prefetcher = make_prefetcher(Upstream(delay=1))
+
+    async def scenario():
+        prefetch = prefetcher.start("MON-2701", TOOLS)
+        with pytest.raises(asyncio.TimeoutError):
+            await prefetch.take("get_product", {"sku": "MON-2701"}, timeout=0.01)
+        prefetch.close()
+
+    run(scenario())
+    assert prefetcher.get_stats()["errors"] == 1
+
+
+def test_disabled_prefetcher_starts_nothing():
+    prefetcher = make_prefetcher(enabled=False)
+    assert prefetcher.start("MON-2701", TOOLS) is None
@@ -0,0 +1,66 @@
+from app.models import ChatResponse
+from app.response_cache import ResponseCache, normalize_message
+
+PROMPT = "You are a helpful assistant."
+MODEL = "small-model"
+
+
+def answer(text="We ship within two days."):
+    return ChatResponse(response=text)
+
+
+def test_normalized_messages_share_an_entry():
+    cache = ResponseCache()
+    cache.store("What are your shipping times?", PROMPT, MODEL, answer())
+    hit = cache.lookup("  what are your SHIPPING times ", PROMPT, MODEL)
+    assert hit is not None and hit.cached
+    assert hit.response == "We ship within two days."
+    assert normalize_message("Hello,   World!") == "hello world"
+
+
+def test_system_prompt_change_invalidates_everything():
+    cache = ResponseCache()
+    cache.store("shipping times", PROMPT, MODEL, answer())
+    assert cache.lookup("shipping times", PROMPT + " Be brief.", MODEL) is None
+    assert cache.invalidations == 1
+    assert cache.get_stats()["entries"] == 0
+    # Going back to the old prompt does not resurrect old answers
+    assert cache.lookup("shipping times", PROMPT, MODEL) is None
+
+
+def test_model_is_part_of_the_key():
+    cache = ResponseCache()
+    cache.store("shipping times", PROMPT, MODEL, answer())
+    assert cache.lookup("shipping times", PROMPT, "large-model") is None
+    assert cache.lookup("shipping times", PROMPT, MODEL) is not None
+
+
+def test_entries_expire(clock):
+    cache = ResponseCache(ttl_seconds=10)
+    cache.store("shipping times", PROMPT, MODEL, answer())
+    clock.advance(11)
+    assert cache.lookup("shipping times", PROMPT, MODEL) is None
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_oldest_entries_are_evicted():
+    cache = ResponseCache(max_entries=2)
+    for question in ("first", "second", "third"):
+        cache.store(question, PROMPT, MODEL, answer(question))
+    assert cache.lookup("first", PROMPT, MODEL) is None
+    assert cache.lookup("third", PROMPT, MODEL).response == "third"
+    assert cache.evictions == 1
+
+
+def test_fuzzy_matching_respects_threshold():
+    cache = ResponseCache(fuzzy_threshold=0.6)
+    cache.store("what are your shipping times to canada", PROMPT, MODEL, answer())
+    near = cache.lookup("what are your shipping times to canada please", PROMPT, MODEL)
+    assert near is not None and cache.fuzzy_hits == 1
+    assert cache.lookup("do you sell gift cards", PROMPT, MODEL) is None
+
+
+def test_exact_only_cache_ignores_near_duplicates():
+    cache = ResponseCache()
+    cache.store("what are your shipping times to canada", PROMPT, MODEL, answer())
+    assert cache.lookup("what are your shipping times to canada please", PROMPT, MODEL) is None
@@ -0,0 +1,124 @@
+import asyncio
+
+from app.tool_cache import ToolResultCache
+
+
+class Upstream:
+    """Counts calls and returns a fixed result after an optional delay."""
+
+    def __init__(self, result="ok", delay=0.0):
+        self.result = result
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.result
+
+
+def make_cache(**overrides):
+    options = dict(max_bytes=10_000, ttls={"get_product": 60}, never_cache=["get_order"])
+    options.update(overrides)
+    return ToolResultCache(**options)
+
+
+def test_hit_within_ttl_and_refetch_after_expiry(run, clock):
+    cache = make_cache()
+    upstream = Upstream("product")
+
+    async def call():
+        return await cache.get_or_call("get_product", {"sku": "A-1"}, upstream)
+
+    assert run(call()) == "product"
+    assert run(call()) == "product"
+    assert upstream.calls == 1
+    clock.advance(61)
+    run(call())
+    assert upstream.calls == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_never_cache_and_untimed_tools_always_call_upstream(run):
+    cache = make_cache(never_cache=["get_product"])
+    upstream = Upstream()
+
+    async def scenario():
+        for name in ("get_product", "get_product", "list_orders", "list_orders"):
+            await cache.get_or_call(name, {}, upstream)
+
+    run(scenario())
+    assert upstream.calls == 4
+    assert cache.bypassed == 4
+    assert not cache.is_cacheable("get_product")
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_concurrent_misses_share_one_upstream_call(run):
+    cache = make_cache()
+    upstream = Upstream("product", delay=0.02)
+
+    async def scenario():
+        return await asyncio.gather(
+            *(cache.get_or_call("get_product", {"sku": "A-1"}, upstream) for _ in range(5))
+        )
+
+    assert run(scenario()) == ["product"] * 5
+    assert upstream.calls == 1
+    assert (cache.misses, cache.coalesced) == (1, 4)
+    assert cache.get_stats()["inflight"] == 0
+
+
+def test_caller_timeout_does_not_cancel_the_shared_call(run):
+    cache = make_cache()
+    upstream = Upstream("product", delay=0.05)
+
+    async def scenario():
+        impatient = cache.get_or_call("get_product", {"sku": "A-1"}, upstream)
+        patient = asyncio.create_task(cache.get_or_call("get_product", {"sku": "A-1"}, upstream))
+        try:
+            await asyncio.wait_for(impatient, timeout=0.01)
+        except asyncio.TimeoutError:
+            pass
+        return await patient
+
+    assert run(scenario()) == "product"
+    assert upstream.calls == 1
+
+
+def test_errors_are_not_cached(run):
+    cache = make_cache()
+    failing = Upstream("Error: upstream unavailable")
+
+    async def call():
+        return await cache.get_or_call("get_product", {"sku": "A-1"}, failing)
+
+    run(call())
+    run(call())
+    assert failing.calls == 2
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_byte_budget_evicts_least_recently_used(run):
+    cache = make_cache(max_bytes=300)
+
+    async def call(sku):
+        return await cache.get_or_call("get_product", {"sku": sku}, Upstream("x" * 100))
+
+    async def scenario():
+        await call("A")
+        await call("B")
+        await call("A")  # A is now the most recent
+        await call("C")
+
+    run(scenario())
+    stats = cache.get_stats()
+    assert stats["evictions"] == 1
+    assert stats["bytes"] <= 300
+    assert cache.make_key("get_product", {"sku": "A"}) in cache._entries
+    assert cache.make_key("get_product", {"sku": "B"}) not in cache._entries
+
+
+def test_make_key_ignores_argument_order():
+    assert ToolResultCache.make_key("t", {"a": 1, "b": "é"}) == ToolResultCache.make_key("t", {"b": "é", "a": 1})
+    assert ToolResultCache.make_key("t", {"a": 1}) != ToolResultCache.make_key("u", {"a": 1})
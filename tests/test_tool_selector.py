@@ -0,0 +1,61 @@
+import pytest
+
+from app.tool_selector import ToolSelector, canonical_tools, verification_succeeded
+
+
+@pytest.mark.parametrize("result", [
+    '{"verified": true, "customer_id": "CUST-1"}',
+    '{"success": true}',
+    "Customer verified successfully.",
+    "PIN verification passed for jane@example.com",
+])
+def test_verification_success(result):
+    assert verification_succeeded(result)
+
+
+@pytest.mark.parametrize("result", [
+    '{"verified": false}',
+    '{"verified": "false"}',
+    '{"verified": 1}',
+    '{"customer_id": "CUST-1"}',
+    "[]",
+    "PIN does not match",
+    "Customer not verified",
+    "Verification failed: wrong PIN",
+    "Too many attempts, account locked",
+    "Could not find that customer",
+    "Verification pending",
+    "",
+    "Error: tool verify_customer_pin timed out",
+])
+def test_verification_failure(result):
+    assert not verification_succeeded(result)
+
+
+def tool(name):
+    return {"type": "function", "function": {"name": name, "parameters": {"type": "object", "properties": {}}}}
+
+
+TOOLS = canonical_tools([tool(name) for name in (
+    "get_product", "get_customer", "verify_customer_pin", "list_orders", "create_order",
+)])
+
+
+def offered(selection):
+    return [t["function"]["name"] for t in selection.tools]
+
+
+def test_selection_follows_intent_and_verification():
+    selector = ToolSelector(
+        account_tools=["get_customer", "verify_customer_pin"],
+        verified_tools=["list_orders", "create_order"],
+    )
+    browsing = [{"role": "user", "content": "Do you have 27 inch monitors?"}]
+    account = [{"role": "user", "content": "Where is my order?"}]
+    assert offered(selector.select(TOOLS, browsing, verified=False)) == ["get_product"]
+    assert offered(selector.select(TOOLS, account, verified=False)) == [
+        "get_customer", "get_product", "verify_customer_pin",
+    ]
+    selection = selector.select(TOOLS, browsing, verified=True)
+    assert offered(selection) == [t["function"]["name"] for t in TOOLS]
+    assert selection.tokens_saved == 0